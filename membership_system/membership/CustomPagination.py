@@ -1,14 +1,74 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
 from django.conf import settings
 
 
+def replace_base_url(request, url):
+    """Point next/previous links at the public BASE_URL instead of the host Django saw."""
+    if url:
+        return url.replace(request._current_scheme_host, settings.BASE_URL)
+    return url
+
+
+class CustomCursorPagination(CursorPagination):
+    """
+    Keyset pagination over a single indexed ordering column.
+    The total count is skipped unless the request asks for it with ?count=true.
+    """
+
+    page_size_query_param = 'page_size'
+    max_page_size = settings.MAX_PAGE_SIZE
+
+    def __init__(self, ordering):
+        self.ordering = ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.include_count = request.query_params.get('count', '').lower() in ('1', 'true')
+        if self.include_count:
+            self.count = queryset.count()
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': replace_base_url(self.request, self.get_next_link()),
+            'previous': replace_base_url(self.request, self.get_previous_link()),
+            'results': data,
+        }
+        if self.include_count:
+            payload = {'count': self.count, **payload}
+        return Response(payload)
+
+
 class CustomPageNumberPagination(PageNumberPagination):
+    """
+    Page number pagination, switching to CustomCursorPagination when the request
+    has a ?cursor= parameter (empty for the first page) and the view declares a
+    `cursor_ordering`.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = settings.MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        ordering = getattr(view, 'cursor_ordering', None)
+        if (
+            self.cursor_query_param in request.query_params
+            and ordering
+            and getattr(queryset, 'model', None) is view.queryset.model
+            # Grouped reports can't be keyset paginated on the model's ordering
+            and queryset.query.group_by is None
+        ):
+            self.cursor_paginator = CustomCursorPagination(ordering)
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
     def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+
         response = super().get_paginated_response(data)
         request = self.request
-        base_url = settings.BASE_URL
-        if response.data.get('next'):
-            response.data['next'] = response.data['next'].replace(request._current_scheme_host, base_url)
-        if response.data.get('previous'):
-            response.data['previous'] = response.data['previous'].replace(request._current_scheme_host, base_url)
+        response.data['next'] = replace_base_url(request, response.data.get('next'))
+        response.data['previous'] = replace_base_url(request, response.data.get('previous'))
         return response
@@ -0,0 +1,139 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import GymAttendance, GymInout, GymMember
+from .serializers import InoutEventSerializer
+
+BATCH_SIZE = 1000
+
+
+def _existing_rows(codes, earliest, latest):
+    """
+    gym_inout rows of these members that a batch spanning earliest..latest can
+    collide with: rows whose in or out time falls in the batch window, plus rows
+    still open from the last INOUT_MAX_VISIT_HOURS before it.
+    """
+    open_since = earliest - timedelta(hours=settings.INOUT_MAX_VISIT_HOURS)
+    return (
+        GymInout.objects.filter(member_reg_code__in=codes)
+        .filter(
+            Q(in_time__range=(earliest, latest))
+            | Q(out_time__range=(earliest, latest))
+            | Q(out_time__isnull=True, in_time__gte=open_since)
+        )
+        .order_by('in_time')
+    )
+
+
+def ingest_events(events, record_attendance=False):
+    """
+    Write a backlog of scanner in/out events in one transaction.
+
+    Events are replayed in time order: an `in` creates a gym_inout row unless
+    that member already has one at the same in_time, and an `out` closes the
+    member's open row (from this batch or already stored). With
+    `record_attendance`, each member's first check-in of a day also adds a
+    gym_attendance row. Returns one result per event, in request order.
+    """
+    results = [None] * len(events)
+    valid = []
+    for index, data in enumerate(events):
+        serializer = InoutEventSerializer(data=data)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            results[index] = {'index': index, 'status': 'invalid', 'errors': serializer.errors}
+
+    if valid:
+        with transaction.atomic():
+            _apply_events(valid, results, record_attendance)
+
+    return {
+        'summary': dict(Counter(result['status'] for result in results)),
+        'results': results,
+    }
+
+
+def _apply_events(valid, results, record_attendance):
+    """Check the validated events against gym_inout and write them; run inside a transaction."""
+    codes = {event['member_reg_code'] for _, event in valid}
+    times = [event['time'] for _, event in valid]
+    # Locking the members serialises batches for the same members, so the
+    # duplicate checks below see every row an earlier batch committed
+    members = {
+        reg_number: (pk, member_id)
+        for reg_number, pk, member_id in GymMember.objects.select_for_update()
+        .filter(members_reg_number__in=codes)
+        .order_by('id')
+        .values_list('members_reg_number', 'id', 'member_id')
+    }
+
+    seen_in, seen_out, open_rows = set(), set(), {}
+    for row in _existing_rows(codes, min(times), max(times)):
+        seen_in.add((row.member_reg_code, row.in_time))
+        if row.out_time is None:
+            open_rows[row.member_reg_code] = row
+        else:
+            seen_out.add((row.member_reg_code, row.out_time))
+
+    new_rows, closed_rows, attendance_days = [], [], set()
+    max_visit = timedelta(hours=settings.INOUT_MAX_VISIT_HOURS)
+    # Same-instant ins sort before outs so a zero-length visit still pairs
+    for index, event in sorted(valid, key=lambda item: (item[1]['time'], item[1]['type'] == 'out')):
+        code, when = event['member_reg_code'], event['time']
+        member = members.get(code)
+        if member is None:
+            status = 'unknown_member'
+        elif event['type'] == 'in':
+            if (code, when) in seen_in:
+                status = 'duplicate'
+            else:
+                row = GymInout(member_id=member[1], member_reg_code=code, in_time=when)
+                new_rows.append(row)
+                seen_in.add((code, when))
+                open_rows[code] = row
+                attendance_days.add((member[0], timezone.localdate(when)))
+                status = 'created'
+        elif (code, when) in seen_out:
+            status = 'duplicate'
+        else:
+            row = open_rows.get(code)
+            if row is None or row.in_time > when or when - row.in_time > max_visit:
+                status = 'unmatched'
+            else:
+                row.out_time = when
+                del open_rows[code]
+                seen_out.add((code, when))
+                if row.pk is not None:
+                    closed_rows.append(row)
+                status = 'paired'
+        results[index] = {'index': index, 'status': status}
+
+    # Rows paired within the batch are inserted with their out_time already set.
+    # The unique (member_reg_code, in_time) index drops rows other writers stored meanwhile.
+    GymInout.objects.bulk_create(new_rows, batch_size=BATCH_SIZE, ignore_conflicts=True)
+    GymInout.objects.bulk_update(closed_rows, ['out_time'], batch_size=BATCH_SIZE)
+    if record_attendance and attendance_days:
+        record_attendance_days(attendance_days)
+
+
+def record_attendance_days(attendance_days):
+    """Add a gym_attendance row for each (member pk, date) that doesn't have one yet."""
+    existing = set(
+        GymAttendance.objects.filter(
+            user_id__in={user_id for user_id, _ in attendance_days},
+            attendance_date__in={day for _, day in attendance_days},
+        ).values_list('user_id', 'attendance_date')
+    )
+    GymAttendance.objects.bulk_create(
+        [
+            GymAttendance(user_id=user_id, attendance_date=day, status='Present', role_name='member')
+            for user_id, day in sorted(attendance_days - existing)
+        ],
+        batch_size=BATCH_SIZE,
+    )
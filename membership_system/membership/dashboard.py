@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, FloatField, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import GymIncomeExpense, GymMember
+
+DASHBOARD_SUMMARY_CACHE_KEY = 'membership:dashboard-summary'
+
+
+def _member_count(**filters):
+    # Grouping on a constant leaves the aggregate ungrouped: always exactly one row
+    members = GymMember.objects.filter(role_name_norm='member', **filters)
+    return Subquery(members.values(grouped=Value(1)).annotate(count=Count('id')).values('count'))
+
+
+def _total(invoice_type):
+    return Coalesce(
+        Sum('total_amount', filter=Q(invoice_type=invoice_type), output_field=FloatField()),
+        Value(0),
+        output_field=FloatField(),
+    )
+
+
+def compute_dashboard_summary():
+    """
+    Member counts and revenue/expense totals in a single statement: the income/expense
+    sums are conditional aggregates and the member counts scalar subqueries beside them.
+    """
+    return GymIncomeExpense.objects.values(grouped=Value(1)).annotate(
+        total_members=_member_count(),
+        active_members=_member_count(membership_status_norm='continue'),
+        total_revenue=_total('income'),
+        total_expenses=_total('expense'),
+    ).values('total_members', 'active_members', 'total_revenue', 'total_expenses').get()
+
+
+def get_dashboard_summary():
+    summary = cache.get(DASHBOARD_SUMMARY_CACHE_KEY)
+    if summary is None:
+        summary = compute_dashboard_summary()
+        cache.set(DASHBOARD_SUMMARY_CACHE_KEY, summary, settings.DASHBOARD_CACHE_TIMEOUT)
+    return summary
+
+
+def invalidate_dashboard_summary():
+    cache.delete(DASHBOARD_SUMMARY_CACHE_KEY)
@@ -0,0 +1,30 @@
+from django.utils import timezone
+
+from .dashboard import invalidate_dashboard_summary
+from .jobs import scheduled_job
+from .models import GymMember
+
+EXPIRE_MEMBERSHIPS_JOB = 'expire_memberships'
+
+
+def membership_status_for(valid_to, today=None):
+    """The membership_status a member with this membership_valid_to should have."""
+    today = today or timezone.localdate()
+    return 'expired' if valid_to and valid_to < today else 'continue'
+
+
+def expire_memberships(today=None):
+    """
+    Mark every member whose membership_valid_to has passed as expired with a
+    single UPDATE over the membership_valid_to index. Returns the rows changed.
+    """
+    today = today or timezone.localdate()
+    with scheduled_job(EXPIRE_MEMBERSHIPS_JOB) as run:
+        run['rows_affected'] = (
+            GymMember.objects.filter(membership_valid_to__lt=today)
+            .exclude(membership_status_norm='expired')
+            .update(membership_status='expired')
+        )
+    if run['rows_affected']:
+        invalidate_dashboard_summary()
+    return run['rows_affected']
@@ -0,0 +1,117 @@
+import orjson
+from django.http import HttpResponse
+from rest_framework import ISO_8601, fields as drf_fields, serializers
+from rest_framework.settings import api_settings
+
+
+def _field_converter(field, model_field):
+    """
+    Turn a .values() value into what `field.to_representation` returns for the
+    model instance. Common column types get a direct conversion; anything else
+    goes through the serializer field itself.
+    """
+    if isinstance(field, drf_fields.FileField):
+        # Only reached for serializers with `files_as_storage_url`
+        storage = model_field.storage
+        return lambda value: storage.url(value) if value else None
+    if isinstance(field, drf_fields.CharField):
+        return str
+    if isinstance(field, drf_fields.IntegerField):
+        return int
+    if isinstance(field, drf_fields.FloatField):
+        return float
+    if isinstance(field, drf_fields.DateField) and not isinstance(field, drf_fields.DateTimeField):
+        output_format = getattr(field, 'format', api_settings.DATE_FORMAT)
+        if output_format is None or output_format.lower() == ISO_8601:
+            return lambda value: value if isinstance(value, str) else value.isoformat()
+        return field.to_representation
+    return field.to_representation
+
+
+def _representation_owner(serializer):
+    """The serializer class whose to_representation the serializer uses, None for DRF's own."""
+    for cls in type(serializer).__mro__:
+        if cls is serializers.Serializer:
+            return None
+        if 'to_representation' in vars(cls):
+            return cls
+    return None
+
+
+class ValuesRowBuilder:
+    """
+    Builds a serializer's list output from `.values()` rows instead of model
+    instances. Only serializers whose fields all map onto model columns are
+    supported, so SerializerMethodFields and custom to_representation()
+    overrides keep the regular path; check `supported` before using it.
+
+    The one override it reproduces is a serializer with `files_as_storage_url =
+    True` set next to its to_representation(), which must do nothing but
+    replace file fields with their storage url.
+    """
+
+    def __init__(self, serializer):
+        model = serializer.Meta.model
+        model_fields = {field.name: field for field in model._meta.concrete_fields}
+        owner = _representation_owner(serializer)
+        files_as_url = owner is not None and vars(owner).get('files_as_storage_url', False)
+        self.columns = []
+        self.supported = owner is None or files_as_url
+        for name, field in serializer.fields.items():
+            model_field = model_fields.get(field.source)
+            if model_field is None or field.write_only:
+                if not field.write_only:
+                    self.supported = False
+                continue
+            if isinstance(field, drf_fields.FileField) and not files_as_url:
+                # DRF's FileField builds an absolute url from the request
+                self.supported = False
+            self.columns.append((name, field.source, _field_converter(field, model_field)))
+        self.pk_name = model._meta.pk.name
+
+    def values(self, queryset, extra=()):
+        """The queryset as dicts of the needed columns (plus `extra`, e.g. a cursor ordering column)."""
+        sources = {source for _, source, _ in self.columns} | {self.pk_name, *extra}
+        return queryset.values(*sources)
+
+    def rows(self, values):
+        columns = self.columns
+        return [
+            {
+                name: None if row[source] is None else convert(row[source])
+                for name, source, convert in columns
+            }
+            for row in values
+        ]
+
+
+def fast_json_response(data, status=200):
+    return HttpResponse(orjson.dumps(data), status=status, content_type='application/json')
+
+
+class FastListMixin:
+    """
+    Opt-in fast list for ModelViewSets: with ?fast=true rows are read with
+    .values() and encoded with orjson, skipping per-field serializer work.
+    The output matches the regular serializer; views whose serializer has
+    computed fields or its own to_representation() keep the regular path.
+    """
+    fast_query_param = 'fast'
+
+    def wants_fast_list(self):
+        return self.request.query_params.get(self.fast_query_param, '').lower() in ('1', 'true')
+
+    def fast_list(self, request):
+        """Return the fast list response, or None when this serializer can't use it."""
+        builder = ValuesRowBuilder(self.get_serializer())
+        if not builder.supported:
+            return None
+
+        queryset = self.filter_queryset(self.get_queryset())
+        cursor_ordering = getattr(self, 'cursor_ordering', None)
+        values = builder.values(queryset, extra=[cursor_ordering.lstrip('-')] if cursor_ordering else [])
+
+        page = self.paginate_queryset(values)
+        if page is not None:
+            return fast_json_response(self.get_paginated_response(builder.rows(page)).data)
+        return fast_json_response(builder.rows(values))
@@ -1,6 +1,9 @@
+from django.conf import settings
 from django.db.models import Q
 from django_filters import rest_framework as filters
-from .models import GymMember, Membership, GymIncomeExpense, GymInout, MembershipPayment
+from .models import GymMember, Membership, GymIncomeExpense, GymInout, MembershipPayment, MembershipPaymentHistory
+from .search import search_member_ids
+from .search_plan import build_search_q, parse_search_term
 
 
 class GymMemberFilter(filters.FilterSet):
@@ -10,21 +13,28 @@ class GymMemberFilter(filters.FilterSet):
         """
         Custom filter to perform a Search across multiple fields.
         The search will be case-insensitive and will match partial text.
+        With MEMBER_SEARCH_INDEX_ENABLED, name, phone, email, username and address
+        are looked up through the member search index instead of LIKE scans.
         """
-        if value:
-            # Perform a case-insensitive search across multiple fields
-            print(f"Filtering with value: {value}")
-            return queryset.filter(
-                Q(first_name__icontains=value) |
-                Q(last_name__icontains=value) |
-                Q(email__icontains=value) |
-                Q(mobile__icontains=value) |
-                Q(username__icontains=value) |
-                Q(address__icontains=value) |
-                Q(image__icontains=value)
-            )
-        print("No value provided for search")
-        return queryset
+        if not value:
+            return queryset
+
+        if settings.MEMBER_SEARCH_INDEX_ENABLED:
+            member_ids = search_member_ids(value)
+            if member_ids is None:
+                return queryset
+            return queryset.filter(id__in=member_ids)
+
+        # Perform a case-insensitive search across multiple fields
+        return queryset.filter(
+            Q(first_name__icontains=value) |
+            Q(last_name__icontains=value) |
+            Q(email__icontains=value) |
+            Q(mobile__icontains=value) |
+            Q(username__icontains=value) |
+            Q(address__icontains=value) |
+            Q(image__icontains=value)
+        )
 
     class Meta:
         model = GymMember
@@ -35,16 +45,17 @@ class MembershipFilter(filters.FilterSet):
     global_search = filters.CharFilter(method='filter_global_search', label='Search')
 
     def filter_global_search(self, queryset, name, value):
-        """Perform a case-insensitive search across multiple fields in Membership model."""
-        if value:
-            return queryset.filter(
-                Q(membership_label__icontains=value) |
-                Q(membership_class__icontains=value) |
-                Q(membership_description__icontains=value) |
-                Q(membership_amount__icontains=value) |
-                Q(installment_amount__icontains=value) |
-                Q(signup_fee__icontains=value)
-            )
+        """
+        Perform a search across multiple fields in Membership model.
+        Numbers match the amount columns by range, other text matches label,
+        class and description case-insensitively.
+        """
+        if value and value.strip():
+            return queryset.filter(build_search_q(
+                parse_search_term(value),
+                text_fields=['membership_label', 'membership_class', 'membership_description'],
+                number_fields=['membership_amount', 'installment_amount', 'signup_fee'],
+            ))
         return queryset
 
     class Meta:
@@ -56,19 +67,49 @@ class MembershipPaymentFilter(filters.FilterSet):
     global_search = filters.CharFilter(method='filter_global_search', label='Search')
 
     def filter_global_search(self, queryset, name, value):
-        """Perform a case-insensitive search across multiple fields in MembershipPayment model."""
-        if value:
-            return queryset.filter(
-                Q(member_id__icontains=value) |
-                Q(membership_status__icontains=value) |
-                Q(created_date__icontains=value)
-            )
+        """
+        Perform a search across multiple fields in MembershipPayment model.
+        Whole numbers match member_id, ISO dates (YYYY, YYYY-MM, YYYY-MM-DD)
+        match created_date by range, other text matches membership_status.
+        """
+        if value and value.strip():
+            return queryset.filter(build_search_q(
+                parse_search_term(value),
+                text_fields=['membership_status'],
+                integer_fields=['member_id'],
+                date_fields=['created_date'],
+            ))
         return queryset
 
     class Meta:
         model = MembershipPayment
         fields = []
 
+
+class MembershipPaymentHistoryFilter(filters.FilterSet):
+    global_search = filters.CharFilter(method='filter_global_search', label='Search')
+    mp_id = filters.NumberFilter(field_name='mp_id', label='Payment')
+
+    def filter_global_search(self, queryset, name, value):
+        """
+        Perform a search across multiple fields in MembershipPaymentHistory model.
+        Whole numbers match the amount, ISO dates match paid_by_date by range,
+        other text matches payment method and transaction id.
+        """
+        if value and value.strip():
+            return queryset.filter(build_search_q(
+                parse_search_term(value),
+                text_fields=['payment_method', 'trasaction_id'],
+                integer_fields=['amount'],
+                code_fields=['trasaction_id'],
+                date_fields=['paid_by_date'],
+            ))
+        return queryset
+
+    class Meta:
+        model = MembershipPaymentHistory
+        fields = []
+
 # class GymAttendanceFilter(filters.FilterSet):
 #     global_search = filters.CharFilter(method='filter_global_search', label='Search')
 
@@ -96,19 +137,18 @@ class GymIncomeExpenseFilter(filters.FilterSet):
 
     def filter_global_search(self, queryset, name, value):
         """Perform Search across multiple fields in GymIncomeExpense."""
-        if value:
-            # Apply global search filter
-            queryset = queryset.filter(
-                Q(invoice_label__icontains=value) |
-                Q(supplier_name__icontains=value) |
-                Q(entry__icontains=value) |
-                Q(payment_status__icontains=value) |
-                Q(total_amount__icontains=value) |
-                Q(receiver_id__icontains=value) |
-                Q(invoice_date__icontains=value) |
-                Q(delete_reason__icontains=value) |
-                Q(mp_id__icontains=value)
-            )
+        if value and value.strip():
+            # Apply global search filter: numbers match total_amount by range and
+            # receiver_id/mp_id exactly, ISO dates match invoice_date by range,
+            # other text matches the text columns
+            queryset = queryset.filter(build_search_q(
+                parse_search_term(value),
+                text_fields=['invoice_label', 'supplier_name', 'entry', 'payment_status', 'delete_reason'],
+                number_fields=['total_amount'],
+                integer_fields=['receiver_id'],
+                code_fields=['mp_id'],
+                date_fields=['invoice_date'],
+            ))
             
             # If invoice_type filter is provided, apply that too
             invoice_type = self.request.query_params.get('invoice_type')
@@ -124,6 +164,8 @@ class GymIncomeExpenseFilter(filters.FilterSet):
 
 class GymInoutFilter(filters.FilterSet):
     global_search = filters.CharFilter(method='filter_global_search', label='Search')
+    since = filters.IsoDateTimeFilter(field_name='in_time', lookup_expr='gte', label='In time from')
+    until = filters.IsoDateTimeFilter(field_name='in_time', lookup_expr='lt', label='In time before')
 
     def filter_global_search(self, queryset, name, value):
         """Perform Search across multiple fields in GymInout."""
@@ -0,0 +1,114 @@
+import functools
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import FingerModeState
+
+# Device ids longer than the column would fail on insert (DataError on MySQL)
+DEVICE_MAX_LENGTH = FingerModeState._meta.get_field('device_id').max_length
+
+
+class BaseFingerModeStore:
+    """
+    Keeps the fingerprint mode and member id per scanner device.
+    States are dicts with `mode`, `member_id` and `version`; `version` grows on
+    every set() so long-polling scanners can tell when the mode changed.
+    """
+
+    def get(self, device):
+        raise NotImplementedError
+
+    def set(self, device, mode, member_id, ttl=None):
+        raise NotImplementedError
+
+    def wait_for_change(self, device, version, timeout):
+        """Block until the device state's version differs from `version` or `timeout` seconds pass."""
+        deadline = time.monotonic() + timeout
+        while True:
+            state = self.get(device)
+            current = state['version'] if state else None
+            if current != version or time.monotonic() >= deadline:
+                return state
+            time.sleep(min(settings.FINGER_MODE_POLL_INTERVAL, max(deadline - time.monotonic(), 0)))
+
+
+class InMemoryFingerModeStore(BaseFingerModeStore):
+    """Process-local store; only correct when a single process serves the scanner."""
+
+    def __init__(self):
+        self.states = {}
+        self.changed = threading.Condition()
+
+    def _current(self, device):
+        state = self.states.get(device)
+        if state and state['expires_at'] is not None and state['expires_at'] <= time.monotonic():
+            return None
+        return state
+
+    def get(self, device):
+        with self.changed:
+            state = self._current(device)
+            return {key: state[key] for key in ('mode', 'member_id', 'version')} if state else None
+
+    def set(self, device, mode, member_id, ttl=None):
+        with self.changed:
+            previous = self.states.get(device)
+            self.states[device] = {
+                'mode': mode,
+                'member_id': member_id,
+                'version': (previous['version'] if previous else 0) + 1,
+                'expires_at': time.monotonic() + ttl if ttl else None,
+            }
+            self.changed.notify_all()
+        return self.get(device)
+
+    def wait_for_change(self, device, version, timeout):
+        deadline = time.monotonic() + timeout
+        with self.changed:
+            while True:
+                state = self._current(device)
+                current = state['version'] if state else None
+                remaining = deadline - time.monotonic()
+                if current != version or remaining <= 0:
+                    break
+                self.changed.wait(remaining)
+        return self.get(device)
+
+
+class DatabaseFingerModeStore(BaseFingerModeStore):
+    """Store backed by the finger_mode_state table, shared by every worker and instance."""
+
+    def get(self, device):
+        state = FingerModeState.objects.filter(device_id=device).first()
+        if state is None or (state.expires_at is not None and state.expires_at <= timezone.now()):
+            return None
+        return {'mode': state.mode, 'member_id': state.member_id, 'version': state.version}
+
+    def set(self, device, mode, member_id, ttl=None):
+        expires_at = timezone.now() + timedelta(seconds=ttl) if ttl else None
+        try:
+            with transaction.atomic():
+                state = FingerModeState.objects.select_for_update().filter(device_id=device).first()
+                if state is None:
+                    state = FingerModeState(device_id=device)
+                state.mode = mode
+                state.member_id = member_id
+                state.version += 1
+                state.expires_at = expires_at
+                state.save()
+        except IntegrityError:
+            # Another worker created the device row first; apply the change on top of it
+            return self.set(device, mode, member_id, ttl)
+        return {'mode': state.mode, 'member_id': state.member_id, 'version': state.version}
+
+
+@functools.lru_cache(maxsize=None)
+def get_finger_mode_store():
+    """The store configured by FINGER_MODE_STORE, one instance per process."""
+    return import_string(settings.FINGER_MODE_STORE)()
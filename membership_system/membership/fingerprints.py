@@ -0,0 +1,164 @@
+import base64
+import binascii
+import functools
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from .models import GymMember
+
+
+def decode_template(value):
+    """Decode a base64 FingerPrint value into a uint8 array, or None if it isn't a valid template."""
+    if not value:
+        return None
+    try:
+        raw = base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    if len(raw) != settings.FINGERPRINT_TEMPLATE_BYTES:
+        return None
+    return np.frombuffer(raw, dtype=np.uint8)
+
+
+class FingerprintIndex:
+    """
+    All enrolled templates packed into one (members x template bytes) uint8
+    array, matched by Hamming distance over the whole array at once.
+    Rows are kept in a buffer that doubles as it fills, so enrolling a member
+    doesn't copy the index.
+
+    identify() works on the arrays and size it read under the lock, without
+    holding it. Rows below that size are therefore never written in place:
+    new members are appended past it, while re-enrolling or removing a member
+    changes a copy of the arrays that then replaces them.
+    """
+
+    def __init__(self, template_bytes):
+        self.template_bytes = template_bytes
+        self.lock = threading.Lock()
+        # Held while (re)loading from the database, so only one thread does it
+        self.reload_lock = threading.Lock()
+        self.templates = np.zeros((0, template_bytes), dtype=np.uint8)
+        self.member_ids = np.zeros(0, dtype=np.int64)
+        self.positions = {}
+        self.size = 0
+        self.loaded_at = None
+
+    def load(self, rows):
+        """Replace the index with (member_id, template array) pairs."""
+        rows = list(rows)
+        templates = np.zeros((max(len(rows), 1), self.template_bytes), dtype=np.uint8)
+        member_ids = np.zeros(max(len(rows), 1), dtype=np.int64)
+        positions = {}
+        for position, (member_id, template) in enumerate(rows):
+            templates[position] = template
+            member_ids[position] = member_id
+            positions[member_id] = position
+        with self.lock:
+            self.templates, self.member_ids, self.positions = templates, member_ids, positions
+            self.size = len(rows)
+            self.loaded_at = time.monotonic()
+
+    def upsert(self, member_id, template):
+        with self.lock:
+            position = self.positions.get(member_id)
+            if position is None:
+                if self.size == len(self.templates):
+                    capacity = max(len(self.templates) * 2, 64)
+                    self.templates = np.resize(self.templates, (capacity, self.template_bytes))
+                    self.member_ids = np.resize(self.member_ids, capacity)
+                position = self.size
+                self.templates[position] = template
+                self.member_ids[position] = member_id
+                self.positions[member_id] = position
+                self.size += 1
+            else:
+                templates = self.templates.copy()
+                templates[position] = template
+                self.templates = templates
+
+    def remove(self, member_id):
+        with self.lock:
+            position = self.positions.pop(member_id, None)
+            if position is None:
+                return
+            # Move the last row into the freed slot
+            last = self.size - 1
+            if position != last:
+                templates, member_ids = self.templates.copy(), self.member_ids.copy()
+                templates[position] = templates[last]
+                member_ids[position] = member_ids[last]
+                self.templates, self.member_ids = templates, member_ids
+                self.positions[int(member_ids[position])] = position
+            self.size = last
+
+    def is_stale(self, max_age):
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > max_age
+
+    def identify(self, probe, max_distance):
+        """Return (member_id, distance) of the closest template within max_distance bits, or None."""
+        with self.lock:
+            templates, member_ids, size = self.templates, self.member_ids, self.size
+        if size == 0:
+            return None
+        templates = templates[:size]
+        if self.template_bytes % 8 == 0:
+            # Compare 64 bits per operation instead of 8
+            templates, probe = templates.view(np.uint64), probe.view(np.uint64)
+        distances = np.bitwise_count(np.bitwise_xor(templates, probe)).sum(axis=1, dtype=np.uint32)
+        best = int(np.argmin(distances))
+        if distances[best] > max_distance:
+            return None
+        return int(member_ids[best]), int(distances[best])
+
+
+def enrolled_templates():
+    members = (
+        GymMember.objects.exclude(fingerprint__isnull=True)
+        .exclude(fingerprint='')
+        .values_list('id', 'fingerprint')
+    )
+    for member_id, fingerprint in members.iterator(chunk_size=2000):
+        template = decode_template(fingerprint)
+        if template is not None:
+            yield member_id, template
+
+
+@functools.lru_cache(maxsize=None)
+def _process_index():
+    return FingerprintIndex(settings.FINGERPRINT_TEMPLATE_BYTES)
+
+
+def get_fingerprint_index():
+    """
+    The process-wide index, loaded from gym_member on first use and reloaded
+    after FINGERPRINT_INDEX_MAX_AGE seconds to pick up enrollments made by
+    other worker processes.
+    """
+    index = _process_index()
+    max_age = settings.FINGERPRINT_INDEX_MAX_AGE
+    if index.is_stale(max_age):
+        # Only the first load makes other threads wait; a reload happening
+        # elsewhere lets them keep matching against the current templates
+        if index.reload_lock.acquire(blocking=index.loaded_at is None):
+            try:
+                if index.is_stale(max_age):
+                    index.load(enrolled_templates())
+            finally:
+                index.reload_lock.release()
+    return index
+
+
+def refresh_member(member):
+    """Apply one member's enrolled template to the index if this process has loaded it."""
+    index = _process_index()
+    if index.loaded_at is None:
+        return
+    template = decode_template(member.fingerprint)
+    if template is None:
+        index.remove(member.pk)
+    else:
+        index.upsert(member.pk, template)
@@ -0,0 +1,153 @@
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .jobs import scheduled_job
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+PURGE_IDEMPOTENCY_KEYS_JOB = 'purge_idempotency_keys'
+# Times a request is tried when its claim is picked as a deadlock victim
+CLAIM_ATTEMPTS = 3
+MYSQL_DEADLOCK = 1213
+
+
+def _sha256(value):
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def _request_hash(request):
+    return _sha256(json.dumps(request.data, cls=JSONEncoder, sort_keys=True))
+
+
+def _claim(key_hash, request_hash):
+    """
+    Return the live stored record for key_hash, or None once this request owns
+    the key and should run. Runs inside the request's transaction: the claim is
+    only committed together with the response, and a concurrent request with
+    the same key waits on its row.
+
+    The key row is inserted before anything locks it: a locking read of a key
+    that doesn't exist yet takes a gap lock on MySQL, and two first requests
+    holding one each deadlock on their inserts.
+    """
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+    # A plain read takes no locks; repeats of a stored key go straight to locking its row
+    if not IdempotencyKey.objects.filter(key_hash=key_hash).exists():
+        try:
+            with transaction.atomic():
+                IdempotencyKey.objects.create(key_hash=key_hash, request_hash=request_hash, expires_at=expires_at)
+            return None
+        except IntegrityError:
+            # A concurrent request with the same key inserted it first; the lock below waits for it
+            pass
+    record = IdempotencyKey.objects.select_for_update().filter(key_hash=key_hash).first()
+    if record is None:
+        # Purged since the read above
+        IdempotencyKey.objects.create(key_hash=key_hash, request_hash=request_hash, expires_at=expires_at)
+        return None
+    # A record left pending past IDEMPOTENCY_PENDING_TIMEOUT belongs to a request that died
+    stale = (
+        record.status_code is None
+        and record.created_at <= now - timedelta(seconds=settings.IDEMPOTENCY_PENDING_TIMEOUT)
+    )
+    if record.expires_at > now and not stale:
+        return record
+    # Take the expired or stale record over in place, under the lock already held
+    IdempotencyKey.objects.filter(pk=record.pk).update(
+        request_hash=request_hash, created_at=now, expires_at=expires_at, status_code=None, response_body=None,
+    )
+    return None
+
+
+def _stored_response(record, request_hash):
+    if record.request_hash != request_hash:
+        return Response(
+            {"error": f"{IDEMPOTENCY_HEADER} was already used for a different request"},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if record.status_code is None:
+        return Response(
+            {"error": f"A request with this {IDEMPOTENCY_HEADER} is still being processed"},
+            status=status.HTTP_409_CONFLICT,
+        )
+    response = Response(record.response_body, status=record.status_code)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _is_deadlock(exc):
+    return bool(exc.args) and exc.args[0] == MYSQL_DEADLOCK
+
+
+def idempotent(scope, required=False):
+    """
+    Honour an Idempotency-Key header on a view method. The first request with a
+    key runs and its response is stored for IDEMPOTENCY_KEY_TTL seconds; repeats
+    get the stored response back without running the view again. Reusing a key with a
+    different body is rejected, and 5xx responses aren't stored so they can be
+    retried. With required=True a request without the header is refused with 400.
+
+    The claim, the view and the stored response share one transaction, so a
+    request that fails or dies leaves no claim behind, and a repeat sent while
+    the first is running waits for it and then gets its response.
+    """
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not key:
+                if required:
+                    return Response(
+                        {"error": f"The {IDEMPOTENCY_HEADER} header is required"},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                return view_method(self, request, *args, **kwargs)
+
+            key_hash = _sha256(f'{scope}:{key}')
+            request_hash = _request_hash(request)
+            for attempt in range(1, CLAIM_ATTEMPTS + 1):
+                claimed = False
+                try:
+                    with transaction.atomic():
+                        record = _claim(key_hash, request_hash)
+                        claimed = True
+                        if record is not None:
+                            return _stored_response(record, request_hash)
+
+                        # An exception rolls the claim back with everything else
+                        response = view_method(self, request, *args, **kwargs)
+
+                        if response.status_code >= 500 or not hasattr(response, 'data'):
+                            IdempotencyKey.objects.filter(key_hash=key_hash).delete()
+                        else:
+                            IdempotencyKey.objects.filter(key_hash=key_hash).update(
+                                status_code=response.status_code,
+                                response_body=json.loads(json.dumps(response.data, cls=JSONEncoder)),
+                            )
+                        return response
+                except OperationalError as exc:
+                    # Repeats waiting on a new key each hold a shared lock from their failed insert, so
+                    # MySQL can pick one as a deadlock victim when they lock the row. Its transaction was
+                    # rolled back before the view ran; try again unless an outer transaction went with it.
+                    if (claimed or attempt == CLAIM_ATTEMPTS or not _is_deadlock(exc)
+                            or transaction.get_connection().in_atomic_block):
+                        raise
+        return wrapper
+    return decorator
+
+
+def purge_expired_keys():
+    """Delete stored responses past their TTL. Returns the rows deleted."""
+    with scheduled_job(PURGE_IDEMPOTENCY_KEYS_JOB) as run:
+        run['rows_affected'], _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+    return run['rows_affected']
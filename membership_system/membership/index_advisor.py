@@ -0,0 +1,176 @@
+from dataclasses import dataclass
+
+from django.apps import apps
+
+# MySQL can only index TEXT/BLOB columns by a prefix; 191 characters keeps a
+# utf8mb4 key under the 767 byte limit of older InnoDB row formats
+TEXT_PREFIX_LENGTH = 191
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    table: str
+    columns: tuple
+    name: str
+    used_by: str
+    unique: bool = False
+
+
+# Indexes the viewsets, filters and jobs rely on, on tables Django doesn't
+# manage. Keep this in step with the query patterns it names.
+HOT_INDEXES = [
+    IndexSpec('gym_member', ('role_name_norm', 'membership_status_norm'), 'gym_member_role_status_norm_idx',
+              'MemberDataViewSet queryset, dashboard member counts, expiry reminders'),
+    IndexSpec('gym_member', ('members_reg_number',), 'gym_member_reg_number_idx',
+              'check-in member lookups (get_members_by_reg_code, bulk in/out ingestion)'),
+    IndexSpec('gym_member', ('membership_valid_to',), 'gym_member_valid_to_idx',
+              'expire_memberships, send_expiry_reminders'),
+    IndexSpec('gym_inout', ('member_reg_code', 'in_time'), 'gym_inout_reg_code_in_time_uniq',
+              'bulk in/out ingestion open-visit lookup and duplicate guard, GymInoutFilter', unique=True),
+    IndexSpec('gym_inout', ('in_time',), 'gym_inout_in_time_idx',
+              'GymInoutViewSet newest-first list and ?cursor= pagination, since/until windows'),
+    IndexSpec('membership_payment', ('member_id',), 'membership_payment_member_id_idx',
+              'payment ledger and arrears per member (?query=ledger|arrears, ?member_id=)'),
+    IndexSpec('membership_payment', ('created_date',), 'membership_payment_created_date_idx',
+              'MembershipPaymentFilter global_search dates'),
+    IndexSpec('membership_payment_history', ('mp_id',), 'membership_payment_history_mp_id_idx',
+              'installments join of the payment ledger, ?mp_id= filter'),
+    IndexSpec('gym_income_expense', ('invoice_type', 'invoice_date'), 'gym_income_expense_type_date_idx',
+              'income/expense ?query= lists, dashboard and monthly rollup sums'),
+    IndexSpec('gym_income_expense', ('invoice_date',), 'gym_income_expense_invoice_date_idx',
+              'GymIncomeExpenseFilter global_search dates'),
+    IndexSpec('gym_income_expense', ('total_amount',), 'gym_income_expense_total_amount_idx',
+              'GymIncomeExpenseFilter global_search amounts'),
+    IndexSpec('gym_income_expense', ('receiver_id',), 'gym_income_expense_receiver_id_idx',
+              'GymIncomeExpenseFilter global_search ids'),
+    IndexSpec('gym_income_expense', ('mp_id',), 'gym_income_expense_mp_id_idx',
+              'GymIncomeExpenseFilter global_search payment codes'),
+]
+
+
+def _text_columns(app_registry=None):
+    """
+    {table: set of TextField columns} from the membership models of
+    `app_registry`: a migration's historical apps, or the current ones.
+    """
+    text_columns = {}
+    for model in (app_registry or apps).get_app_config('membership').get_models():
+        for field in model._meta.concrete_fields:
+            if field.get_internal_type() == 'TextField':
+                text_columns.setdefault(model._meta.db_table, set()).add(field.column)
+    return text_columns
+
+
+def _covers(constraint, spec):
+    """
+    Whether an existing index can serve lookups on the spec's columns (same leading
+    columns); a unique spec needs a unique index on exactly its columns.
+    """
+    if spec.unique:
+        return (
+            (constraint['unique'] or constraint['primary_key'])
+            and tuple(constraint['columns']) == tuple(spec.columns)
+        )
+    return (
+        (constraint['index'] or constraint['unique'] or constraint['primary_key'])
+        and tuple(constraint['columns'][:len(spec.columns)]) == tuple(spec.columns)
+    )
+
+
+def inspect_indexes(connection, specs=HOT_INDEXES):
+    """
+    Check each spec against the live schema. Returns (spec, status, detail)
+    tuples where status is 'present' (detail names the covering index),
+    'missing' or 'no table'.
+    """
+    introspection = connection.introspection
+    report = []
+    with connection.cursor() as cursor:
+        tables = set(introspection.table_names(cursor))
+        constraints = {
+            table: introspection.get_constraints(cursor, table)
+            for table in {spec.table for spec in specs}
+            if table in tables
+        }
+    for spec in specs:
+        if spec.table not in constraints:
+            report.append((spec, 'no table', None))
+            continue
+        covering = [
+            name for name, constraint in constraints[spec.table].items()
+            if _covers(constraint, spec)
+        ]
+        if covering:
+            report.append((spec, 'present', spec.name if spec.name in covering else sorted(covering)[0]))
+        else:
+            report.append((spec, 'missing', None))
+    return report
+
+
+def missing_indexes(connection, specs=HOT_INDEXES):
+    return [spec for spec, status, _ in inspect_indexes(connection, specs) if status == 'missing']
+
+
+def _quote(vendor, name):
+    return f'`{name}`' if vendor == 'mysql' else f'"{name}"'
+
+
+def create_index_sql(spec, vendor, app_registry=None):
+    """
+    DDL creating the index without blocking writes where the backend allows:
+    in-place without locks on MySQL (TEXT columns indexed by prefix),
+    CONCURRENTLY on PostgreSQL and a plain CREATE INDEX elsewhere. Called
+    from a migration, pass its `apps` so the column types are the historical ones.
+    """
+    text_columns = _text_columns(app_registry).get(spec.table, set())
+    parts = []
+    for column in spec.columns:
+        part = _quote(vendor, column)
+        if vendor == 'mysql' and column in text_columns:
+            part += f'({TEXT_PREFIX_LENGTH})'
+        parts.append(part)
+    columns = ', '.join(parts)
+    name, table = _quote(vendor, spec.name), _quote(vendor, spec.table)
+    kind = 'UNIQUE INDEX' if spec.unique else 'INDEX'
+    if vendor == 'mysql':
+        return f'ALTER TABLE {table} ADD {kind} {name} ({columns}), ALGORITHM=INPLACE, LOCK=NONE'
+    if vendor == 'postgresql':
+        return f'CREATE {kind} CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})'
+    return f'CREATE {kind} IF NOT EXISTS {name} ON {table} ({columns})'
+
+
+def drop_index_sql(spec, vendor):
+    name, table = _quote(vendor, spec.name), _quote(vendor, spec.table)
+    if vendor == 'mysql':
+        return f'ALTER TABLE {table} DROP INDEX {name}, ALGORITHM=INPLACE, LOCK=NONE'
+    if vendor == 'postgresql':
+        return f'DROP INDEX CONCURRENTLY IF EXISTS {name}'
+    return f'DROP INDEX IF EXISTS {name}'
+
+
+def migration_source(specs, vendor, dependency):
+    """Source of a reversible RunSQL migration creating `specs` for `vendor`."""
+    operations = ''.join(
+        f"        migrations.RunSQL(\n"
+        f"            sql={create_index_sql(spec, vendor)!r},\n"
+        f"            reverse_sql={drop_index_sql(spec, vendor)!r},\n"
+        f"        ),\n"
+        for spec in specs
+    )
+    return (
+        f"# Generated by `manage.py index_advisor` for the {vendor} backend.\n"
+        f"from django.db import migrations\n"
+        f"\n"
+        f"\n"
+        f"class Migration(migrations.Migration):\n"
+        f"    # Online index builds can't run inside a transaction\n"
+        f"    atomic = False\n"
+        f"\n"
+        f"    dependencies = [\n"
+        f"        {dependency!r},\n"
+        f"    ]\n"
+        f"\n"
+        f"    operations = [\n"
+        f"{operations}"
+        f"    ]\n"
+    )
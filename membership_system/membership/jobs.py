@@ -0,0 +1,21 @@
+from contextlib import contextmanager
+
+from django.utils import timezone
+
+from .models import ScheduledJobRun
+
+
+@contextmanager
+def scheduled_job(name):
+    """
+    Record a run of a scheduled job in scheduled_job_run. The body sets
+    `run['rows_affected']`; last_finished_at is only written when it completes.
+    """
+    ScheduledJobRun.objects.update_or_create(
+        name=name, defaults={'last_started_at': timezone.now(), 'last_finished_at': None}
+    )
+    run = {'rows_affected': 0}
+    yield run
+    ScheduledJobRun.objects.filter(name=name).update(
+        last_finished_at=timezone.now(), rows_affected=run['rows_affected']
+    )
@@ -0,0 +1,137 @@
+from django.db.models import Count, Exists, F, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .jobs import scheduled_job
+from .models import GymMember, MembershipPayment, MembershipPaymentHistory
+from .serializers import GymMemberSimpleSerializer
+
+# Float rounding left over from summing amounts isn't an arrear
+BALANCE_TOLERANCE = 0.005
+RECONCILE_PAID_AMOUNTS_JOB = 'reconcile_paid_amounts'
+
+
+def _zero_if_null(expression):
+    return Coalesce(expression, Value(0.0), output_field=FloatField())
+
+
+def active_payments():
+    """Payments counted in the ledger: refunded or deleted ones (is_Active = 0) are left out."""
+    return MembershipPayment.objects.exclude(is_active=0)
+
+
+def _installments():
+    return MembershipPaymentHistory.objects.filter(mp_id=OuterRef('mp_id'))
+
+
+def _installment_total():
+    """Sum of the outer payment's installments, NULL when it has none."""
+    return Subquery(
+        _installments().values('mp_id').annotate(total=Sum('amount')).values('total'),
+        output_field=FloatField(),
+    )
+
+
+def refresh_paid_amount(*mp_ids):
+    """
+    Set paid_amount of the given payments to the sum of their installments (0
+    once the last one is removed). Recomputing instead of adding the change
+    keeps it right when another writer has already moved paid_amount.
+    """
+    mp_ids = {mp_id for mp_id in mp_ids if mp_id is not None}
+    if mp_ids:
+        MembershipPayment.objects.filter(mp_id__in=mp_ids).update(paid_amount=_zero_if_null(_installment_total()))
+
+
+def settle_paid_amount(payment):
+    """
+    Put back the installment total on a payment that has installments, after a
+    write that may have changed paid_amount directly. Returns whether it did.
+    """
+    updated = (
+        MembershipPayment.objects.filter(Exists(_installments()), mp_id=payment.mp_id)
+        .update(paid_amount=_installment_total())
+    )
+    if updated:
+        payment.refresh_from_db(fields=['paid_amount'])
+    return bool(updated)
+
+
+def unreconciled_payments():
+    """Payments with installments whose paid_amount isn't their installment total."""
+    return (
+        MembershipPayment.objects.annotate(installment_total=_installment_total())
+        .filter(installment_total__isnull=False)
+        .exclude(paid_amount=F('installment_total'))
+    )
+
+
+def reconcile_paid_amounts(batch_size=1000):
+    """
+    Recompute paid_amount from the installments of every payment where they
+    disagree, e.g. rows written before installments kept it in step or by a
+    client that updates both. Payments without installments are left as they
+    are. Returns the payments corrected.
+    """
+    with scheduled_job(RECONCILE_PAID_AMOUNTS_JOB) as run:
+        mp_ids = list(unreconciled_payments().order_by('mp_id').values_list('mp_id', flat=True))
+        for start in range(0, len(mp_ids), batch_size):
+            refresh_paid_amount(*mp_ids[start:start + batch_size])
+        run['rows_affected'] = len(mp_ids)
+    return run['rows_affected']
+
+
+def _settled_amount(installment_total):
+    # What was paid is the installment total; payments recorded without
+    # installments (accept-payment, older rows) only have paid_amount
+    return Coalesce(installment_total, F('paid_amount'), Value(0.0), output_field=FloatField())
+
+
+def payment_ledger(payments):
+    """
+    Outstanding balance of each payment next to its recorded installments, from
+    one grouped join of membership_payment and membership_payment_history. A
+    payment with installments is settled by their total, not paid_amount.
+    """
+    return (
+        payments.annotate(
+            installment_count=Count('installments'),
+            installment_total=_zero_if_null(Sum('installments__amount')),
+            balance=_zero_if_null(F('membership_amount')) - _settled_amount(Sum('installments__amount')),
+        )
+        .values(
+            'mp_id', 'member_id', 'membership_id', 'membership_amount', 'paid_amount',
+            'installment_count', 'installment_total', 'balance', 'start_date', 'end_date',
+        )
+        .order_by('-mp_id')
+    )
+
+
+def member_ledger(payments):
+    """Amount due, paid and outstanding per member, grouped in the database."""
+    return (
+        payments.annotate(settled=_settled_amount(_installment_total()))
+        .values('member_id')
+        .annotate(
+            payment_count=Count('mp_id'),
+            total_due=_zero_if_null(Sum('membership_amount')),
+            total_paid=_zero_if_null(Sum('settled')),
+        )
+        .annotate(balance=F('total_due') - F('total_paid'))
+        .order_by('member_id')
+    )
+
+
+def members_in_arrears(payments):
+    """member_ledger() rows with money outstanding, largest balance first."""
+    return member_ledger(payments).filter(balance__gt=BALANCE_TOLERANCE).order_by('-balance', 'member_id')
+
+
+def with_member_info(rows):
+    """Attach the GymMemberSimpleSerializer data of each row's member using one query."""
+    members = GymMember.objects.only(*GymMemberSimpleSerializer.Meta.fields).in_bulk(
+        {row['member_id'] for row in rows if row['member_id'] is not None}
+    )
+    for row in rows:
+        member = members.get(row['member_id'])
+        row['member_info'] = GymMemberSimpleSerializer(member).data if member else None
+    return rows
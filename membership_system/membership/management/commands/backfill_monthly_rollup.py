@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from membership.rollups import backfill
+
+
+class Command(BaseCommand):
+    help = "Rebuild gym_income_expense_monthly from all active gym_income_expense rows."
+
+    def handle(self, *args, **options):
+        months = backfill()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {months} monthly rollup rows."))
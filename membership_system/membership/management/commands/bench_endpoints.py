@@ -0,0 +1,257 @@
+import base64
+import json
+import math
+import time
+import uuid
+from contextlib import ExitStack
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from membership.finger_state import get_finger_mode_store
+from membership.fingerprints import enrolled_templates
+from membership.middleware import QueryProfile
+from membership.models import (
+    GymIncomeExpense, GymInout, GymMember, Membership, MembershipPayment, MembershipPaymentHistory,
+)
+
+BENCH_DEVICE = 'bench'
+# Routes not benchmarked: the check-in stream never completes
+SKIPPED_ROUTES = {'inout-stream': "server-sent event stream"}
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a sorted list."""
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time every route in membership/urls.py through the full middleware stack on the rows already "
+        "in the database (see generate_gym_data) and save p50/p95 latency, queries per request and "
+        "throughput as JSON. Use --compare to diff against an earlier run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20, help="Timed requests per route")
+        parser.add_argument('--warmup', type=int, default=2, help="Untimed requests per route first")
+        parser.add_argument('--routes', nargs='+', help="Only these route names")
+        parser.add_argument('--include-writes', action='store_true',
+                            help="Also benchmark the routes that create or change rows (local databases only)")
+        parser.add_argument('--username', default='bench', help="Staff user the requests authenticate as")
+        parser.add_argument('--output', help="JSON results file (default bench_endpoints-<timestamp>.json)")
+        parser.add_argument('--compare', help="Earlier results file to compare with")
+
+    def handle(self, *args, **options):
+        samples = self.sample_rows()
+        client = self.authenticated_client(options['username'])
+        get_finger_mode_store().set(BENCH_DEVICE, 'attendance', None, None)
+
+        skipped = dict(SKIPPED_ROUTES)
+        if samples['template'] is None:
+            skipped['fingerprint-identify'] = "no member has an enrolled fingerprint template; see generate_gym_data"
+        routes = [route for route in self.read_routes(samples) if route[0] not in skipped]
+        if options['include_writes']:
+            routes += self.write_routes(samples)
+        if options['routes']:
+            routes = [route for route in routes if route[0] in options['routes']]
+            if not routes:
+                raise CommandError("None of the given routes exist")
+
+        results = {
+            'started_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'rows': {model._meta.db_table: model.objects.count() for model in (
+                GymMember, Membership, MembershipPayment, MembershipPaymentHistory, GymIncomeExpense, GymInout,
+            )},
+            'requests_per_route': options['requests'],
+            'skipped': skipped,
+            'routes': {},
+        }
+        for name, method, path, body in routes:
+            result = self.bench_route(client, method, path, body, options['requests'], options['warmup'])
+            results['routes'][name] = result
+            line = (
+                f"{name:<34} {method:<6} p50 {result['p50_ms']:8.1f} ms  p95 {result['p95_ms']:8.1f} ms  "
+                f"{result['queries_per_request']:5.1f} queries  {result['throughput_rps']:8.1f} req/s  "
+                f"{result['statuses']}"
+            )
+            self.stdout.write(line if result['ok'] else self.style.ERROR(line))
+
+        output = options['output'] or f"bench_endpoints-{timezone.now():%Y%m%d-%H%M%S}.json"
+        with open(output, 'w') as results_file:
+            json.dump(results, results_file, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Saved {len(results['routes'])} routes to {output}"))
+
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+        # Timings of error responses say nothing about the route, so the run fails once they're saved
+        failed = [name for name, result in results['routes'].items() if not result['ok']]
+        if failed:
+            raise CommandError(f"Routes with non-2xx responses: {', '.join(failed)}")
+
+    def sample_rows(self):
+        member = GymMember.objects.filter(role_name_norm='member').exclude(member_id=None).order_by('-id').first()
+        payment = MembershipPayment.objects.order_by('-mp_id').first()
+        installment = MembershipPaymentHistory.objects.order_by('-payment_history_id').first()
+        income_expense = GymIncomeExpense.objects.order_by('-id').first()
+        plan = Membership.objects.exclude(membership_length=None).order_by('id').first()
+        # A stored template identifies its member at distance 0
+        enrolled = next(enrolled_templates(), None)
+        if not all([member, payment, installment, income_expense, plan]):
+            raise CommandError("Fill the database first, e.g. manage.py generate_gym_data --create-tables")
+        return {
+            'member': member, 'payment': payment, 'installment': installment,
+            'income_expense': income_expense, 'plan': plan,
+            'template': base64.b64encode(enrolled[1].tobytes()).decode() if enrolled else None,
+        }
+
+    def authenticated_client(self, username):
+        self.password = uuid.uuid4().hex
+        user, _ = User.objects.get_or_create(username=username, defaults={'is_staff': True})
+        user.is_staff = True
+        user.set_password(self.password)
+        user.save()
+        self.user = user
+        self.refresh_token = str(RefreshToken.for_user(user))
+        access = str(RefreshToken.for_user(user).access_token)
+        return Client(HTTP_AUTHORIZATION=f'Bearer {access}', raise_request_exception=False)
+
+    def read_routes(self, samples):
+        """(name, method, path, body) for every route that doesn't change rows."""
+        member, payment = samples['member'], samples['payment']
+        month = f"{payment.created_date:%Y-%m}" if payment.created_date else '2024'
+        template = samples['template']
+        return [
+            ('members-list', 'GET', '/api/members/', None),
+            ('members-list-cursor', 'GET', '/api/members/?cursor=', None),
+            ('members-list-summary', 'GET', '/api/members/?view=summary', None),
+            ('members-list-fast', 'GET', '/api/members/?fast=true&page_size=100', None),
+            ('members-search', 'GET', f'/api/members/?global_search={member.first_name}', None),
+            ('members-total', 'GET', '/api/members/?query=total-members', None),
+            ('members-active', 'GET', '/api/members/?query=active-members', None),
+            ('members-detail', 'GET', f'/api/members/{member.id}/', None),
+            ('membership-list', 'GET', '/api/membership/', None),
+            ('membership-detail', 'GET', f"/api/membership/{samples['plan'].id}/", None),
+            ('membership-payment-list', 'GET', '/api/membership-payment/', None),
+            ('membership-payment-search', 'GET', f'/api/membership-payment/?global_search={month}', None),
+            ('membership-payment-ledger', 'GET', '/api/membership-payment/?query=ledger', None),
+            ('membership-payment-ledger-member', 'GET', '/api/membership-payment/?query=ledger&group=member', None),
+            ('membership-payment-arrears', 'GET', '/api/membership-payment/?query=arrears', None),
+            ('membership-payment-detail', 'GET', f'/api/membership-payment/{payment.mp_id}/', None),
+            ('membership-payment-history-list', 'GET', f'/api/membership-payment-history/?mp_id={payment.mp_id}', None),
+            ('membership-payment-history-detail', 'GET',
+             f"/api/membership-payment-history/{samples['installment'].payment_history_id}/", None),
+            ('income-expense-list', 'GET', '/api/income-expense/', None),
+            ('income-expense-search', 'GET', f'/api/income-expense/?global_search={month}', None),
+            ('income-expense-income', 'GET', '/api/income-expense/?query=invoice-type-income', None),
+            ('income-expense-total-revenue', 'GET', '/api/income-expense/?query=total-revenue', None),
+            ('income-expense-monthly', 'GET', '/api/income-expense/?query=monthly-income-expense-profit', None),
+            ('income-expense-detail', 'GET', f"/api/income-expense/{samples['income_expense'].id}/", None),
+            ('inout', 'GET', '/api/inout/', None),
+            ('dashboard-summary', 'GET', '/api/dashboard/summary/', None),
+            ('finger-mode', 'GET', f'/api/finger-mode/?device={BENCH_DEVICE}', None),
+            ('fingerprint-identify', 'POST', '/api/fingerprint/identify/', lambda i: {'template': template}),
+            ('token-obtain', 'POST', '/api/token/',
+             lambda i: {'username': self.user.username, 'password': self.password}),
+            ('token-refresh', 'POST', '/api/token/refresh/', lambda i: {'refresh': self.refresh_token}),
+            ('auth-check', 'GET', '/api/auth-check/', None),
+        ]
+
+    def write_routes(self, samples):
+        """Routes that create or change rows; each request gets its own body."""
+        member, payment, plan = samples['member'], samples['payment'], samples['plan']
+        run = uuid.uuid4().hex[:6]
+        start = timezone.now() - timedelta(days=1)
+        return [
+            ('members-create', 'POST', '/api/members/', lambda i: {
+                'is_exist': 1, 'role_name': 'member', 'first_name': f'Bench {run}', 'last_name': str(i),
+                'members_reg_number': f'B{run}{i:03d}'[-10:],
+            }),
+            ('members-update', 'PATCH', f'/api/members/{member.id}/', lambda i: {'city': f'Bench {i}'}),
+            ('accept-payment', 'POST', '/api/accept-payment/', lambda i: {
+                'member_id': member.member_id, 'membership_class': plan.membership_label,
+            }),
+            ('membership-payment-create', 'POST', '/api/membership-payment/', lambda i: {
+                'member_id': member.id, 'membership_id': plan.id, 'membership_amount': plan.membership_amount,
+                'paid_amount': 0, 'created_date': str(timezone.localdate()), 'is_active': 1,
+            }),
+            ('membership-payment-history-create', 'POST', '/api/membership-payment-history/', lambda i: {
+                'mp_id': payment.mp_id, 'amount': 0, 'payment_method': 'Cash',
+                'paid_by_date': str(timezone.localdate()), 'created_by': self.user.id,
+            }),
+            ('income-expense-create', 'POST', '/api/income-expense/', lambda i: {
+                'invoice_type': 'expense', 'invoice_label': 'Bench', 'supplier_name': f'Bench {run}',
+                'entry': '[]', 'payment_status': 'Paid', 'total_amount': 1, 'receiver_id': self.user.id,
+                'invoice_date': str(timezone.localdate()), 'is_active': 1,
+            }),
+            ('inout-bulk', 'POST', '/api/inout/bulk/', lambda i: {'events': [
+                {'member_reg_code': member.members_reg_number, 'type': 'in',
+                 'time': (start + timedelta(minutes=2 * i)).isoformat()},
+                {'member_reg_code': member.members_reg_number, 'type': 'out',
+                 'time': (start + timedelta(minutes=2 * i + 1)).isoformat()},
+            ]}),
+            ('finger-mode-set', 'POST', '/api/finger-mode/', lambda i: {
+                'mode': 'attendance', 'device': BENCH_DEVICE,
+            }),
+        ]
+
+    def bench_route(self, client, method, path, body, requests, warmup):
+        latencies, queries, statuses = [], [], {}
+        for i in range(warmup + requests):
+            profile = QueryProfile()
+            with ExitStack() as stack:
+                for db in connections.all():
+                    stack.enter_context(db.execute_wrapper(profile))
+                start = time.perf_counter()
+                if body is None:
+                    response = client.generic(method, path)
+                else:
+                    # Each write is a new payment as far as the Idempotency-Key endpoints can tell
+                    response = client.generic(
+                        method, path, json.dumps(body(i)), content_type='application/json',
+                        headers={'Idempotency-Key': uuid.uuid4().hex},
+                    )
+                elapsed = time.perf_counter() - start
+            if i < warmup:
+                continue
+            latencies.append(elapsed)
+            queries.append(profile.count)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+        latencies.sort()
+        return {
+            'method': method,
+            'path': path,
+            'requests': requests,
+            'statuses': statuses,
+            'ok': all(code.startswith('2') for code in statuses),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2),
+            'max_ms': round(latencies[-1] * 1000, 2),
+            'queries_per_request': round(sum(queries) / len(queries), 2),
+            'throughput_rps': round(len(latencies) / sum(latencies), 1),
+        }
+
+    def compare(self, path, results):
+        with open(path) as previous_file:
+            previous = json.load(previous_file)['routes']
+        self.stdout.write(f"Compared with {path}:")
+        for name, result in results['routes'].items():
+            before = previous.get(name)
+            if before is None:
+                self.stdout.write(f"{name:<34} new route")
+                continue
+            change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0
+            self.stdout.write(
+                f"{name:<34} p50 {before['p50_ms']:8.1f} -> {result['p50_ms']:8.1f} ms ({change:+.0f}%)  "
+                f"p95 {before['p95_ms']:8.1f} -> {result['p95_ms']:8.1f} ms  "
+                f"queries {before['queries_per_request']:.1f} -> {result['queries_per_request']:.1f}"
+            )
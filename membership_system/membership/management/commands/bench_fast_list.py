@@ -0,0 +1,87 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory
+from rest_framework.utils.urls import remove_query_param
+
+from membership.views import GymIncomeExpenseViewSet, MemberDataViewSet, MemberShipPaymentViewSet
+
+ENDPOINTS = {
+    'members': ('/api/members/', MemberDataViewSet),
+    'membership-payment': ('/api/membership-payment/', MemberShipPaymentViewSet),
+    'income-expense': ('/api/income-expense/', GymIncomeExpenseViewSet),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Check that ?fast=true list responses match the regular serializers, then compare "
+        "rows per second of both paths on the rows already in the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoints', nargs='+', choices=list(ENDPOINTS), default=list(ENDPOINTS))
+        parser.add_argument('--page-size', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--params', nargs='*', default=['', 'cursor=', 'view=summary'],
+                            help="Extra query strings to check, e.g. 'view=summary'")
+
+    def fetch(self, view, path, query):
+        request = APIRequestFactory().get(f'{path}?{query}')
+        response = view(request)
+        if hasattr(response, 'render'):
+            response.render()
+        if response.status_code != 200:
+            raise CommandError(f"GET {path}?{query} returned {response.status_code}")
+        return json.loads(response.content)
+
+    def handle(self, *args, **options):
+        failures = 0
+        for name in options['endpoints']:
+            path, viewset = ENDPOINTS[name]
+            view = viewset.as_view({'get': 'list'})
+
+            for params in options['params']:
+                if params == 'view=summary' and name != 'members':
+                    continue
+                query = '&'.join(filter(None, [f"page_size={options['page_size']}", params]))
+                regular = self.fetch(view, path, query)
+                fast = self.fetch(view, path, f'{query}&fast=true')
+                # next/previous links carry the fast parameter along
+                for link in ('next', 'previous'):
+                    if fast.get(link):
+                        fast[link] = remove_query_param(fast[link], 'fast')
+                if regular != fast:
+                    failures += 1
+                    self.stderr.write(f"{name} [{query}]: fast output differs from the serializer output")
+                    for regular_row, fast_row in zip(regular.get('results', []), fast.get('results', [])):
+                        if regular_row != fast_row:
+                            diff = {key: (regular_row.get(key), fast_row.get(key))
+                                    for key in regular_row.keys() | fast_row.keys()
+                                    if regular_row.get(key) != fast_row.get(key)}
+                            self.stderr.write(f"  first differing row: {diff}")
+                            break
+
+            query = f"page_size={options['page_size']}"
+            rows = len(self.fetch(view, path, query)['results'])
+            if not rows:
+                self.stdout.write(f"{name}: no rows to benchmark")
+                continue
+            timings = {}
+            for label, suffix in [('serializer', ''), ('fast', '&fast=true')]:
+                runs = []
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    self.fetch(view, path, query + suffix)
+                    runs.append(time.perf_counter() - start)
+                timings[label] = statistics.median(runs)
+            self.stdout.write(
+                f"{name}: {rows} rows/page, serializer {rows / timings['serializer']:,.0f} rows/s, "
+                f"fast {rows / timings['fast']:,.0f} rows/s ({timings['serializer'] / timings['fast']:.1f}x)"
+            )
+
+        if failures:
+            raise CommandError(f"{failures} fast list responses differ from the serializer output")
+        self.stdout.write(self.style.SUCCESS("Fast list output matches the serializers."))
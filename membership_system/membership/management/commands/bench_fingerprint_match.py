@@ -0,0 +1,50 @@
+import statistics
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from membership.fingerprints import FingerprintIndex
+
+
+class Command(BaseCommand):
+    help = "Benchmark fingerprint identification against synthetic in-memory indexes of enrolled members."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, nargs='+', default=[10000, 100000])
+        parser.add_argument('--probes', type=int, default=100)
+        parser.add_argument('--noise', type=float, default=0.1, help="Fraction of probe bits flipped")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        template_bytes = settings.FINGERPRINT_TEMPLATE_BYTES
+        bits = template_bytes * 8
+
+        for members in options['members']:
+            templates = rng.integers(0, 256, size=(members, template_bytes), dtype=np.uint8)
+            index = FingerprintIndex(template_bytes)
+
+            start = time.perf_counter()
+            index.load(zip(range(1, members + 1), templates))
+            load_seconds = time.perf_counter() - start
+
+            timings, correct = [], 0
+            for _ in range(options['probes']):
+                target = int(rng.integers(0, members))
+                flips = rng.random(bits) < options['noise']
+                probe = templates[target] ^ np.packbits(flips)
+
+                start = time.perf_counter()
+                match = index.identify(probe, settings.FINGERPRINT_MATCH_MAX_DISTANCE)
+                timings.append(time.perf_counter() - start)
+                correct += match is not None and match[0] == target + 1
+
+            self.stdout.write(
+                f"{members:>7} members: load {load_seconds:.2f} s, "
+                f"index {index.templates.nbytes / 1024 / 1024:.1f} MiB, "
+                f"identify mean {statistics.mean(timings) * 1000:.2f} ms, "
+                f"p95 {sorted(timings)[int(len(timings) * 0.95) - 1] * 1000:.2f} ms, "
+                f"matched {correct}/{options['probes']}"
+            )
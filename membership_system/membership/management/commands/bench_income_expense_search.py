@@ -0,0 +1,89 @@
+import datetime
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from membership.filters import GymIncomeExpenseFilter
+from membership.models import GymIncomeExpense
+
+BENCH_SUPPLIER = 'bench_income_expense_search'
+# The global search as it was before typed search plans, for comparison
+LEGACY_FIELDS = [
+    'invoice_label', 'supplier_name', 'entry', 'payment_status', 'total_amount',
+    'receiver_id', 'invoice_date', 'delete_reason', 'mp_id',
+]
+DEFAULT_TERMS = ['1500', '249.99', '2024', '2024-03', '2024-03-15', '48213', 'rent']
+
+
+class Command(BaseCommand):
+    help = "Time gym_income_expense global search with typed search plans against the old icontains search."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--populate', type=int, default=0,
+                            help="Insert this many synthetic rows first (e.g. 1000000)")
+        parser.add_argument('--cleanup', action='store_true', help="Delete the synthetic rows afterwards")
+        parser.add_argument('--terms', nargs='+', default=DEFAULT_TERMS)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def populate(self, count, seed):
+        rng = random.Random(seed)
+        labels = ['Membership fee', 'Rent', 'Electricity', 'Equipment', 'Supplements', 'Salary']
+        start = datetime.date(2020, 1, 1)
+        batch = []
+        for number in range(count):
+            income = rng.random() < 0.7
+            batch.append(GymIncomeExpense(
+                invoice_type='income' if income else 'expense',
+                invoice_label=rng.choice(labels),
+                supplier_name=BENCH_SUPPLIER,
+                entry='[]',
+                payment_status=rng.choice(['Paid', 'Unpaid', 'Partially Paid']),
+                total_amount=round(rng.uniform(5, 5000), 2),
+                receiver_id=rng.randint(1, 50000),
+                invoice_date=start + datetime.timedelta(days=rng.randint(0, 5 * 365)),
+                is_active=1,
+                mp_id=str(number) if income else None,
+            ))
+            if len(batch) == 10000:
+                GymIncomeExpense.objects.bulk_create(batch)
+                batch = []
+        GymIncomeExpense.objects.bulk_create(batch)
+
+    def time_count(self, queryset, repeat):
+        runs, count = [], None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            count = queryset.count()
+            runs.append(time.perf_counter() - start)
+        return count, statistics.median(runs)
+
+    def handle(self, *args, **options):
+        if options['populate']:
+            start = time.perf_counter()
+            self.populate(options['populate'], options['seed'])
+            self.stdout.write(f"Inserted {options['populate']} rows in {time.perf_counter() - start:.1f} s")
+
+        queryset = GymIncomeExpense.objects.all()
+        self.stdout.write(f"gym_income_expense rows: {queryset.count()}")
+        for term in options['terms']:
+            legacy = Q()
+            for field in LEGACY_FIELDS:
+                legacy |= Q(**{f'{field}__icontains': term})
+            legacy_count, legacy_seconds = self.time_count(queryset.filter(legacy), options['repeat'])
+            request = Request(APIRequestFactory().get('/api/income-expense/', {'global_search': term}))
+            typed = GymIncomeExpenseFilter(request.query_params, queryset=queryset, request=request).qs
+            typed_count, typed_seconds = self.time_count(typed, options['repeat'])
+            self.stdout.write(
+                f"{term!r:>14}: icontains {legacy_seconds * 1000:8.1f} ms ({legacy_count} rows), "
+                f"typed {typed_seconds * 1000:8.1f} ms ({typed_count} rows)"
+            )
+
+        if options['cleanup']:
+            deleted, _ = GymIncomeExpense.objects.filter(supplier_name=BENCH_SUPPLIER).delete()
+            self.stdout.write(f"Deleted {deleted} synthetic rows")
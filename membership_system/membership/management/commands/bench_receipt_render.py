@@ -0,0 +1,70 @@
+import datetime
+import statistics
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand
+
+from membership.utils import ReceiptTemplate, get_receipt_template
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark receipt rendering: a template rebuilt for every receipt (the previous "
+        "behaviour), a shared template still ASCII85-encoding the logo, and the shared template."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        payment = SimpleNamespace(mp_id=1042, paid_amount=3500.0, created_date=datetime.date(2024, 11, 27))
+        member = SimpleNamespace(
+            first_name='Ali',
+            last_name='Khan',
+            membership_valid_from=datetime.date(2024, 11, 27),
+            membership_valid_to=datetime.date(2024, 12, 27),
+            membership_status='continue',
+        )
+
+        logo_path = finders.find('logo.jpg')
+        shared_ascii85 = ReceiptTemplate(logo_path, ascii85=True)
+
+        def render_legacy():
+            # Stylesheet, table styles and logo loaded per receipt, logo stream ASCII85-encoded
+            return ReceiptTemplate(logo_path, ascii85=True).render(payment, member)
+
+        def render_reused():
+            # Template reuse on its own: the logo is still ASCII85-encoded
+            return shared_ascii85.render(payment, member)
+
+        def render_shared():
+            return get_receipt_template().render(payment, member)
+
+        for label, render in [('before', render_legacy), ('reused', render_reused), ('after', render_shared)]:
+            render()  # warm up imports and caches
+
+            timings = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                render()
+                timings.append(time.perf_counter() - start)
+
+            # Allocations are measured in a separate pass, tracemalloc slows rendering down
+            tracemalloc.start()
+            peaks = []
+            for _ in range(min(iterations, 20)):
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+                render()
+                peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+            tracemalloc.stop()
+
+            self.stdout.write(
+                f"{label:>6}: mean {statistics.mean(timings) * 1000:.2f} ms, "
+                f"p95 {sorted(timings)[int(len(timings) * 0.95) - 1] * 1000:.2f} ms, "
+                f"peak allocated {statistics.mean(peaks) / 1024:.0f} KiB per receipt"
+            )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from membership.expiry import expire_memberships
+
+
+class Command(BaseCommand):
+    help = "Mark members whose membership_valid_to has passed as expired. Run daily from cron."
+
+    def handle(self, *args, **options):
+        expired = expire_memberships()
+        self.stdout.write(self.style.SUCCESS(f"Marked {expired} memberships as expired."))
@@ -0,0 +1,284 @@
+import base64
+import json
+import random
+import time
+from datetime import datetime, time as day_time, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+
+from membership.dashboard import invalidate_dashboard_summary
+from membership.index_advisor import HOT_INDEXES, create_index_sql, missing_indexes
+from membership.models import (
+    GymIncomeExpense, GymInout, GymMember, Membership, MembershipPayment, MembershipPaymentHistory,
+)
+from membership.rollups import backfill
+from membership.search import rebuild_index
+
+# Generated members are recognisable by this member_id prefix
+MEMBER_ID_PREFIX = 'GEN-'
+PLANS = [
+    # label, length in days, amount
+    ('Monthly', 30, 50),
+    ('Quarterly', 90, 135),
+    ('Half Yearly', 180, 250),
+    ('Yearly', 365, 450),
+]
+FIRST_NAMES = ['Ali', 'Sara', 'Omar', 'Ayesha', 'Bilal', 'Fatima', 'Hamza', 'Zainab', 'Usman', 'Hira',
+               'John', 'Maria', 'David', 'Emma', 'Lucas', 'Mia', 'Noah', 'Olivia', 'Ravi', 'Priya']
+LAST_NAMES = ['Khan', 'Ahmed', 'Malik', 'Hussain', 'Smith', 'Garcia', 'Brown', 'Patel', 'Sharma', 'Lee',
+              'Iqbal', 'Raza', 'Wilson', 'Lopez', 'Chaudhry', 'Sheikh', 'Taylor', 'Martin', 'Butt', 'Ali']
+CITIES = ['Lahore', 'Karachi', 'Islamabad', 'Dubai', 'London', 'Manchester', 'Toronto', 'Mumbai']
+EXPENSES = [('Rent', 2000, 4000), ('Electricity', 200, 900), ('Equipment', 100, 5000),
+            ('Salary', 800, 2500), ('Supplements', 50, 600), ('Cleaning', 50, 300)]
+PAYMENT_METHODS = ['Cash', 'Card', 'Bank Transfer']
+LEGACY_TABLES = [GymMember, Membership, MembershipPayment, MembershipPaymentHistory, GymIncomeExpense, GymInout]
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the legacy gym tables of a local database with synthetic members, membership plans, "
+        "payments, installments, income/expense entries and check-ins, scaled by --members."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=1000, help="Members to create (1k to 1M)")
+        parser.add_argument('--payments-per-member', type=float, default=2.0)
+        parser.add_argument('--checkins-per-member', type=float, default=10.0)
+        parser.add_argument('--expenses', type=int, default=None, help="Expense entries (default members / 10)")
+        parser.add_argument('--enrolled-share', type=float, default=0.9,
+                            help="Share of members with an enrolled fingerprint template")
+        parser.add_argument('--history-days', type=int, default=730, help="How far back memberships start")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--create-tables', action='store_true',
+                            help="Create the missing unmanaged tables and their indexes first (local databases only)")
+        parser.add_argument('--skip-derived', action='store_true',
+                            help="Don't rebuild the member search index and the monthly income/expense rollup")
+
+    def handle(self, *args, **options):
+        if options['create_tables']:
+            self.create_tables()
+        else:
+            with connection.cursor() as cursor:
+                tables = set(connection.introspection.table_names(cursor))
+            missing = [model._meta.db_table for model in LEGACY_TABLES if model._meta.db_table not in tables]
+            if missing:
+                raise CommandError(f"Missing tables {', '.join(missing)}; run with --create-tables on a local database")
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.today = timezone.localdate()
+        start = time.perf_counter()
+
+        plans = self.create_plans()
+        counts = self.generate(plans, options)
+        for table, count in counts.items():
+            self.stdout.write(f"{table}: {count} rows")
+
+        if not options['skip_derived']:
+            self.stdout.write(f"Indexed {rebuild_index(batch_size=self.batch_size)} members for search")
+            self.stdout.write(f"Wrote {backfill()} monthly rollup rows")
+        invalidate_dashboard_summary()
+        self.stdout.write(self.style.SUCCESS(f"Generated {sum(counts.values())} rows in {time.perf_counter() - start:.1f} s"))
+
+    def create_tables(self):
+        with connection.cursor() as cursor:
+            tables = set(connection.introspection.table_names(cursor))
+        with connection.schema_editor() as schema_editor:
+            for model in LEGACY_TABLES:
+                if model._meta.db_table not in tables:
+                    schema_editor.create_model(model)
+                    self.stdout.write(f"Created {model._meta.db_table}")
+        for spec in missing_indexes(connection, HOT_INDEXES):
+            with connection.cursor() as cursor:
+                cursor.execute(create_index_sql(spec, connection.vendor))
+            self.stdout.write(f"Created index {spec.name}")
+
+    def create_plans(self):
+        plans = []
+        for label, length, amount in PLANS:
+            plan, _ = Membership.objects.get_or_create(
+                membership_label=label,
+                defaults={
+                    'membership_class': label.lower().replace(' ', '-'),
+                    'membership_length': length,
+                    'membership_amount': amount,
+                    'signup_fee': 0,
+                    'created_date': self.today,
+                    'membership_description': f"{label} membership",
+                },
+            )
+            plans.append(plan)
+        return plans
+
+    def next_ids(self, model):
+        # Ids are assigned up front so related rows can refer to them on
+        # backends where bulk_create doesn't return primary keys (MySQL)
+        pk = model._meta.pk.name
+        return (model.objects.aggregate(last=Max(pk))['last'] or 0) + 1
+
+    def flush(self, batches, counts, force=False):
+        for model, rows in batches.items():
+            if rows and (force or len(rows) >= self.batch_size):
+                model.objects.bulk_create(rows, batch_size=self.batch_size)
+                counts[model._meta.db_table] += len(rows)
+                rows.clear()
+
+    def generate(self, plans, options):
+        rng = self.rng
+        member_pk = self.next_ids(GymMember)
+        mp_id = self.next_ids(MembershipPayment)
+        batches = {model: [] for model in LEGACY_TABLES if model is not Membership}
+        counts = {model._meta.db_table: 0 for model in batches}
+
+        for _ in range(options['members']):
+            plan = rng.choice(plans)
+            payments = self.random_count(options['payments_per_member'], minimum=1)
+            valid_from = self.today - timedelta(days=rng.randint(0, options['history_days']))
+
+            periods = []
+            for _ in range(payments):
+                periods.append((valid_from, valid_from + timedelta(days=plan.membership_length)))
+                valid_from = periods[-1][1] + timedelta(days=rng.choice([0, 0, 0, 7, 30]))
+            valid_to = periods[-1][1]
+            first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            member = GymMember(
+                id=member_pk,
+                activated=1,
+                role_name='member' if rng.random() < 0.95 else rng.choice(['staff_member', 'accountant']),
+                member_id=f'{MEMBER_ID_PREFIX}{member_pk}',
+                is_exist=1,
+                first_name=first_name,
+                last_name=last_name,
+                gender=rng.choice(['male', 'female']),
+                birth_date=self.today - timedelta(days=rng.randint(16 * 365, 60 * 365)),
+                city=rng.choice(CITIES),
+                mobile=f'03{rng.randint(0, 999999999):09d}',
+                email=f'{first_name}.{last_name}.{member_pk}@example.com'.lower(),
+                username=f'member{member_pk}',
+                selected_membership=str(plan.id),
+                membership_status='Continue' if valid_to >= self.today else 'Expired',
+                membership_valid_from=periods[0][0],
+                membership_valid_to=valid_to,
+                first_pay_date=periods[0][0],
+                created_date=periods[0][0],
+                alert_sent=0,
+                members_reg_number=f'{member_pk:010d}'[-10:],
+            )
+            if rng.random() < options['enrolled_share']:
+                member.fingerprint = base64.b64encode(rng.randbytes(settings.FINGERPRINT_TEMPLATE_BYTES)).decode()
+            batches[GymMember].append(member)
+
+            for start_date, end_date in periods:
+                mp_id = self.add_payment(batches, mp_id, member, plan, start_date, end_date)
+            self.add_checkins(batches, member, options['checkins_per_member'])
+
+            member_pk += 1
+            self.flush(batches, counts)
+
+        expenses = options['expenses'] if options['expenses'] is not None else options['members'] // 10
+        for _ in range(expenses):
+            label, low, high = rng.choice(EXPENSES)
+            amount = round(rng.uniform(low, high), 2)
+            batches[GymIncomeExpense].append(GymIncomeExpense(
+                invoice_type='expense',
+                invoice_label=label,
+                supplier_name=f'{label} supplier',
+                entry=json.dumps([{'entry': label, 'amount': amount}]),
+                payment_status='Paid',
+                total_amount=amount,
+                receiver_id=1,
+                invoice_date=self.today - timedelta(days=rng.randint(0, options['history_days'])),
+                is_active=1,
+            ))
+            self.flush(batches, counts)
+
+        self.flush(batches, counts, force=True)
+        return counts
+
+    def add_payment(self, batches, mp_id, member, plan, start_date, end_date):
+        rng = self.rng
+        amount = int(plan.membership_amount)
+        # Most payments are settled, some are part paid and show up as arrears
+        paid = amount if rng.random() < 0.85 else rng.randint(0, amount - 1)
+        installments = self.split_amount(paid, rng.choice([1, 1, 1, 2, 3]))
+        batches[MembershipPayment].append(MembershipPayment(
+            mp_id=mp_id,
+            member_id=member.id,
+            membership_id=plan.id,
+            membership_amount=amount,
+            paid_amount=sum(installments),
+            start_date=start_date,
+            end_date=end_date,
+            membership_status='Continue' if end_date >= self.today else 'Expired',
+            payment_status='Fully Paid' if paid == amount else 'Partially Paid',
+            created_date=start_date,
+            created_by=1,
+            signupfee=0,
+            is_active=1 if rng.random() < 0.98 else 0,
+        ))
+        for number, installment in enumerate(installments):
+            paid_by_date = min(start_date + timedelta(days=number * 7), self.today)
+            batches[MembershipPaymentHistory].append(MembershipPaymentHistory(
+                mp_id=mp_id,
+                amount=installment,
+                payment_method=rng.choice(PAYMENT_METHODS),
+                paid_by_date=paid_by_date,
+                created_by=1,
+                trasaction_id=f'TX{mp_id:08d}{number}',
+            ))
+        if paid:
+            batches[GymIncomeExpense].append(GymIncomeExpense(
+                invoice_type='income',
+                invoice_label='Membership fee',
+                supplier_name=f'{member.first_name} {member.last_name}',
+                entry=json.dumps([{'entry': plan.membership_label, 'amount': paid}]),
+                payment_status='Paid' if paid == amount else 'Partially Paid',
+                total_amount=paid,
+                receiver_id=member.id,
+                invoice_date=start_date,
+                is_active=1,
+                mp_id=str(mp_id),
+            ))
+        return mp_id + 1
+
+    def add_checkins(self, batches, member, per_member):
+        rng = self.rng
+        first_day = max(member.membership_valid_from, self.today - timedelta(days=180))
+        last_day = min(member.membership_valid_to, self.today)
+        if last_day < first_day:
+            return
+        days = (last_day - first_day).days
+        in_times = set()
+        for _ in range(self.random_count(per_member)):
+            day = first_day + timedelta(days=rng.randint(0, days))
+            in_time = timezone.make_aware(datetime.combine(day, day_time(rng.randint(6, 21), rng.randint(0, 59))))
+            # gym_inout allows one check-in per member and instant
+            if in_time in in_times:
+                continue
+            in_times.add(in_time)
+            # A few visits are still open (no check-out recorded)
+            out_time = in_time + timedelta(minutes=rng.randint(30, 150)) if rng.random() < 0.98 else None
+            batches[GymInout].append(GymInout(
+                member_id=member.member_id,
+                member_reg_code=member.members_reg_number,
+                in_time=in_time,
+                out_time=out_time,
+            ))
+
+    def random_count(self, mean, minimum=0):
+        """A random count spread evenly around `mean`, at least `minimum`."""
+        whole = int(mean)
+        count = whole + (1 if self.rng.random() < mean - whole else 0)
+        return max(minimum, self.rng.randint(0, 2 * count) if count else 0)
+
+    def split_amount(self, amount, parts):
+        if amount <= 0:
+            return []
+        parts = min(parts, amount)
+        cuts = sorted(self.rng.sample(range(1, amount), parts - 1)) if parts > 1 else []
+        return [high - low for low, high in zip([0, *cuts], [*cuts, amount])]
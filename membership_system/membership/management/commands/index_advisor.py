@@ -0,0 +1,63 @@
+import os
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+
+from membership.index_advisor import create_index_sql, inspect_indexes, migration_source
+
+VENDORS = ['mysql', 'postgresql', 'sqlite']
+
+
+class Command(BaseCommand):
+    help = (
+        "Check the indexes the viewsets, filters and jobs rely on against the live schema of the "
+        "unmanaged tables, and optionally write a reversible migration creating the missing ones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sql', action='store_true', help="Print the DDL for the missing indexes")
+        parser.add_argument('--write-migration', action='store_true',
+                            help="Write a RunSQL migration for the missing indexes into membership/migrations")
+        parser.add_argument('--vendor', choices=VENDORS, default=None,
+                            help="Backend to generate DDL for (defaults to the connected database)")
+        parser.add_argument('--name', default='index_advisor', help="Name of the written migration")
+
+    def handle(self, *args, **options):
+        vendor = options['vendor'] or connection.vendor
+        report = inspect_indexes(connection)
+        for spec, status, detail in report:
+            columns = ', '.join(spec.columns)
+            line = f"{spec.table} ({columns}): {status}"
+            if detail:
+                line += f" as {detail}"
+            self.stdout.write(f"{line}\n    used by {spec.used_by}")
+
+        missing = [spec for spec, status, _ in report if status == 'missing']
+        if not missing:
+            self.stdout.write(self.style.SUCCESS("No missing indexes."))
+            return
+        self.stdout.write(self.style.WARNING(f"{len(missing)} missing indexes."))
+
+        if options['sql']:
+            for spec in missing:
+                self.stdout.write(f"{create_index_sql(spec, vendor)};")
+
+        if options['write_migration']:
+            self.write_migration(missing, vendor, options['name'])
+
+    def write_migration(self, specs, vendor, name):
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        leaves = loader.graph.leaf_nodes('membership')
+        if len(leaves) != 1:
+            raise CommandError(f"Expected one latest membership migration, found {leaves}")
+        dependency = leaves[0]
+        number = int(dependency[1].split('_', 1)[0]) + 1
+        migrations_dir = os.path.join(apps.get_app_config('membership').path, 'migrations')
+        path = os.path.join(migrations_dir, f"{number:04d}_{name}.py")
+        if os.path.exists(path):
+            raise CommandError(f"{path} already exists")
+        with open(path, 'w') as migration_file:
+            migration_file.write(migration_source(specs, vendor, dependency))
+        self.stdout.write(self.style.SUCCESS(f"Wrote {path}"))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from membership.ledger import reconcile_paid_amounts, unreconciled_payments
+
+
+class Command(BaseCommand):
+    help = (
+        "Set membership_payment.paid_amount to the installment total of every payment whose "
+        "membership_payment_history rows disagree with it. Run once after deploying, then daily "
+        "while other applications still write installments."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help="Only count the payments that would change")
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            self.stdout.write(f"{unreconciled_payments().count()} payments disagree with their installments.")
+            return
+        corrected = reconcile_paid_amounts(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Corrected paid_amount of {corrected} payments."))
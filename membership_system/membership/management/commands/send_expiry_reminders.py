@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from membership.reminders import send_expiry_reminders
+
+
+class Command(BaseCommand):
+    help = "Message members whose membership expires within a GeneralSetting.reminder_days window. Run daily from cron."
+
+    def handle(self, *args, **options):
+        sent = send_expiry_reminders()
+        self.stdout.write(self.style.SUCCESS(f"Sent {sent} expiry reminders."))
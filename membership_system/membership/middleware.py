@@ -0,0 +1,153 @@
+import heapq
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('membership.queries')
+
+# Longest SQL kept for a logged slow statement
+SQL_LOG_LENGTH = 500
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryProfile:
+    """
+    A connection execute wrapper recording how many statements ran, their total
+    time and the slowest ones. Parameters are never kept, only the SQL.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.total += duration
+            self.statements.append((duration, sql))
+
+    def slowest(self, limit):
+        return heapq.nlargest(limit, self.statements, key=lambda statement: statement[0])
+
+
+def get_query_budget(view_func, method):
+    """
+    The `query_budget` a view declares for a request method: an int, or a dict
+    keyed by viewset action (list, retrieve, create, ...) or, on plain views,
+    by lowercase method. None when it declares none.
+    """
+    view_class = getattr(view_func, 'cls', None)
+    budget = getattr(view_class or view_func, 'query_budget', None)
+    if isinstance(budget, dict):
+        # Router views map request methods to viewset actions
+        actions = getattr(view_func, 'actions', None) or {}
+        return budget.get(actions.get(method.lower(), method.lower()))
+    return budget
+
+
+class QueryProfilerMiddleware:
+    """
+    Counts and times the SQL each request runs on every database connection.
+    Adds a `Server-Timing` header (db, app), logs one JSON line per request to
+    the `membership.queries` logger and checks the view's `query_budget`:
+    going over is logged as a warning, or raises QueryBudgetExceeded when
+    QUERY_BUDGET_STRICT is on (meant for test and CI runs).
+
+    Database connections belong to a thread. Under ASGI the wrapper is
+    installed in the request's thread-sensitive worker thread, which runs the
+    sync views and the sync_to_async database calls of async views, so both
+    are profiled. Queries made while a streaming response is being sent (the
+    check-in stream) run after the response leaves and aren't counted.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.QUERY_PROFILER_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        profile = QueryProfile()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            self.wrap_connections(stack, profile)
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+        return self.finish(request, response, profile, elapsed)
+
+    async def __acall__(self, request):
+        profile = QueryProfile()
+        start = time.perf_counter()
+        stack = ExitStack()
+        await sync_to_async(self.wrap_connections)(stack, profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            # Unwound in the worker thread whose connections were wrapped
+            await sync_to_async(stack.close)()
+        elapsed = time.perf_counter() - start
+        return self.finish(request, response, profile, elapsed)
+
+    def wrap_connections(self, stack, profile):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(profile))
+
+    def finish(self, request, response, profile, elapsed):
+        response['Server-Timing'] = (
+            f'db;dur={profile.total * 1000:.1f};desc="{profile.count} queries", app;dur={elapsed * 1000:.1f}'
+        )
+        self.report(request, response, profile, elapsed)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget = get_query_budget(view_func, request.method)
+
+    def report(self, request, response, profile, elapsed):
+        budget = getattr(request, '_query_budget', None)
+        over_budget = budget is not None and profile.count > budget
+        slow_seconds = settings.QUERY_PROFILER_SLOW_SQL_MS / 1000
+        slowest = profile.slowest(settings.QUERY_PROFILER_TOP_STATEMENTS)
+        level = logging.WARNING if over_budget or (slowest and slowest[0][0] >= slow_seconds) else logging.INFO
+
+        if logger.isEnabledFor(level):
+            resolver_match = getattr(request, 'resolver_match', None)
+            logger.log(level, json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'view': resolver_match.view_name if resolver_match else None,
+                'status': response.status_code,
+                'queries': profile.count,
+                'query_budget': budget,
+                'db_ms': round(profile.total * 1000, 1),
+                'total_ms': round(elapsed * 1000, 1),
+                'slowest': [
+                    {'ms': round(duration * 1000, 1), 'sql': sql[:SQL_LOG_LENGTH]}
+                    for duration, sql in slowest
+                ],
+            }))
+
+        if over_budget and settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(
+                f"{request.method} {request.path} ran {profile.count} queries, over its budget of {budget}"
+            )
@@ -0,0 +1,50 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("membership", "0005_alter_memberdata_membership"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GymMemberSearchDocument",
+            fields=[
+                ("member_id", models.IntegerField(primary_key=True, serialize=False)),
+                ("search_text", models.CharField(max_length=500)),
+            ],
+            options={
+                "db_table": "gym_member_search_document",
+            },
+        ),
+        migrations.CreateModel(
+            name="GymMemberSearchToken",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("member_id", models.IntegerField()),
+                ("token", models.CharField(max_length=3)),
+            ],
+            options={
+                "db_table": "gym_member_search_token",
+                "indexes": [
+                    models.Index(
+                        fields=["member_id"], name="gym_member_search_member_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("token", "member_id"),
+                        name="gym_member_search_token_uniq",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("membership", "0006_gymmembersearchdocument_gymmembersearchtoken"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GymIncomeExpenseMonthly",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.IntegerField()),
+                ("month", models.IntegerField()),
+                ("total_revenue", models.FloatField(default=0)),
+                ("total_expenses", models.FloatField(default=0)),
+                ("profit", models.FloatField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "db_table": "gym_income_expense_monthly",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("year", "month"), name="gym_income_expense_monthly_uniq"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("membership", "0007_gymincomeexpensemonthly"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FingerModeState",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("device_id", models.CharField(max_length=64, unique=True)),
+                ("mode", models.CharField(max_length=20)),
+                (
+                    "member_id",
+                    models.CharField(blank=True, max_length=100, null=True),
+                ),
+                ("version", models.PositiveIntegerField(default=0)),
+                ("expires_at", models.DateTimeField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "db_table": "finger_mode_state",
+            },
+        ),
+    ]
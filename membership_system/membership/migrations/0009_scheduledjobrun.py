@@ -0,0 +1,64 @@
+from django.db import migrations, models
+
+MEMBER_TABLE = "gym_member"
+MEMBER_VALID_TO_INDEX = "gym_member_valid_to_idx"
+
+
+def _member_index_exists(schema_editor):
+    """None when gym_member doesn't exist, else whether the index is there."""
+    # gym_member is unmanaged and not part of the migration state, so it is
+    # addressed by table name and only indexed where the table exists
+    introspection = schema_editor.connection.introspection
+    with schema_editor.connection.cursor() as cursor:
+        if MEMBER_TABLE not in introspection.table_names(cursor):
+            return None
+        return MEMBER_VALID_TO_INDEX in introspection.get_constraints(cursor, MEMBER_TABLE)
+
+
+def add_member_valid_to_index(apps, schema_editor):
+    if _member_index_exists(schema_editor) is False:
+        quote = schema_editor.quote_name
+        schema_editor.execute(
+            f"CREATE INDEX {quote(MEMBER_VALID_TO_INDEX)} "
+            f"ON {quote(MEMBER_TABLE)} ({quote('membership_valid_to')})"
+        )
+
+
+def remove_member_valid_to_index(apps, schema_editor):
+    if _member_index_exists(schema_editor):
+        quote = schema_editor.quote_name
+        schema_editor.execute(
+            schema_editor.sql_delete_index
+            % {"name": quote(MEMBER_VALID_TO_INDEX), "table": quote(MEMBER_TABLE)}
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("membership", "0008_fingermodestate"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScheduledJobRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100, unique=True)),
+                ("last_started_at", models.DateTimeField()),
+                ("last_finished_at", models.DateTimeField(blank=True, null=True)),
+                ("rows_affected", models.IntegerField(default=0)),
+            ],
+            options={
+                "db_table": "scheduled_job_run",
+            },
+        ),
+        migrations.RunPython(add_member_valid_to_index, remove_member_valid_to_index),
+    ]
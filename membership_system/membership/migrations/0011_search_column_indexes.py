@@ -0,0 +1,52 @@
+from django.db import migrations
+
+# (table, column, index name) on unmanaged legacy tables used by the typed
+# global search filters and the payment ledger join
+INDEXES = [
+    ("gym_income_expense", "invoice_date", "gym_income_expense_invoice_date_idx"),
+    ("gym_income_expense", "total_amount", "gym_income_expense_total_amount_idx"),
+    ("gym_income_expense", "receiver_id", "gym_income_expense_receiver_id_idx"),
+    ("gym_income_expense", "mp_id", "gym_income_expense_mp_id_idx"),
+    ("membership_payment", "created_date", "membership_payment_created_date_idx"),
+    ("membership_payment", "member_id", "membership_payment_member_id_idx"),
+    ("membership_payment_history", "mp_id", "membership_payment_history_mp_id_idx"),
+]
+
+
+def _existing_indexes(schema_editor):
+    """{table: set of constraint names} for the tables in INDEXES that exist."""
+    # The tables are unmanaged, so they're addressed by name and skipped where missing
+    introspection = schema_editor.connection.introspection
+    with schema_editor.connection.cursor() as cursor:
+        tables = set(introspection.table_names(cursor))
+        return {
+            table: set(introspection.get_constraints(cursor, table))
+            for table in {table for table, _, _ in INDEXES}
+            if table in tables
+        }
+
+
+def add_indexes(apps, schema_editor):
+    existing = _existing_indexes(schema_editor)
+    quote = schema_editor.quote_name
+    for table, column, name in INDEXES:
+        if table in existing and name not in existing[table]:
+            schema_editor.execute(f"CREATE INDEX {quote(name)} ON {quote(table)} ({quote(column)})")
+
+
+def remove_indexes(apps, schema_editor):
+    existing = _existing_indexes(schema_editor)
+    quote = schema_editor.quote_name
+    for table, column, name in INDEXES:
+        if name in existing.get(table, ()):
+            schema_editor.execute(schema_editor.sql_delete_index % {"name": quote(name), "table": quote(table)})
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("membership", "0010_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_indexes, remove_indexes),
+    ]
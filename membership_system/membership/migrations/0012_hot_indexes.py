@@ -0,0 +1,85 @@
+from django.db import migrations
+
+# The hot indexes not already added by 0009 and 0011, as (table, columns, name)
+INDEXES = [
+    ("gym_member", ("role_name", "membership_status"), "gym_member_role_status_idx"),
+    ("gym_member", ("members_reg_number",), "gym_member_reg_number_idx"),
+    ("gym_inout", ("member_reg_code", "in_time"), "gym_inout_reg_code_in_time_idx"),
+    ("gym_income_expense", ("invoice_type", "invoice_date"), "gym_income_expense_type_date_idx"),
+]
+# TEXT columns get a prefix on MySQL, the TEXT_PREFIX_LENGTH of index_advisor
+TEXT_COLUMNS = {("gym_member", "role_name"), ("gym_member", "membership_status")}
+TEXT_PREFIX_LENGTH = 191
+
+
+def _existing_indexes(schema_editor):
+    """{table: constraints} for the tables of INDEXES that exist; the unmanaged tables may not."""
+    introspection = schema_editor.connection.introspection
+    with schema_editor.connection.cursor() as cursor:
+        tables = set(introspection.table_names(cursor))
+        return {
+            table: introspection.get_constraints(cursor, table)
+            for table in {table for table, _, _ in INDEXES}
+            if table in tables
+        }
+
+
+def _covered(constraints, columns):
+    return any(
+        (constraint["index"] or constraint["unique"] or constraint["primary_key"])
+        and tuple(constraint["columns"][:len(columns)]) == columns
+        for constraint in constraints.values()
+    )
+
+
+def add_indexes(apps, schema_editor):
+    # Tables that don't exist are skipped, as are columns an index already covers
+    vendor = schema_editor.connection.vendor
+    quote = schema_editor.quote_name
+    existing = _existing_indexes(schema_editor)
+    for table, columns, name in INDEXES:
+        if table not in existing or _covered(existing[table], columns):
+            continue
+        parts = []
+        for column in columns:
+            part = quote(column)
+            if vendor == "mysql" and (table, column) in TEXT_COLUMNS:
+                part += f"({TEXT_PREFIX_LENGTH})"
+            parts.append(part)
+        column_sql = ", ".join(parts)
+        if vendor == "mysql":
+            sql = f"ALTER TABLE {quote(table)} ADD INDEX {quote(name)} ({column_sql}), ALGORITHM=INPLACE, LOCK=NONE"
+        elif vendor == "postgresql":
+            sql = f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {quote(name)} ON {quote(table)} ({column_sql})"
+        else:
+            sql = f"CREATE INDEX IF NOT EXISTS {quote(name)} ON {quote(table)} ({column_sql})"
+        schema_editor.execute(sql)
+
+
+def remove_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    quote = schema_editor.quote_name
+    existing = _existing_indexes(schema_editor)
+    for table, _, name in INDEXES:
+        if name not in existing.get(table, {}):
+            continue
+        if vendor == "mysql":
+            sql = f"ALTER TABLE {quote(table)} DROP INDEX {quote(name)}, ALGORITHM=INPLACE, LOCK=NONE"
+        elif vendor == "postgresql":
+            sql = f"DROP INDEX CONCURRENTLY IF EXISTS {quote(name)}"
+        else:
+            sql = f"DROP INDEX IF EXISTS {quote(name)}"
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+    # Online index builds can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("membership", "0011_search_column_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_indexes, remove_indexes),
+    ]
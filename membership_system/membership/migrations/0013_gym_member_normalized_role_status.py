@@ -0,0 +1,107 @@
+from django.db import migrations
+
+MEMBER_TABLE = "gym_member"
+# (generated column, source column); the values are LOWER(source)
+NORMALIZED_COLUMNS = [
+    ("role_name_norm", "role_name"),
+    ("membership_status_norm", "membership_status"),
+]
+NORMALIZED_INDEX = "gym_member_role_status_norm_idx"
+# 0012's index on the raw columns, which the lowercase lookups can't use
+RAW_INDEX = "gym_member_role_status_idx"
+
+
+def _member_state(schema_editor):
+    """None when gym_member doesn't exist, else (column names, index names)."""
+    introspection = schema_editor.connection.introspection
+    with schema_editor.connection.cursor() as cursor:
+        if MEMBER_TABLE not in introspection.table_names(cursor):
+            return None
+        columns = {column.name for column in introspection.get_table_description(cursor, MEMBER_TABLE)}
+        return columns, set(introspection.get_constraints(cursor, MEMBER_TABLE))
+
+
+def _create_index(schema_editor, name, column_sql):
+    quote = schema_editor.quote_name
+    vendor = schema_editor.connection.vendor
+    if vendor == "mysql":
+        sql = f"ALTER TABLE {quote(MEMBER_TABLE)} ADD INDEX {quote(name)} ({column_sql}), ALGORITHM=INPLACE, LOCK=NONE"
+    elif vendor == "postgresql":
+        sql = f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {quote(name)} ON {quote(MEMBER_TABLE)} ({column_sql})"
+    else:
+        sql = f"CREATE INDEX IF NOT EXISTS {quote(name)} ON {quote(MEMBER_TABLE)} ({column_sql})"
+    schema_editor.execute(sql)
+
+
+def _drop_index(schema_editor, name):
+    quote = schema_editor.quote_name
+    vendor = schema_editor.connection.vendor
+    if vendor == "mysql":
+        sql = f"ALTER TABLE {quote(MEMBER_TABLE)} DROP INDEX {quote(name)}, ALGORITHM=INPLACE, LOCK=NONE"
+    elif vendor == "postgresql":
+        sql = f"DROP INDEX CONCURRENTLY IF EXISTS {quote(name)}"
+    else:
+        sql = f"DROP INDEX IF EXISTS {quote(name)}"
+    schema_editor.execute(sql)
+
+
+def _add_column_sql(schema_editor, column, source):
+    quote = schema_editor.quote_name
+    vendor = schema_editor.connection.vendor
+    # Virtual columns are added without rewriting the table on MySQL and SQLite;
+    # PostgreSQL only has stored generated columns
+    storage = "STORED" if vendor == "postgresql" else "VIRTUAL"
+    sql = (
+        f"ALTER TABLE {quote(MEMBER_TABLE)} ADD COLUMN {quote(column)} varchar(100) "
+        f"GENERATED ALWAYS AS (LOWER({quote(source)})) {storage}"
+    )
+    if vendor == "mysql":
+        sql += ", ALGORITHM=INPLACE, LOCK=NONE"
+    return sql
+
+
+def add_normalized_columns(apps, schema_editor):
+    state = _member_state(schema_editor)
+    if state is None:
+        return
+    columns, indexes = state
+    quote = schema_editor.quote_name
+    for column, source in NORMALIZED_COLUMNS:
+        if column not in columns:
+            schema_editor.execute(_add_column_sql(schema_editor, column, source))
+
+    if NORMALIZED_INDEX not in indexes:
+        _create_index(schema_editor, NORMALIZED_INDEX, ", ".join(quote(column) for column, _ in NORMALIZED_COLUMNS))
+    if RAW_INDEX in indexes:
+        _drop_index(schema_editor, RAW_INDEX)
+
+
+def remove_normalized_columns(apps, schema_editor):
+    state = _member_state(schema_editor)
+    if state is None:
+        return
+    columns, indexes = state
+    quote = schema_editor.quote_name
+    if NORMALIZED_INDEX in indexes:
+        _drop_index(schema_editor, NORMALIZED_INDEX)
+    if RAW_INDEX not in indexes:
+        # Rebuilt the way 0012 built it, with its prefix on MySQL's TEXT columns
+        prefix = "(191)" if schema_editor.connection.vendor == "mysql" else ""
+        _create_index(schema_editor, RAW_INDEX, ", ".join(f"{quote(source)}{prefix}" for _, source in NORMALIZED_COLUMNS))
+
+    for column, _ in NORMALIZED_COLUMNS:
+        if column in columns:
+            schema_editor.execute(f"ALTER TABLE {quote(MEMBER_TABLE)} DROP COLUMN {quote(column)}")
+
+
+class Migration(migrations.Migration):
+    # The column and index changes run online, as 0012's do
+    atomic = False
+
+    dependencies = [
+        ("membership", "0012_hot_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_normalized_columns, remove_normalized_columns),
+    ]
@@ -0,0 +1,63 @@
+from django.db import migrations
+
+# Single-column index behind the newest-first check-in list and its
+# ?cursor= pagination (GymInoutViewSet orders by -in_time)
+TABLE = "gym_inout"
+INDEX = "gym_inout_in_time_idx"
+
+
+def _index_state(schema_editor):
+    """None when the unmanaged table is missing, else (index exists, in_time already leads an index)."""
+    introspection = schema_editor.connection.introspection
+    with schema_editor.connection.cursor() as cursor:
+        if TABLE not in introspection.table_names(cursor):
+            return None
+        constraints = introspection.get_constraints(cursor, TABLE)
+    covered = any(
+        (constraint["index"] or constraint["unique"]) and constraint["columns"][:1] == ["in_time"]
+        for constraint in constraints.values()
+    )
+    return INDEX in constraints, covered
+
+
+def add_index(apps, schema_editor):
+    state = _index_state(schema_editor)
+    if state is None or state[1]:
+        return
+    vendor = schema_editor.connection.vendor
+    quote = schema_editor.quote_name
+    if vendor == "mysql":
+        sql = f"ALTER TABLE {quote(TABLE)} ADD INDEX {quote(INDEX)} ({quote('in_time')}), ALGORITHM=INPLACE, LOCK=NONE"
+    elif vendor == "postgresql":
+        sql = f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {quote(INDEX)} ON {quote(TABLE)} ({quote('in_time')})"
+    else:
+        sql = f"CREATE INDEX IF NOT EXISTS {quote(INDEX)} ON {quote(TABLE)} ({quote('in_time')})"
+    schema_editor.execute(sql)
+
+
+def remove_index(apps, schema_editor):
+    state = _index_state(schema_editor)
+    if state is None or not state[0]:
+        return
+    vendor = schema_editor.connection.vendor
+    quote = schema_editor.quote_name
+    if vendor == "mysql":
+        sql = f"ALTER TABLE {quote(TABLE)} DROP INDEX {quote(INDEX)}, ALGORITHM=INPLACE, LOCK=NONE"
+    elif vendor == "postgresql":
+        sql = f"DROP INDEX CONCURRENTLY IF EXISTS {quote(INDEX)}"
+    else:
+        sql = f"DROP INDEX IF EXISTS {quote(INDEX)}"
+    schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+    # Built online like 0012's indexes
+    atomic = False
+
+    dependencies = [
+        ("membership", "0013_gym_member_normalized_role_status"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_index, remove_index),
+    ]
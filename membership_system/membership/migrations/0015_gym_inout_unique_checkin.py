@@ -0,0 +1,92 @@
+import warnings
+
+from django.db import migrations
+
+# One check-in per member and instant: makes concurrent /api/inout/bulk/ replays
+# of the same scanner backlog unable to insert a row twice. It replaces the plain
+# (member_reg_code, in_time) index added by 0012, which it serves for lookups.
+TABLE = "gym_inout"
+COLUMNS = ("member_reg_code", "in_time")
+UNIQUE_INDEX = "gym_inout_reg_code_in_time_uniq"
+PLAIN_INDEX = "gym_inout_reg_code_in_time_idx"
+
+
+def _constraints(schema_editor):
+    """None when the unmanaged table is missing, else its constraints by name."""
+    introspection = schema_editor.connection.introspection
+    with schema_editor.connection.cursor() as cursor:
+        if TABLE not in introspection.table_names(cursor):
+            return None
+        return introspection.get_constraints(cursor, TABLE)
+
+
+def _has_duplicates(schema_editor):
+    quote = schema_editor.quote_name
+    columns = ", ".join(quote(column) for column in COLUMNS)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT 1 FROM {quote(TABLE)} WHERE {quote('in_time')} IS NOT NULL "
+            f"GROUP BY {columns} HAVING COUNT(*) > 1 LIMIT 1"
+        )
+        return cursor.fetchone() is not None
+
+
+def _create_sql(schema_editor, name, unique):
+    vendor = schema_editor.connection.vendor
+    quote = schema_editor.quote_name
+    columns = ", ".join(quote(column) for column in COLUMNS)
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    if vendor == "mysql":
+        return f"ALTER TABLE {quote(TABLE)} ADD {kind} {quote(name)} ({columns}), ALGORITHM=INPLACE, LOCK=NONE"
+    if vendor == "postgresql":
+        return f"CREATE {kind} CONCURRENTLY IF NOT EXISTS {quote(name)} ON {quote(TABLE)} ({columns})"
+    return f"CREATE {kind} IF NOT EXISTS {quote(name)} ON {quote(TABLE)} ({columns})"
+
+
+def _drop_sql(schema_editor, name):
+    vendor = schema_editor.connection.vendor
+    quote = schema_editor.quote_name
+    if vendor == "mysql":
+        return f"ALTER TABLE {quote(TABLE)} DROP INDEX {quote(name)}, ALGORITHM=INPLACE, LOCK=NONE"
+    if vendor == "postgresql":
+        return f"DROP INDEX CONCURRENTLY IF EXISTS {quote(name)}"
+    return f"DROP INDEX IF EXISTS {quote(name)}"
+
+
+def add_unique_index(apps, schema_editor):
+    constraints = _constraints(schema_editor)
+    if constraints is None or UNIQUE_INDEX in constraints:
+        return
+    if _has_duplicates(schema_editor):
+        # Leave the data and the plain index alone; `manage.py index_advisor` keeps
+        # reporting the unique index as missing until the duplicates are resolved
+        warnings.warn(
+            f"{TABLE} has several check-ins for the same member_reg_code and in_time; "
+            f"{UNIQUE_INDEX} was not created"
+        )
+        return
+    schema_editor.execute(_create_sql(schema_editor, UNIQUE_INDEX, unique=True))
+    if PLAIN_INDEX in constraints:
+        schema_editor.execute(_drop_sql(schema_editor, PLAIN_INDEX))
+
+
+def remove_unique_index(apps, schema_editor):
+    constraints = _constraints(schema_editor)
+    if constraints is None or UNIQUE_INDEX not in constraints:
+        return
+    if PLAIN_INDEX not in constraints:
+        schema_editor.execute(_create_sql(schema_editor, PLAIN_INDEX, unique=False))
+    schema_editor.execute(_drop_sql(schema_editor, UNIQUE_INDEX))
+
+
+class Migration(migrations.Migration):
+    # The unique index replaces the plain one online, as in 0012
+    atomic = False
+
+    dependencies = [
+        ("membership", "0014_gym_inout_in_time_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_unique_index, remove_unique_index),
+    ]
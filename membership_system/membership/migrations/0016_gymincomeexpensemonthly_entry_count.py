@@ -0,0 +1,42 @@
+import datetime
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def count_entries(apps, schema_editor):
+    # Rollup rows written before the count existed get it from the rows of their month
+    GymIncomeExpenseMonthly = apps.get_model("membership", "GymIncomeExpenseMonthly")
+    connection = schema_editor.connection
+    quote = schema_editor.quote_name
+    with connection.cursor() as cursor:
+        if "gym_income_expense" not in connection.introspection.table_names(cursor):
+            return
+        cursor.execute(
+            f"SELECT {quote('invoice_date')}, COUNT(*) FROM {quote('gym_income_expense')} "
+            f"WHERE {quote('invoice_date')} IS NOT NULL "
+            f"AND ({quote('is_Active')} IS NULL OR {quote('is_Active')} <> 0) "
+            f"GROUP BY {quote('invoice_date')}"
+        )
+        counts = Counter()
+        for invoice_date, count in cursor.fetchall():
+            if not isinstance(invoice_date, datetime.date):
+                invoice_date = datetime.date.fromisoformat(str(invoice_date)[:10])
+            counts[invoice_date.year, invoice_date.month] += count
+    for row in GymIncomeExpenseMonthly.objects.all():
+        GymIncomeExpenseMonthly.objects.filter(pk=row.pk).update(entry_count=counts[row.year, row.month])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("membership", "0015_gym_inout_unique_checkin"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="gymincomeexpensemonthly",
+            name="entry_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_entries, migrations.RunPython.noop),
+    ]
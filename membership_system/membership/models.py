@@ -72,6 +72,8 @@
 # Feel free to rename the models, but don't rename db_table values or field names.
 
 from django.db import models
+from django.db.models.functions import Lower
+from django.utils import timezone
 
 
 class Activity(models.Model):
@@ -244,7 +246,7 @@ class GymAttendance(models.Model):
     attendance_id = models.AutoField(primary_key=True)
     user_id = models.IntegerField(blank=True, null=True)
     class_id = models.IntegerField(blank=True, null=True)
-    attendance_date = models.DateField(blank=True, null=True, auto_now_add=True)
+    attendance_date = models.DateField(blank=True, null=True, default=timezone.localdate)
     status = models.CharField(max_length=50, blank=True, null=True)
     attendance_by = models.IntegerField(blank=True, null=True)
     role_name = models.CharField(max_length=50, blank=True, null=True)
@@ -405,6 +407,15 @@ class GymMember(models.Model):
     alert_send_date = models.DateField(blank=True, null=True)
     members_reg_number = models.CharField(max_length=10, blank=True, null=True)
     fingerprint = models.TextField(db_column='FingerPrint', blank=True, null=True)  # Field name made lowercase.
+    # Lowercased copies of role_name and membership_status maintained by the
+    # database (added by migration 0013) so case-insensitive role and status
+    # filters are plain comparisons on an indexed column instead of LIKE/UPPER()
+    role_name_norm = models.GeneratedField(
+        expression=Lower('role_name'), output_field=models.CharField(max_length=100), db_persist=False
+    )
+    membership_status_norm = models.GeneratedField(
+        expression=Lower('membership_status'), output_field=models.CharField(max_length=100), db_persist=False
+    )
 
     class Meta:
         managed = False
@@ -657,6 +668,16 @@ class MembershipPayment(models.Model):
 class MembershipPaymentHistory(models.Model):
     payment_history_id = models.BigAutoField(primary_key=True)
     mp_id = models.IntegerField(blank=True, null=True)
+    # Join to the payment an installment belongs to, over the existing mp_id column
+    payment = models.ForeignObject(
+        MembershipPayment,
+        on_delete=models.DO_NOTHING,
+        from_fields=['mp_id'],
+        to_fields=['mp_id'],
+        related_name='installments',
+        blank=True,
+        null=True,
+    )
     amount = models.IntegerField(blank=True, null=True)
     payment_method = models.CharField(max_length=50, blank=True, null=True)
     paid_by_date = models.DateField(blank=True, null=True)
@@ -674,3 +695,87 @@ class Specialization(models.Model):
     class Meta:
         managed = False
         db_table = 'specialization'
+
+
+class GymMemberSearchDocument(models.Model):
+    """Normalized name/phone/email/username text for one gym_member row."""
+    member_id = models.IntegerField(primary_key=True)
+    search_text = models.CharField(max_length=500)
+
+    class Meta:
+        db_table = 'gym_member_search_document'
+
+
+class GymMemberSearchToken(models.Model):
+    """Trigram tokens of GymMemberSearchDocument.search_text, used to narrow member searches."""
+    member_id = models.IntegerField()
+    token = models.CharField(max_length=3)
+
+    class Meta:
+        db_table = 'gym_member_search_token'
+        constraints = [
+            models.UniqueConstraint(fields=['token', 'member_id'], name='gym_member_search_token_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['member_id'], name='gym_member_search_member_idx'),
+        ]
+
+
+class GymIncomeExpenseMonthly(models.Model):
+    """Revenue, expenses and profit of active gym_income_expense rows per invoice month."""
+    year = models.IntegerField()
+    month = models.IntegerField()
+    total_revenue = models.FloatField(default=0)
+    total_expenses = models.FloatField(default=0)
+    profit = models.FloatField(default=0)
+    # Rows counted in the month; the month is removed when its last one goes
+    entry_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'gym_income_expense_monthly'
+        constraints = [
+            models.UniqueConstraint(fields=['year', 'month'], name='gym_income_expense_monthly_uniq'),
+        ]
+
+
+class FingerModeState(models.Model):
+    """Current fingerprint scanner mode per device, shared by every worker process."""
+    device_id = models.CharField(max_length=64, unique=True)
+    mode = models.CharField(max_length=20)
+    member_id = models.CharField(max_length=100, blank=True, null=True)
+    version = models.PositiveIntegerField(default=0)
+    expires_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'finger_mode_state'
+
+
+class ScheduledJobRun(models.Model):
+    """When each scheduled management command last ran and how many rows it changed."""
+    name = models.CharField(max_length=100, unique=True)
+    last_started_at = models.DateTimeField()
+    last_finished_at = models.DateTimeField(blank=True, null=True)
+    rows_affected = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'scheduled_job_run'
+
+
+class IdempotencyKey(models.Model):
+    """
+    Response stored for an Idempotency-Key sent to a payment endpoint.
+    `key_hash` is the sha256 of the endpoint scope and the client's key, so rows
+    are fixed-size whatever the client sends. `status_code` is empty while the
+    first request is still running.
+    """
+    key_hash = models.CharField(max_length=64, unique=True)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(blank=True, null=True)
+    response_body = models.JSONField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = 'idempotency_key'
@@ -0,0 +1,48 @@
+import threading
+import time
+
+from django.conf import settings
+
+from .models import Membership
+
+_lock = threading.Lock()
+_plans = None
+_loaded_at = None
+
+
+def _load_plans():
+    """Every membership plan, keyed by membership_class and by membership_label."""
+    rows = list(Membership.objects.all())
+    plans = {plan.membership_class: plan for plan in rows if plan.membership_class}
+    # A plan's own label wins over another plan's class of the same name
+    plans.update({plan.membership_label: plan for plan in rows if plan.membership_label})
+    return plans
+
+
+def get_plans():
+    """
+    The membership table cached in this process. Writes through the membership
+    API clear it via signals; other processes pick them up within
+    MEMBERSHIP_PLAN_CACHE_TIMEOUT seconds.
+    """
+    global _plans, _loaded_at
+    with _lock:
+        if _plans is None or time.monotonic() - _loaded_at > settings.MEMBERSHIP_PLAN_CACHE_TIMEOUT:
+            _plans = _load_plans()
+            _loaded_at = time.monotonic()
+        return _plans
+
+
+def get_plan(name):
+    """The plan whose membership_label or membership_class is `name`, or None."""
+    return get_plans().get(name)
+
+
+def plan_names():
+    return sorted(get_plans())
+
+
+def invalidate_plans():
+    global _plans
+    with _lock:
+        _plans = None
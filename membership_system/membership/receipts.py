@@ -0,0 +1,170 @@
+import functools
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from types import SimpleNamespace
+
+import django
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from pypdf import PdfWriter
+
+from .models import GymMember, MembershipPayment
+from .utils import render_pdf_receipt
+
+logger = logging.getLogger(__name__)
+
+# Bump when the receipt layout changes so stored receipts are rendered again
+RECEIPT_TEMPLATE_VERSION = 1
+
+PAYMENT_FIELDS = ['mp_id', 'member_id', 'paid_amount', 'created_date']
+MEMBER_FIELDS = ['first_name', 'last_name', 'membership_valid_from', 'membership_valid_to', 'membership_status']
+
+# Receipts looked up in storage, and rendered when missing, per round of an export
+EXPORT_BATCH_SIZE = 200
+
+_executor = ThreadPoolExecutor(max_workers=settings.RECEIPT_RENDER_WORKERS, thread_name_prefix='receipt')
+
+
+def receipt_digest(payment, member):
+    """Hash of every value printed on the receipt."""
+    content = {
+        'version': RECEIPT_TEMPLATE_VERSION,
+        'payment': {field: getattr(payment, field) for field in PAYMENT_FIELDS},
+        'member': {field: getattr(member, field) for field in MEMBER_FIELDS},
+    }
+    encoded = json.dumps(content, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def receipt_path(payment, member):
+    return f"{settings.RECEIPT_STORAGE_PREFIX}/{payment.mp_id}/{receipt_digest(payment, member)}.pdf"
+
+
+def _read_stored(path):
+    """The stored receipt's bytes, or None when it isn't stored; one storage call instead of exists() + open()."""
+    try:
+        with default_storage.open(path, 'rb') as stored:
+            return stored.read()
+    except FileNotFoundError:
+        return None
+
+
+def get_receipt(payment, member):
+    """Return the receipt PDF bytes, rendering and storing it only if it isn't stored yet."""
+    path = receipt_path(payment, member)
+    pdf = _read_stored(path)
+    if pdf is not None:
+        return pdf
+
+    pdf = render_pdf_receipt(payment, member)
+    default_storage.save(path, ContentFile(pdf))
+    return pdf
+
+
+def _render_in_background(mp_id):
+    try:
+        payment = MembershipPayment.objects.filter(mp_id=mp_id).first()
+        member = payment and GymMember.objects.filter(id=payment.member_id).first()
+        if member is None:
+            logger.warning("Skipping receipt for payment %s: member not found", mp_id)
+            return
+        get_receipt(payment, member)
+    except Exception:
+        logger.exception("Rendering receipt for payment %s failed", mp_id)
+    finally:
+        close_old_connections()
+
+
+def queue_receipt(mp_id):
+    """Render and store a payment's receipt on a worker thread once the current transaction commits."""
+    transaction.on_commit(lambda: _executor.submit(_render_in_background, mp_id))
+
+
+@functools.lru_cache(maxsize=None)
+def _get_export_pool():
+    """
+    The process pool shared by every export, started on first use. Workers are
+    spawned, not forked: a fork could copy a lock, such as the receipt
+    renderer's, held by another thread at that moment and never released.
+    A spawned worker configures Django before it unpickles any task, since
+    importing this module needs the app registry.
+    """
+    return ProcessPoolExecutor(
+        max_workers=settings.RECEIPT_EXPORT_PROCESSES,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=django.setup,
+    )
+
+
+def _render_export_item(item):
+    payment, member = item
+    return payment.mp_id, render_pdf_receipt(payment, member)
+
+
+def _export_items(payments, members):
+    """
+    Yield (mp_id, pdf) in payment order, a batch at a time. Stored receipts are
+    read back; the rest are rendered on the export pool and stored for later
+    downloads and exports.
+    """
+    for start in range(0, len(payments), EXPORT_BATCH_SIZE):
+        batch = []
+        to_render = []
+        for payment in payments[start:start + EXPORT_BATCH_SIZE]:
+            member = members[payment.member_id]
+            path = receipt_path(payment, member)
+            pdf = _read_stored(path)
+            batch.append((payment.mp_id, path, pdf))
+            if pdf is None:
+                # Plain namespaces keep the per-receipt payload small and picklable
+                to_render.append((
+                    SimpleNamespace(**{field: getattr(payment, field) for field in PAYMENT_FIELDS}),
+                    SimpleNamespace(**{field: getattr(member, field) for field in MEMBER_FIELDS}),
+                ))
+
+        rendered = _get_export_pool().map(_render_export_item, to_render, chunksize=16) if to_render else iter(())
+        for mp_id, path, pdf in batch:
+            if pdf is None:
+                _, pdf = next(rendered)
+                default_storage.save(path, ContentFile(pdf))
+            yield mp_id, pdf
+
+
+def export_receipts(payments, export_format='zip'):
+    """
+    Collect the receipts of many payments into one ZIP archive or one merged PDF.
+    Members are loaded with a single query; receipts already in storage are reused
+    and the others are rendered on a process pool shared across requests.
+    Returns the export as a file object positioned at its start, and the mp_ids of
+    the payments left out because their member no longer exists.
+    """
+    payments = list(payments.only(*PAYMENT_FIELDS))
+    members = GymMember.objects.only(*MEMBER_FIELDS).in_bulk({p.member_id for p in payments})
+    skipped = [payment.mp_id for payment in payments if payment.member_id not in members]
+    items = _export_items([payment for payment in payments if payment.member_id in members], members)
+
+    output = tempfile.SpooledTemporaryFile(max_size=settings.RECEIPT_EXPORT_SPOOL_SIZE)
+    if export_format == 'pdf':
+        writer = PdfWriter()
+        for _, pdf in items:
+            writer.append(io.BytesIO(pdf))
+        writer.write(output)
+    else:
+        with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED) as archive:
+            for mp_id, pdf in items:
+                archive.writestr(f"receipt_{mp_id}.pdf", pdf)
+            if skipped:
+                archive.writestr('skipped.json', json.dumps(
+                    [{'mp_id': mp_id, 'reason': 'member not found'} for mp_id in skipped]
+                ))
+
+    output.seek(0)
+    return output, skipped
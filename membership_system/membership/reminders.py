@@ -0,0 +1,121 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .jobs import scheduled_job
+from .models import GeneralSetting, GymMember, GymMessage
+
+SEND_EXPIRY_REMINDERS_JOB = 'send_expiry_reminders'
+REMINDER_SUBJECT = 'Membership expiry reminder'
+DEFAULT_REMINDER_MESSAGE = (
+    'Hello GYM_MEMBERNAME, your membership GYM_MEMBERSHIP started on GYM_STARTDATE '
+    'and will expire on GYM_ENDDATE.'
+)
+MEMBER_FIELDS = [
+    'id', 'first_name', 'last_name', 'selected_membership',
+    'membership_valid_from', 'membership_valid_to', 'alert_sent', 'alert_send_date',
+]
+
+
+def parse_reminder_days(value):
+    """'7, 3,1' -> [7, 3, 1]; invalid or negative entries are ignored."""
+    days = set()
+    for part in (value or '').split(','):
+        part = part.strip()
+        if part.isdigit():
+            days.add(int(part))
+    return sorted(days, reverse=True)
+
+
+def reminder_due_date(valid_to, reminder_days, today):
+    """
+    The day the reminder of the window a member is currently in was due, or
+    None when the membership doesn't end within any window. Windows are days
+    before membership_valid_to, so with 7,3 a member 5 days out is in the
+    7 day window and becomes due again at 3 days.
+    """
+    days_left = (valid_to - today).days
+    windows = [days for days in reminder_days if days >= days_left]
+    if days_left < 0 or not windows:
+        return None
+    return valid_to - timedelta(days=min(windows))
+
+
+def already_reminded(member, due_date):
+    if member.alert_sent != 1:
+        return False
+    # Rows flagged before alert_send_date was kept are treated as sent
+    return member.alert_send_date is None or member.alert_send_date >= due_date
+
+
+def render_reminder(template, member):
+    name = ' '.join(part for part in (member.first_name, member.last_name) if part)
+    replacements = {
+        'GYM_MEMBERNAME': name,
+        'GYM_MEMBERSHIP': member.selected_membership or '',
+        'GYM_STARTDATE': member.membership_valid_from.isoformat() if member.membership_valid_from else '',
+        'GYM_ENDDATE': member.membership_valid_to.isoformat(),
+    }
+    for placeholder, value in replacements.items():
+        template = template.replace(placeholder, value)
+    return template
+
+
+def send_expiry_reminders(today=None):
+    """
+    Message every member whose membership ends within one of the
+    GeneralSetting.reminder_days windows and who hasn't been reminded for that
+    window yet. Candidates come from one range query on membership_valid_to;
+    each batch's messages and alert_sent update commit together, so a run that
+    stops halfway is finished by the next one. Returns the reminders sent.
+    """
+    setting = GeneralSetting.objects.only('enable_alert', 'reminder_days', 'reminder_message').first()
+    if setting is None or setting.enable_alert != 1:
+        return 0
+    reminder_days = parse_reminder_days(setting.reminder_days)
+    if not reminder_days:
+        return 0
+    template = setting.reminder_message or DEFAULT_REMINDER_MESSAGE
+
+    today = today or timezone.localdate()
+    candidates = (
+        GymMember.objects.filter(
+            role_name_norm='member',
+            membership_valid_to__range=(today, today + timedelta(days=reminder_days[0])),
+        )
+        .only(*MEMBER_FIELDS)
+        .order_by('id')
+    )
+
+    with scheduled_job(SEND_EXPIRY_REMINDERS_JOB) as run:
+        due = []
+        for member in candidates:
+            due_date = reminder_due_date(member.membership_valid_to, reminder_days, today)
+            if due_date is not None and not already_reminded(member, due_date):
+                due.append(member)
+        for start in range(0, len(due), settings.REMINDER_BATCH_SIZE):
+            run['rows_affected'] += _send_batch(due[start:start + settings.REMINDER_BATCH_SIZE], template, today)
+    return run['rows_affected']
+
+
+def _send_batch(members, template, today):
+    now = timezone.now()
+    messages = [
+        GymMessage(
+            sender=settings.REMINDER_SENDER_ID,
+            receiver=member.id,
+            date=now,
+            subject=REMINDER_SUBJECT,
+            message_body=render_reminder(template, member),
+            status=0,
+        )
+        for member in members
+    ]
+    with transaction.atomic():
+        GymMessage.objects.bulk_create(messages, batch_size=settings.REMINDER_BATCH_SIZE)
+        GymMember.objects.filter(id__in=[member.id for member in members]).update(
+            alert_sent=1, alert_send_date=today
+        )
+    return len(messages)
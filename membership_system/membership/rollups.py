@@ -0,0 +1,112 @@
+import datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, FloatField, Q, Sum, Value
+from django.db.models.functions import Coalesce, ExtractMonth, ExtractYear
+
+from .models import GymIncomeExpense, GymIncomeExpenseMonthly
+
+
+def _totals():
+    return {
+        'total_revenue': Coalesce(
+            Sum('total_amount', filter=Q(invoice_type='income'), output_field=FloatField()),
+            Value(0),
+            output_field=FloatField(),
+        ),
+        'total_expenses': Coalesce(
+            Sum('total_amount', filter=Q(invoice_type='expense'), output_field=FloatField()),
+            Value(0),
+            output_field=FloatField(),
+        ),
+    }
+
+
+def active_income_expense():
+    """Rows counted in the rollup: soft-deleted entries (is_Active = 0) are left out."""
+    return GymIncomeExpense.objects.exclude(is_active=0)
+
+
+def contribution(invoice_type, total_amount, invoice_date, is_active):
+    """
+    ((year, month), revenue, expenses) that a gym_income_expense row with these
+    values adds to the rollup, or None when it isn't counted.
+    """
+    if is_active == 0 or invoice_date is None:
+        return None
+    amount = total_amount or 0
+    return (
+        (invoice_date.year, invoice_date.month),
+        amount if invoice_type == 'income' else 0,
+        amount if invoice_type == 'expense' else 0,
+    )
+
+
+def apply_change(before, after):
+    """
+    Move the rollup from a row's `before` contribution to its `after` one (either
+    may be None). The months are changed with F() increments, which always
+    start from the latest committed totals, so concurrent writes to the same
+    month add up instead of overwriting each other with totals read earlier.
+    """
+    deltas = {}
+    for sign, counted in ((-1, before), (1, after)):
+        if counted is None:
+            continue
+        key, revenue, expenses = counted
+        month = deltas.setdefault(key, [0, 0, 0])
+        month[0] += sign * revenue
+        month[1] += sign * expenses
+        month[2] += sign
+    for (year, month), (revenue, expenses, count) in deltas.items():
+        if revenue or expenses or count:
+            _add_to_month(year, month, revenue, expenses, count)
+
+
+def _add_to_month(year, month, revenue, expenses, count):
+    rows = GymIncomeExpenseMonthly.objects.filter(year=year, month=month)
+    increments = {
+        'total_revenue': F('total_revenue') + revenue,
+        'total_expenses': F('total_expenses') + expenses,
+        'profit': F('profit') + (revenue - expenses),
+        'entry_count': F('entry_count') + count,
+    }
+    if not rows.update(**increments):
+        try:
+            with transaction.atomic():
+                GymIncomeExpenseMonthly.objects.create(
+                    year=year, month=month, total_revenue=revenue, total_expenses=expenses,
+                    profit=revenue - expenses, entry_count=count,
+                )
+        except IntegrityError:
+            # A concurrent write created the month first; the update sees its row
+            rows.update(**increments)
+    if count < 0:
+        rows.filter(entry_count__lte=0).delete()
+
+
+def backfill():
+    """Rebuild the whole rollup table with one grouped query. Returns the number of months written."""
+    monthly_data = (
+        active_income_expense()
+        .filter(invoice_date__isnull=False)
+        .annotate(year=ExtractYear('invoice_date'), month=ExtractMonth('invoice_date'))
+        .values('year', 'month')
+        .annotate(entry_count=Count('id'), **_totals())
+        .order_by('year', 'month')
+    )
+    rows = [
+        GymIncomeExpenseMonthly(
+            year=row['year'],
+            month=row['month'],
+            total_revenue=row['total_revenue'],
+            total_expenses=row['total_expenses'],
+            profit=row['total_revenue'] - row['total_expenses'],
+            entry_count=row['entry_count'],
+        )
+        for row in monthly_data
+    ]
+    with transaction.atomic():
+        GymIncomeExpenseMonthly.objects.all().delete()
+        GymIncomeExpenseMonthly.objects.bulk_create(rows)
+    return len(rows)
@@ -0,0 +1,121 @@
+import re
+
+from django.db import transaction
+from django.db.models import Count
+
+from .models import GymMember, GymMemberSearchDocument, GymMemberSearchToken
+
+# Member columns covered by the search index
+SEARCH_FIELDS = ['first_name', 'last_name', 'email', 'mobile', 'phone', 'username', 'address']
+
+TOKEN_LENGTH = 3
+# Longer search terms are narrowed on this many trigrams, the rest is checked against search_text
+MAX_QUERY_TOKENS = 8
+FIELD_SEPARATOR = '|'
+
+_STRIP_RE = re.compile(r'[\s\-()+|]')
+
+
+def normalize(value):
+    """Lowercase a value and drop whitespace and phone punctuation."""
+    if not value:
+        return ''
+    return _STRIP_RE.sub('', str(value).lower())
+
+
+def tokenize(value):
+    """
+    Return the grams starting at every position of a normalized value.
+    Grams near the end are shorter than TOKEN_LENGTH, so every substring of up
+    to TOKEN_LENGTH characters is a prefix of at least one token.
+    """
+    return {value[i:i + TOKEN_LENGTH] for i in range(len(value))}
+
+
+def build_document(member):
+    parts = [normalize(getattr(member, field)) for field in SEARCH_FIELDS]
+    return FIELD_SEPARATOR.join(parts)
+
+
+def index_member(member):
+    """Create or refresh the search document and tokens of a single member."""
+    search_text = build_document(member)
+    document = GymMemberSearchDocument.objects.filter(member_id=member.pk).first()
+    if document is not None and document.search_text == search_text:
+        return
+
+    tokens = set()
+    for part in search_text.split(FIELD_SEPARATOR):
+        tokens |= tokenize(part)
+
+    with transaction.atomic():
+        GymMemberSearchDocument.objects.update_or_create(
+            member_id=member.pk, defaults={'search_text': search_text}
+        )
+        GymMemberSearchToken.objects.filter(member_id=member.pk).delete()
+        GymMemberSearchToken.objects.bulk_create(
+            [GymMemberSearchToken(member_id=member.pk, token=token) for token in tokens],
+            ignore_conflicts=True,
+        )
+
+
+def remove_member(member_id):
+    with transaction.atomic():
+        GymMemberSearchToken.objects.filter(member_id=member_id).delete()
+        GymMemberSearchDocument.objects.filter(member_id=member_id).delete()
+
+
+def rebuild_index(batch_size=1000):
+    """Rebuild the whole search index from gym_member. Returns the number of members indexed."""
+    indexed = 0
+    with transaction.atomic():
+        GymMemberSearchToken.objects.all().delete()
+        GymMemberSearchDocument.objects.all().delete()
+
+        members = GymMember.objects.only('id', *SEARCH_FIELDS).order_by('id')
+        documents, tokens = [], []
+        for member in members.iterator(chunk_size=batch_size):
+            search_text = build_document(member)
+            documents.append(GymMemberSearchDocument(member_id=member.pk, search_text=search_text))
+            member_tokens = set()
+            for part in search_text.split(FIELD_SEPARATOR):
+                member_tokens |= tokenize(part)
+            tokens.extend(GymMemberSearchToken(member_id=member.pk, token=token) for token in member_tokens)
+            indexed += 1
+
+            if len(documents) >= batch_size:
+                GymMemberSearchDocument.objects.bulk_create(documents)
+                GymMemberSearchToken.objects.bulk_create(tokens, batch_size=batch_size, ignore_conflicts=True)
+                documents, tokens = [], []
+
+        GymMemberSearchDocument.objects.bulk_create(documents)
+        GymMemberSearchToken.objects.bulk_create(tokens, batch_size=batch_size, ignore_conflicts=True)
+    return indexed
+
+
+def search_member_ids(value):
+    """
+    Return a subquery of member ids whose indexed fields contain `value`.
+    Candidates are found through the token index and then confirmed against
+    the normalized search_text, so only matching documents are scanned.
+    """
+    term = normalize(value)
+    if not term:
+        return None
+
+    # Terms up to TOKEN_LENGTH characters are answered by the token index alone
+    if len(term) <= TOKEN_LENGTH:
+        return GymMemberSearchToken.objects.filter(token__startswith=term).values('member_id')
+
+    grams = sorted({term[i:i + TOKEN_LENGTH] for i in range(len(term) - TOKEN_LENGTH + 1)})
+    grams = grams[:MAX_QUERY_TOKENS]
+    candidates = (
+        GymMemberSearchToken.objects.filter(token__in=grams)
+        .values('member_id')
+        .annotate(matched=Count('token'))
+        .filter(matched=len(grams))
+        .values('member_id')
+    )
+    return GymMemberSearchDocument.objects.filter(
+        member_id__in=candidates, search_text__contains=term
+    ).values('member_id')
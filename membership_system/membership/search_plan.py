@@ -0,0 +1,95 @@
+import datetime
+import re
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+
+_DATE_RE = re.compile(r'^(\d{4})(?:-(\d{1,2})(?:-(\d{1,2}))?)?$')
+
+
+@dataclass
+class SearchPlan:
+    """
+    A global search term parsed into typed lookups. `number_range` is the
+    half-open range a number covers at the precision it was typed with ("50"
+    is 50 <= x < 51, "50.5" is 50.5 <= x < 50.6); `date_range` is the year,
+    month or day typed in ISO form.
+    """
+    text: str
+    number_range: tuple = None
+    integer: int = None
+    date_range: tuple = None
+
+    @property
+    def is_plain_text(self):
+        return self.number_range is None and self.date_range is None
+
+
+def _parse_number(term):
+    try:
+        number = Decimal(term)
+    except InvalidOperation:
+        return None, None
+    if not number.is_finite():
+        return None, None
+    integer = int(number) if number == number.to_integral_value() else None
+    if number < 0:
+        # Amounts are never negative; a negative term can still be an id
+        return None, integer
+    step = Decimal(1).scaleb(min(number.as_tuple().exponent, 0))
+    return (float(number), float(number + step)), integer
+
+
+def _parse_date(term):
+    match = _DATE_RE.match(term)
+    if not match:
+        return None
+    year, month, day = (int(part) if part else None for part in match.groups())
+    try:
+        if day is not None:
+            start = datetime.date(year, month, day)
+            return start, start + datetime.timedelta(days=1)
+        if month is not None:
+            start = datetime.date(year, month, 1)
+            return start, datetime.date(year + month // 12, month % 12 + 1, 1)
+        if 1900 <= year <= 2999:
+            return datetime.date(year, 1, 1), datetime.date(year + 1, 1, 1)
+    except ValueError:
+        pass
+    return None
+
+
+def parse_search_term(value):
+    term = value.strip()
+    number_range, integer = _parse_number(term)
+    return SearchPlan(text=term, number_range=number_range, integer=integer, date_range=_parse_date(term))
+
+
+def build_search_q(plan, text_fields=(), number_fields=(), integer_fields=(), code_fields=(), date_fields=()):
+    """
+    OR together the lookups the plan allows, each on an indexable column form:
+    number ranges on float columns, equality on integer and code columns,
+    date ranges on date columns and icontains on text columns only for
+    terms that are neither numbers nor dates. A number or date that no column
+    takes is matched as text, and a term nothing can match matches no rows.
+    """
+    q = Q()
+    if plan.number_range is not None:
+        low, high = plan.number_range
+        for field in number_fields:
+            q |= Q(**{f'{field}__gte': low, f'{field}__lt': high})
+    if plan.integer is not None:
+        for field in integer_fields:
+            q |= Q(**{field: plan.integer})
+        for field in code_fields:
+            q |= Q(**{field: plan.text})
+    if plan.date_range is not None:
+        start, end = plan.date_range
+        for field in date_fields:
+            q |= Q(**{f'{field}__gte': start, f'{field}__lt': end})
+    if plan.is_plain_text or not q:
+        for field in text_fields:
+            q |= Q(**{f'{field}__icontains': plan.text})
+    # An empty Q() would filter nothing out
+    return q if q else Q(pk__in=[])
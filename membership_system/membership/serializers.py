@@ -1,25 +1,60 @@
 from rest_framework import serializers
-from .models import GymMember, Membership, GymIncomeExpense, GymInout, GymAttendance, MembershipPayment
+from .models import GymMember, Membership, GymIncomeExpense, GymInout, GymAttendance, MembershipPayment, MembershipPaymentHistory
 
 
 class GymMemberSerializer(serializers.ModelSerializer):
     class Meta:
         model = GymMember
-        fields = '__all__'
+        exclude = ['role_name_norm', 'membership_status_norm']
+
+    # to_representation() only swaps image for its storage url, which ?fast=true lists reproduce
+    files_as_storage_url = True
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        if instance.image:
+        # A ?fields= list without image hasn't loaded it; reading it would cost a query per row
+        if 'image' in self.fields and instance.image:
             representation['image'] = instance.image.url
         return representation
 
 
+class GymMemberListSerializer(GymMemberSerializer):
+    """
+    GymMemberSerializer limited to the columns a list asked for with ?fields=
+    or ?view=summary. Credentials and the fingerprint template are never listed.
+    """
+    SUMMARY_FIELDS = [
+        'id', 'member_id', 'members_reg_number', 'first_name', 'last_name', 'mobile', 'email', 'image',
+        'selected_membership', 'membership_status', 'membership_valid_from', 'membership_valid_to',
+    ]
+    HIDDEN_FIELDS = ['password', 'token', 'fingerprint']
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        allowed = set(fields or self.SUMMARY_FIELDS) - set(self.HIDDEN_FIELDS)
+        for name in set(self.fields) - allowed:
+            self.fields.pop(name)
+
+    @classmethod
+    def listable_fields(cls):
+        return [
+            field.name for field in GymMember._meta.concrete_fields
+            if field.name not in cls.HIDDEN_FIELDS and not field.generated
+        ]
+
+
 class MembershipPaymentSerializer(serializers.ModelSerializer):
     class Meta:
         model = MembershipPayment
         fields = '__all__'
 
 
+class MembershipPaymentHistorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MembershipPaymentHistory
+        exclude = ['payment']
+
+
 class MembershipSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -69,18 +104,40 @@ class GymMemberSimpleSerializer(serializers.ModelSerializer):
         fields = ['first_name', 'last_name', 'membership_valid_from', 'membership_valid_to','membership_status', 'image']
         
         
+def get_members_by_reg_code(reg_codes):
+    """Load the members for a set of member_reg_code values with one query, keyed by members_reg_number."""
+    reg_codes = {code for code in reg_codes if code}
+    if not reg_codes:
+        return {}
+    members = GymMember.objects.filter(members_reg_number__in=reg_codes).only(
+        *GymMemberSimpleSerializer.Meta.fields, 'members_reg_number'
+    )
+    return {member.members_reg_number: member for member in members}
+
+
 class GymInoutSerializer(serializers.ModelSerializer):
     # Create a method field to fetch the member information based on member_id
     member_info = serializers.SerializerMethodField()
 
     def get_member_info(self, obj):
-        try:
-            # Fetch the member based on member_id (you can also use `filter()` if needed)
-            member = GymMember.objects.filter(members_reg_number=obj.member_reg_code)
-            return GymMemberSimpleSerializer(member).data
-        except GymMember.DoesNotExist:
+        # The list view resolves every member_reg_code on the page in one query
+        # and passes the result in as `members_by_reg_code`.
+        members_by_reg_code = self.context.get('members_by_reg_code')
+        if members_by_reg_code is not None:
+            member = members_by_reg_code.get(obj.member_reg_code)
+        else:
+            member = GymMember.objects.filter(members_reg_number=obj.member_reg_code).first()
+        if member is None:
             return None
+        return GymMemberSimpleSerializer(member).data
 
     class Meta:
         model = GymInout
         fields = ['id', 'in_time', 'out_time', 'member_reg_code', 'member_info']
+
+
+class InoutEventSerializer(serializers.Serializer):
+    """One queued scanner event posted to /api/inout/bulk/."""
+    member_reg_code = serializers.CharField(max_length=20)
+    type = serializers.ChoiceField(choices=['in', 'out'])
+    time = serializers.DateTimeField()
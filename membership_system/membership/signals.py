@@ -0,0 +1,104 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .dashboard import invalidate_dashboard_summary
+from .fingerprints import refresh_member
+from .ledger import refresh_paid_amount, settle_paid_amount
+from .models import GymIncomeExpense, GymMember, Membership, MembershipPayment, MembershipPaymentHistory
+from .plans import invalidate_plans
+from .rollups import apply_change, contribution
+from .search import index_member, remove_member
+
+
+@receiver(post_save, sender=GymMember)
+def update_member_search_index(sender, instance, **kwargs):
+    index_member(instance)
+
+
+@receiver(post_delete, sender=GymMember)
+def delete_member_search_index(sender, instance, **kwargs):
+    remove_member(instance.pk)
+
+
+@receiver(post_save, sender=GymMember)
+def update_fingerprint_index(sender, instance, update_fields=None, **kwargs):
+    # Enrollment in register mode saves the member's new FingerPrint template
+    if update_fields is not None and 'fingerprint' not in update_fields:
+        return
+    if 'fingerprint' in instance.get_deferred_fields():
+        return
+    refresh_member(instance)
+
+
+@receiver(post_delete, sender=GymMember)
+def delete_from_fingerprint_index(sender, instance, **kwargs):
+    instance.fingerprint = None
+    refresh_member(instance)
+
+
+@receiver(post_save, sender=GymMember)
+@receiver(post_delete, sender=GymMember)
+@receiver(post_save, sender=MembershipPayment)
+@receiver(post_delete, sender=MembershipPayment)
+@receiver(post_save, sender=GymIncomeExpense)
+@receiver(post_delete, sender=GymIncomeExpense)
+def clear_dashboard_summary(sender, **kwargs):
+    invalidate_dashboard_summary()
+
+
+ROLLUP_FIELDS = ['invoice_type', 'total_amount', 'invoice_date', 'is_active']
+
+
+@receiver(pre_save, sender=GymIncomeExpense)
+def remember_previous_rollup_values(sender, instance, **kwargs):
+    # An update can change the amount or move the row to another month
+    instance._previous_contribution = None
+    if instance.pk:
+        previous = GymIncomeExpense.objects.filter(pk=instance.pk).values_list(*ROLLUP_FIELDS).first()
+        if previous is not None:
+            instance._previous_contribution = contribution(*previous)
+
+
+@receiver(post_save, sender=GymIncomeExpense)
+def update_monthly_rollup(sender, instance, **kwargs):
+    apply_change(
+        getattr(instance, '_previous_contribution', None),
+        contribution(*(getattr(instance, field) for field in ROLLUP_FIELDS)),
+    )
+
+
+@receiver(post_delete, sender=GymIncomeExpense)
+def delete_from_monthly_rollup(sender, instance, **kwargs):
+    apply_change(contribution(*(getattr(instance, field) for field in ROLLUP_FIELDS)), None)
+
+
+@receiver(post_save, sender=Membership)
+@receiver(post_delete, sender=Membership)
+def clear_membership_plans(sender, **kwargs):
+    invalidate_plans()
+
+
+@receiver(post_save, sender=MembershipPayment)
+def keep_paid_amount_from_installments(sender, instance, **kwargs):
+    # A client that also writes paid_amount itself would otherwise count an installment twice
+    settle_paid_amount(instance)
+
+
+@receiver(pre_save, sender=MembershipPaymentHistory)
+def remember_previous_installment(sender, instance, **kwargs):
+    # An edit can move the installment to another payment
+    instance._previous_mp_id = None
+    if instance.pk:
+        instance._previous_mp_id = (
+            MembershipPaymentHistory.objects.filter(pk=instance.pk).values_list('mp_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=MembershipPaymentHistory)
+def update_paid_amount_on_installment_save(sender, instance, **kwargs):
+    refresh_paid_amount(getattr(instance, '_previous_mp_id', None), instance.mp_id)
+
+
+@receiver(post_delete, sender=MembershipPaymentHistory)
+def update_paid_amount_on_installment_delete(sender, instance, **kwargs):
+    refresh_paid_amount(instance.mp_id)
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Max
+
+from .models import GymInout
+from .serializers import GymInoutSerializer, get_members_by_reg_code
+
+logger = logging.getLogger(__name__)
+
+
+def fetch_checkins_after(last_id, limit, skip_ids=()):
+    """Serialize up to `limit` GymInout rows with an id above `last_id`, oldest first, leaving out `skip_ids`."""
+    rows = GymInout.objects.filter(id__gt=last_id).order_by('id')
+    if skip_ids:
+        rows = rows.exclude(id__in=skip_ids)
+    rows = list(rows[:limit])
+    context = {'members_by_reg_code': get_members_by_reg_code(row.member_reg_code for row in rows)}
+    return GymInoutSerializer(rows, many=True, context=context).data
+
+
+def latest_checkin_ids(overlap):
+    """The highest GymInout id and the ids of the `overlap` ids below it that exist."""
+    last_id = GymInout.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+    recent = GymInout.objects.filter(id__gt=last_id - overlap).values_list('id', flat=True)
+    return last_id, set(recent)
+
+
+class CheckinBroadcaster:
+    """
+    Polls gym_inout for new rows while at least one client is connected and
+    pushes every new check-in to all subscriber queues, so a single query per
+    poll interval serves every open front desk screen in this process.
+
+    Ids are assigned at insert but rows become visible at commit, so a row can
+    show up after a higher id was already sent. Each poll therefore looks back
+    CHECKIN_STREAM_OVERLAP ids below the highest one sent and skips the ids it
+    already pushed from that window.
+    """
+
+    def __init__(self):
+        self.subscribers = set()
+        self.last_id = None
+        self.sent_ids = set()
+        self.task = None
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=settings.CHECKIN_STREAM_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.run())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    async def poll(self):
+        """Fetch the check-ins not pushed yet, oldest first, and record them as sent."""
+        overlap = settings.CHECKIN_STREAM_OVERLAP
+        if self.last_id is None:
+            self.last_id, self.sent_ids = await sync_to_async(latest_checkin_ids)(overlap)
+        window_start = max(self.last_id - overlap, 0)
+        self.sent_ids = {pk for pk in self.sent_ids if pk > window_start}
+        events = await sync_to_async(fetch_checkins_after)(
+            window_start, settings.CHECKIN_STREAM_BATCH_SIZE, self.sent_ids
+        )
+        for event in events:
+            self.sent_ids.add(event['id'])
+            self.last_id = max(self.last_id, event['id'])
+        return events
+
+    async def run(self):
+        try:
+            while self.subscribers:
+                try:
+                    events = await self.poll()
+                except Exception:
+                    logger.exception("Polling gym_inout for the check-in stream failed")
+                    events = []
+
+                for event in events:
+                    for queue in list(self.subscribers):
+                        try:
+                            queue.put_nowait(event)
+                        except asyncio.QueueFull:
+                            # A client that can't keep up is dropped and resumes with Last-Event-ID
+                            self.subscribers.discard(queue)
+
+                if len(events) < settings.CHECKIN_STREAM_BATCH_SIZE:
+                    await asyncio.sleep(settings.CHECKIN_STREAM_POLL_INTERVAL)
+        finally:
+            # With nobody listening, the rows stored meanwhile aren't owed to anyone:
+            # the next subscriber starts from the newest check-in again
+            self.last_id = None
+            self.sent_ids = set()
+
+
+broadcaster = CheckinBroadcaster()
+
+
+def format_event(event):
+    return f"id: {event['id']}\nevent: checkin\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+def format_truncated(last_id):
+    return f"id: {last_id}\nevent: truncated\ndata: {json.dumps({'last_id': last_id})}\n\n"
+
+
+async def checkin_events(resume_from=None):
+    """
+    Server-sent events for new check-ins. When `resume_from` is given, the rows
+    the client missed since that id are sent first. A backlog longer than
+    CHECKIN_STREAM_BACKFILL is sent in parts: after each part a `truncated`
+    event carries the last id sent and the stream ends, so the client
+    reconnects from it (EventSource does so with Last-Event-ID) for the rest.
+    """
+    queue = broadcaster.subscribe()
+    try:
+        replayed = set()
+        if resume_from is not None:
+            backfill = settings.CHECKIN_STREAM_BACKFILL
+            backlog = await sync_to_async(fetch_checkins_after)(resume_from, backfill + 1)
+            for event in backlog[:backfill]:
+                yield format_event(event)
+                replayed.add(event['id'])
+            if len(backlog) > backfill:
+                yield format_truncated(backlog[backfill - 1]['id'])
+                return
+
+        while queue in broadcaster.subscribers or not queue.empty():
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=settings.CHECKIN_STREAM_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            # Live events can repeat the replayed backlog, but may arrive out of id order
+            if event['id'] in replayed:
+                continue
+            yield format_event(event)
+    finally:
+        broadcaster.unsubscribe(queue)
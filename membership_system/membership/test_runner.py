@@ -0,0 +1,26 @@
+from django.apps import apps
+from django.db import connections
+from django.test.runner import DiscoverRunner
+
+
+class LegacyTablesTestRunner(DiscoverRunner):
+    """
+    The legacy models are unmanaged and not part of any migration, so the test
+    database has none of their tables. Create them after migrating, the way
+    `generate_gym_data --create-tables` does for a local database.
+    """
+
+    def setup_databases(self, **kwargs):
+        old_config = super().setup_databases(**kwargs)
+        legacy_models = [
+            model for model in apps.get_app_config('membership').get_models() if not model._meta.managed
+        ]
+        for alias in connections:
+            connection = connections[alias]
+            with connection.cursor() as cursor:
+                tables = set(connection.introspection.table_names(cursor))
+            with connection.schema_editor() as schema_editor:
+                for model in legacy_models:
+                    if model._meta.db_table not in tables:
+                        schema_editor.create_model(model)
+        return old_config
@@ -1,3 +1,872 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+from importlib import import_module
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+import numpy as np
+from reportlab import rl_config
+from rest_framework import serializers
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import (
+    FingerModeState, GymIncomeExpense, GymIncomeExpenseMonthly, GymInout, GymMember, IdempotencyKey, Membership,
+    MembershipPayment, MembershipPaymentHistory,
+)
+from .plans import invalidate_plans
+from .fast_json import ValuesRowBuilder
+from .idempotency import _sha256
+from .index_advisor import IndexSpec, create_index_sql, drop_index_sql, missing_indexes
+from .middleware import QueryBudgetExceeded
+from .ledger import (
+    active_payments, member_ledger, members_in_arrears, payment_ledger, reconcile_paid_amounts, unreconciled_payments,
+)
+from .fingerprints import FingerprintIndex, _process_index, get_fingerprint_index
+from .receipts import _get_export_pool
+from .rollups import backfill
+from .search import rebuild_index
+from .serializers import GymMemberSerializer, MembershipPaymentSerializer
+from .stream import CheckinBroadcaster, checkin_events
+from .utils import ReceiptTemplate, get_receipt_template
+from .views import DashboardSummaryView
+
+
+class GymInoutListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        for number in range(30):
+            GymMember.objects.create(
+                is_exist=1, role_name='member', first_name=f'Member {number}', members_reg_number=f'R{number:03d}'
+            )
+            GymInout.objects.create(
+                member_id=str(number), member_reg_code=f'R{number:03d}', in_time=now - timedelta(minutes=number)
+            )
+
+    def test_member_info_is_resolved_with_one_query_per_page(self):
+        # count, page rows, members on the page: the same for any page size
+        for page_size in (5, 25):
+            with self.assertNumQueries(3):
+                response = self.client.get('/api/inout/', {'page_size': page_size})
+            self.assertEqual(response.status_code, 200)
+            results = response.json()['results']
+            self.assertEqual(len(results), page_size)
+            self.assertEqual(results[0]['member_info']['first_name'], 'Member 0')
+
+    def test_old_check_ins_are_listed_unless_a_default_window_is_set(self):
+        GymInout.objects.create(member_id='0', member_reg_code='R000', in_time=timezone.now() - timedelta(days=30))
+        self.assertEqual(self.client.get('/api/inout/').json()['count'], 31)
+        with override_settings(INOUT_DEFAULT_WINDOW_DAYS=7):
+            self.assertEqual(self.client.get('/api/inout/').json()['count'], 30)
+
+    def test_in_time_index_migration(self):
+        migration = import_module('membership.migrations.0014_gym_inout_in_time_index')
+
+        def in_time_index():
+            with connection.cursor() as cursor:
+                constraints = connection.introspection.get_constraints(cursor, 'gym_inout')
+            return constraints.get('gym_inout_in_time_idx', {}).get('columns')
+
+        # Used outside its context manager: SQLite refuses that inside the test transaction,
+        # which also rolls the DDL back
+        schema_editor = connection.SchemaEditorClass(connection)
+        migration.add_index(None, schema_editor)
+        self.assertEqual(in_time_index(), ['in_time'])
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN SELECT id FROM gym_inout ORDER BY in_time DESC LIMIT 10')
+            self.assertIn('gym_inout_in_time_idx', ' '.join(str(row) for row in cursor.fetchall()))
+
+        migration.remove_index(None, schema_editor)
+        self.assertIsNone(in_time_index())
+
+
+class MemberGlobalSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        GymMember.objects.create(
+            is_exist=1, role_name='member', first_name='Ayesha', last_name='Khan', mobile='0300-1234567',
+            address='12 Mall Road', members_reg_number='R001',
+        )
+        GymMember.objects.create(
+            is_exist=1, role_name='member', first_name='John', last_name='Smith', mobile='0311 7654321',
+            address='4 Canal View', members_reg_number='R002',
+        )
+
+    def search(self, term):
+        response = self.client.get('/api/members/', {'global_search': term})
+        self.assertEqual(response.status_code, 200)
+        return sorted(member['first_name'] for member in response.json()['results'])
+
+    def test_like_search_is_the_default(self):
+        self.assertEqual(self.search('mall road'), ['Ayesha'])
+        self.assertEqual(self.search('smi'), ['John'])
+
+    @override_settings(MEMBER_SEARCH_INDEX_ENABLED=True)
+    def test_index_search_matches_the_like_search(self):
+        rebuild_index()
+        self.assertEqual(self.search('mall road'), ['Ayesha'])
+        self.assertEqual(self.search('smi'), ['John'])
+        self.assertEqual(self.search('03001234567'), ['Ayesha'])
+        self.assertEqual(self.search('zzz'), [])
+
+
+class TypedGlobalSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = GymMember.objects.create(is_exist=1, role_name='member', first_name='Ayesha')
+        cls.plan = Membership.objects.create(
+            membership_label='Monthly', membership_class='monthly', membership_amount=50.5,
+        )
+        Membership.objects.create(membership_label='Plan 2024-03', membership_class='march', membership_amount=80)
+        MembershipPayment.objects.create(
+            member_id=cls.member.id, membership_amount=50.5, created_date=date(2024, 3, 15), is_active=1,
+        )
+
+    def search(self, path, term):
+        response = self.client.get(path, {'global_search': term})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_number_without_a_number_column_matches_no_rows(self):
+        self.assertEqual(self.search('/api/membership-payment/', '50.5'), [])
+        self.assertEqual(len(self.search('/api/membership-payment/', '2024-03')), 1)
+
+    def test_date_without_a_date_column_is_matched_as_text(self):
+        for term in ('2024-03', '2024-03-15'):
+            with self.subTest(term=term):
+                labels = [plan['membership_label'] for plan in self.search('/api/membership/', term)]
+                self.assertEqual(labels, ['Plan 2024-03'] if term == '2024-03' else [])
+        self.assertEqual(len(self.search('/api/membership/', '50.5')), 1)
+
+
+class DashboardSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for status in ('Continue', 'continue', 'Expired'):
+            GymMember.objects.create(is_exist=1, role_name='member', membership_status=status)
+        GymMember.objects.create(is_exist=1, role_name='staff_member', membership_status='Continue')
+        GymIncomeExpense.objects.create(invoice_type='income', total_amount=120.5)
+        GymIncomeExpense.objects.create(invoice_type='income', total_amount=80)
+        GymIncomeExpense.objects.create(invoice_type='expense', total_amount=30)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_summary_is_one_query_then_cached(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/dashboard/summary/')
+        self.assertEqual(response.json(), {
+            'total_members': 3, 'active_members': 2, 'total_revenue': 200.5, 'total_expenses': 30.0,
+        })
+        with self.assertNumQueries(0):
+            self.client.get('/api/dashboard/summary/')
+
+    def test_summary_without_income_or_expenses(self):
+        GymIncomeExpense.objects.all().delete()
+        response = self.client.get('/api/dashboard/summary/')
+        self.assertEqual(response.json()['total_revenue'], 0)
+        self.assertEqual(response.json()['total_members'], 3)
+
+    def test_member_writes_clear_the_cached_summary(self):
+        self.client.get('/api/dashboard/summary/')
+        GymMember.objects.create(is_exist=1, role_name='member', membership_status='Continue')
+        self.assertEqual(self.client.get('/api/dashboard/summary/').json()['active_members'], 3)
+
+
+class ReceiptExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        member = GymMember.objects.create(
+            is_exist=1, role_name='member', first_name='Sara', last_name='Malik', membership_status='Continue',
+        )
+        for _ in range(2):
+            MembershipPayment.objects.create(member_id=member.id, paid_amount=50, created_date=date(2024, 3, 1))
+        cls.orphan = MembershipPayment.objects.create(member_id=member.id + 100, paid_amount=50)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        storages = {
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage', 'OPTIONS': {'location': media.name}},
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        }
+        storage_override = override_settings(STORAGES=storages)
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+
+    def export(self):
+        response = self.client.get('/api/membership-payment/', {'query': 'export-receipts'})
+        self.assertEqual(response.status_code, 200)
+        return response, zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+
+    def test_payments_without_a_member_are_listed(self):
+        response, archive = self.export()
+        self.assertEqual(response['Skipped-Receipts'], str(self.orphan.mp_id))
+        self.assertEqual(len([name for name in archive.namelist() if name.endswith('.pdf')]), 2)
+        self.assertEqual(json.loads(archive.read('skipped.json')), [
+            {'mp_id': self.orphan.mp_id, 'reason': 'member not found'},
+        ])
+
+    def test_stored_receipts_are_not_rendered_again(self):
+        _, first = self.export()
+        with mock.patch('membership.receipts._get_export_pool') as get_pool:
+            _, second = self.export()
+        get_pool.assert_not_called()
+        self.assertEqual(
+            {name: second.read(name) for name in second.namelist()},
+            {name: first.read(name) for name in first.namelist()},
+        )
+
+    def test_stored_receipts_are_read_without_an_exists_call(self):
+        self.export()
+        with mock.patch.object(default_storage, 'exists', side_effect=AssertionError('exists() called')):
+            self.export()
+
+    def test_export_workers_are_spawned(self):
+        _get_export_pool.cache_clear()
+        self.addCleanup(_get_export_pool.cache_clear)
+        pool = _get_export_pool()
+        self.addCleanup(pool.shutdown)
+        self.assertEqual(pool._mp_context.get_start_method(), 'spawn')
+
+
+class ReceiptTemplateTests(TestCase):
+    payment = SimpleNamespace(mp_id=7, paid_amount=50.0, created_date=date(2024, 3, 1))
+    member = SimpleNamespace(
+        first_name='Sara', last_name='Malik', membership_valid_from=date(2024, 3, 1),
+        membership_valid_to=date(2024, 3, 31), membership_status='Continue',
+    )
+
+    def test_ascii85_is_only_switched_off_while_rendering(self):
+        self.assertEqual(rl_config.useA85, 1)
+        pdf = get_receipt_template().render(self.payment, self.member)
+        self.assertEqual(rl_config.useA85, 1)
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        self.assertIn(b'/DCTDecode', pdf)
+        self.assertNotIn(b'/ASCII85Decode', pdf)
+
+    def test_receipt_without_a_logo(self):
+        pdf = ReceiptTemplate('/nonexistent/logo.jpg').render(self.payment, self.member)
+        self.assertTrue(pdf.startswith(b'%PDF'))
+
+
+class CheckinStreamTests(TestCase):
+    def checkin(self, **fields):
+        return GymInout.objects.create(member_reg_code='R001', in_time=timezone.now(), **fields)
+
+    async def test_rows_committed_out_of_id_order_are_still_sent(self):
+        first = await sync_to_async(self.checkin)()
+        broadcaster = CheckinBroadcaster()
+        self.assertEqual(await broadcaster.poll(), [])
+
+        third = await sync_to_async(self.checkin)(id=first.id + 2)
+        self.assertEqual([event['id'] for event in await broadcaster.poll()], [third.id])
+        # The row with the lower id only becomes visible now
+        second = await sync_to_async(self.checkin)(id=first.id + 1)
+        self.assertEqual([event['id'] for event in await broadcaster.poll()], [second.id])
+        self.assertEqual(await broadcaster.poll(), [])
+
+    @override_settings(CHECKIN_STREAM_BACKFILL=2)
+    async def test_a_truncated_backlog_says_where_it_stopped(self):
+        rows = [await sync_to_async(self.checkin)() for _ in range(5)]
+        with mock.patch('membership.stream.broadcaster', CheckinBroadcaster()):
+            messages = [message async for message in checkin_events(resume_from=rows[0].id)]
+        self.assertEqual(len(messages), 3)
+        self.assertTrue(messages[0].startswith(f'id: {rows[1].id}\nevent: checkin\n'))
+        self.assertEqual(
+            messages[2], f'id: {rows[2].id}\nevent: truncated\ndata: {json.dumps({"last_id": rows[2].id})}\n\n'
+        )
+
+    @override_settings(CHECKIN_STREAM_POLL_INTERVAL=0.01)
+    async def test_a_cold_start_doesnt_replay_rows_stored_while_nobody_listened(self):
+        broadcaster = CheckinBroadcaster()
+        await sync_to_async(self.checkin)()
+        queue = broadcaster.subscribe()
+        await asyncio.sleep(0.05)
+        broadcaster.unsubscribe(queue)
+        await broadcaster.task
+        self.assertIsNone(broadcaster.last_id)
+
+        missed = [await sync_to_async(self.checkin)() for _ in range(3)]
+        queue = broadcaster.subscribe()
+        await asyncio.sleep(0.05)
+        self.assertTrue(queue.empty())
+        self.assertEqual(broadcaster.last_id, missed[-1].id)
+        latest = await sync_to_async(self.checkin)()
+        self.assertEqual((await asyncio.wait_for(queue.get(), 1))['id'], latest.id)
+        broadcaster.unsubscribe(queue)
+        await broadcaster.task
+
+    def test_stream_needs_the_asgi_application(self):
+        self.assertEqual(self.client.get('/api/inout/stream/').status_code, 501)
+
+
+class FingerModeTests(TestCase):
+    def test_wait_must_be_a_finite_number_of_seconds_up_to_the_limit(self):
+        for wait in ('nan', 'inf', '-inf', '-1', '31', 'soon'):
+            response = self.client.get('/api/finger-mode/', {'wait': wait, 'version': '1'})
+            self.assertEqual(response.status_code, 400, wait)
+
+    def test_wait_returns_as_soon_as_the_version_differs(self):
+        self.client.post('/api/finger-mode/', {'mode': 'register', 'member_id': '12'})
+        response = self.client.get('/api/finger-mode/', {'wait': '30', 'version': '0'})
+        self.assertEqual(response.json(), {'mode': 'register', 'member_id': '12', 'version': 1})
+
+    def test_mode_stays_set_without_a_ttl(self):
+        self.client.post('/api/finger-mode/', {'mode': 'attendance'})
+        self.assertIsNone(FingerModeState.objects.get(device_id='default').expires_at)
+        self.client.post('/api/finger-mode/', {'mode': 'attendance', 'ttl': 60})
+        self.assertIsNotNone(FingerModeState.objects.get(device_id='default').expires_at)
+        self.assertEqual(self.client.post('/api/finger-mode/', {'mode': 'attendance', 'ttl': -5}).status_code, 400)
+
+    def test_device_ids_longer_than_the_column_are_rejected(self):
+        device = 'd' * 65
+        self.assertEqual(self.client.get('/api/finger-mode/', {'device': device}).status_code, 400)
+        self.assertEqual(self.client.post('/api/finger-mode/', {'mode': 'attendance', 'device': device}).status_code, 400)
+        self.assertFalse(FingerModeState.objects.exists())
+        response = self.client.post('/api/finger-mode/', {'mode': 'attendance', 'device': 'd' * 64})
+        self.assertEqual(response.status_code, 200)
+
+
+class FingerprintIndexTests(TestCase):
+    def template(self, value):
+        return np.full(16, value, dtype=np.uint8)
+
+    def test_changes_never_write_rows_a_running_identify_can_see(self):
+        index = FingerprintIndex(16)
+        index.load([(1, self.template(1)), (2, self.template(2)), (3, self.template(3))])
+        templates, member_ids = index.templates, index.member_ids
+        snapshot = templates[:3].copy(), member_ids[:3].copy()
+
+        index.upsert(1, self.template(7))
+        index.remove(1)
+        index.upsert(4, self.template(4))
+        np.testing.assert_array_equal(templates[:3], snapshot[0])
+        np.testing.assert_array_equal(member_ids[:3], snapshot[1])
+
+        self.assertEqual(index.identify(self.template(3), 0), (3, 0))
+        self.assertEqual(index.identify(self.template(4), 0), (4, 0))
+        self.assertIsNone(index.identify(self.template(1), 0))
+
+    @override_settings(FINGERPRINT_TEMPLATE_BYTES=16)
+    def test_concurrent_requests_load_the_index_once(self):
+        _process_index.cache_clear()
+        self.addCleanup(_process_index.cache_clear)
+        loads = []
+
+        def enrolled_templates():
+            loads.append(threading.get_ident())
+            time.sleep(0.05)
+            return [(1, self.template(1))]
+
+        with mock.patch('membership.fingerprints.enrolled_templates', enrolled_templates):
+            threads = [threading.Thread(target=get_fingerprint_index) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(loads), 1)
+        self.assertEqual(_process_index().size, 1)
+
+
+class BulkInoutTests(TestCase):
+    migration = import_module('membership.migrations.0015_gym_inout_unique_checkin')
+
+    @classmethod
+    def setUpTestData(cls):
+        GymMember.objects.create(is_exist=1, role_name='member', member_id='M1', members_reg_number='R001')
+
+    def ingest(self, *events):
+        response = self.client.post('/api/inout/bulk/', {'events': list(events)}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return [result['status'] for result in response.json()['results']]
+
+    def add_unique_index(self):
+        # See GymInoutListTests.test_in_time_index_migration
+        self.migration.add_unique_index(None, connection.SchemaEditorClass(connection))
+
+    def test_replayed_events_are_reported_as_duplicates(self):
+        event = {'member_reg_code': 'R001', 'type': 'in', 'time': '2024-03-01T07:00:00Z'}
+        self.assertEqual(self.ingest(event), ['created'])
+        self.assertEqual(self.ingest(event), ['duplicate'])
+        self.assertEqual(GymInout.objects.count(), 1)
+
+    def test_a_row_stored_after_the_duplicate_check_is_not_inserted_again(self):
+        self.add_unique_index()
+        in_time = timezone.make_aware(datetime(2024, 3, 1, 7))
+        GymInout.objects.create(member_id='M1', member_reg_code='R001', in_time=in_time)
+        # As if a concurrent batch committed the row after this one looked
+        with mock.patch('membership.attendance._existing_rows', return_value=[]):
+            self.ingest({'member_reg_code': 'R001', 'type': 'in', 'time': in_time.isoformat()})
+        self.assertEqual(GymInout.objects.filter(member_reg_code='R001').count(), 1)
+
+    def test_unique_index_migration_leaves_existing_duplicates_alone(self):
+        in_time = timezone.now()
+        for _ in range(2):
+            GymInout.objects.create(member_reg_code='R001', in_time=in_time)
+        with self.assertWarns(UserWarning):
+            self.add_unique_index()
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, 'gym_inout')
+        self.assertNotIn('gym_inout_reg_code_in_time_uniq', constraints)
+
+
+class AcceptPaymentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = GymMember.objects.create(is_exist=1, role_name='member', member_id='M-100')
+        cls.plan = Membership.objects.create(
+            membership_label='Monthly', membership_class='monthly', membership_length=30, membership_amount=50,
+        )
+
+    def setUp(self):
+        invalidate_plans()
+
+    def pay(self, **headers):
+        return self.client.post(
+            '/api/accept-payment/', {'member_id': 'M-100', 'membership_class': 'monthly'},
+            content_type='application/json', headers=headers,
+        )
+
+    def test_payment_without_an_idempotency_key_is_refused(self):
+        self.assertEqual(self.pay().status_code, 400)
+        self.assertFalse(MembershipPayment.objects.exists())
+
+    def test_second_payment_on_the_same_day_with_its_own_key_is_accepted(self):
+        self.assertEqual(self.pay(**{'Idempotency-Key': 'day-1'}).status_code, 200)
+        self.assertEqual(self.pay(**{'Idempotency-Key': 'day-2'}).status_code, 200)
+        payments = MembershipPayment.objects.filter(membership_id=self.plan.id)
+        # Stored against the member's primary key, not the member_id code
+        self.assertEqual(list(payments.values_list('member_id', flat=True)), [self.member.id, self.member.id])
+
+    def test_retried_request_with_the_same_key_is_recorded_once(self):
+        self.assertEqual(self.pay(**{'Idempotency-Key': 'tap-1'}).status_code, 200)
+        retry = self.pay(**{'Idempotency-Key': 'tap-1'})
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(MembershipPayment.objects.count(), 1)
+
+    def pending_claim(self, key, age, ttl=timedelta(days=1), **fields):
+        data = {'member_id': 'M-100', 'membership_class': 'monthly'}
+        record = IdempotencyKey.objects.create(
+            key_hash=_sha256(f'accept-payment:{key}'),
+            request_hash=_sha256(json.dumps(data, sort_keys=True)),
+            expires_at=timezone.now() + ttl,
+            **fields,
+        )
+        IdempotencyKey.objects.filter(pk=record.pk).update(created_at=timezone.now() - age)
+
+    @override_settings(IDEMPOTENCY_PENDING_TIMEOUT=60)
+    def test_claim_still_within_its_lease_is_reported_as_in_progress(self):
+        self.pending_claim('tap-2', timedelta(seconds=5))
+        self.assertEqual(self.pay(**{'Idempotency-Key': 'tap-2'}).status_code, 409)
+        self.assertFalse(MembershipPayment.objects.exists())
+
+    @override_settings(IDEMPOTENCY_PENDING_TIMEOUT=60, QUERY_BUDGET_STRICT=True)
+    def test_claim_left_pending_past_its_lease_is_taken_over(self):
+        self.pending_claim('tap-3', timedelta(minutes=5))
+        self.assertEqual(self.pay(**{'Idempotency-Key': 'tap-3'}).status_code, 200)
+        record = IdempotencyKey.objects.get(key_hash=_sha256('accept-payment:tap-3'))
+        self.assertEqual(record.status_code, 200)
+        self.assertEqual(MembershipPayment.objects.count(), 1)
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_expired_key_is_taken_over_by_a_new_payment(self):
+        self.pending_claim('tap-5', timedelta(days=2), ttl=-timedelta(days=1), status_code=200, response_body={})
+        response = self.pay(**{'Idempotency-Key': 'tap-5'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(IdempotencyKey.objects.get().response_body, response.json())
+        self.assertEqual(MembershipPayment.objects.count(), 1)
+
+    def test_failed_request_leaves_no_claim_behind(self):
+        with mock.patch.object(GymMember, 'save', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.pay(**{'Idempotency-Key': 'tap-4'})
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.pay(**{'Idempotency-Key': 'tap-4'}).status_code, 200)
+
+
+class PaymentLedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = GymMember.objects.create(is_exist=1, role_name='member', member_id='M-200')
+
+    def payment(self, amount=100, paid=0):
+        return MembershipPayment.objects.create(
+            member_id=self.member.id, membership_amount=amount, paid_amount=paid, is_active=1,
+        )
+
+    def installment(self, payment, amount):
+        return MembershipPaymentHistory.objects.create(mp_id=payment.mp_id, amount=amount)
+
+    def paid(self, payment):
+        return MembershipPayment.objects.get(mp_id=payment.mp_id).paid_amount
+
+    def test_installments_set_paid_amount_to_their_total(self):
+        payment, other = self.payment(), self.payment()
+        first = self.installment(payment, 30)
+        second = self.installment(payment, 20)
+        self.assertEqual(self.paid(payment), 50)
+        second.amount = 25
+        second.save()
+        self.assertEqual(self.paid(payment), 55)
+        first.mp_id = other.mp_id
+        first.save()
+        self.assertEqual((self.paid(payment), self.paid(other)), (25, 30))
+        second.delete()
+        self.assertEqual(self.paid(payment), 0)
+
+    def test_writer_that_also_updates_paid_amount_does_not_count_twice(self):
+        payment = self.payment()
+        self.installment(payment, 40)
+        response = self.client.patch(
+            f'/api/membership-payment/{payment.mp_id}/', {'paid_amount': 80}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['paid_amount'], 40)
+        self.assertEqual(self.paid(payment), 40)
+
+    def test_payment_without_installments_keeps_its_paid_amount(self):
+        payment = self.payment(paid=100)
+        payment.save()
+        self.assertEqual(self.paid(payment), 100)
+
+    def test_reconcile_corrects_rows_written_around_the_signals(self):
+        drifted, settled, untracked = self.payment(paid=90), self.payment(), self.payment(paid=100)
+        MembershipPaymentHistory.objects.bulk_create([
+            MembershipPaymentHistory(mp_id=drifted.mp_id, amount=60),
+            MembershipPaymentHistory(mp_id=settled.mp_id, amount=100),
+        ])
+        MembershipPayment.objects.filter(mp_id=settled.mp_id).update(paid_amount=100)
+        self.assertEqual(list(unreconciled_payments().values_list('mp_id', flat=True)), [drifted.mp_id])
+        self.assertEqual(reconcile_paid_amounts(), 1)
+        self.assertEqual([self.paid(p) for p in (drifted, settled, untracked)], [60, 100, 100])
+        self.assertFalse(unreconciled_payments().exists())
+
+    def test_ledger_balance_comes_from_installments(self):
+        drifted, untracked = self.payment(paid=90), self.payment(paid=100)
+        MembershipPaymentHistory.objects.bulk_create([MembershipPaymentHistory(mp_id=drifted.mp_id, amount=60)])
+        rows = {row['mp_id']: row for row in payment_ledger(active_payments())}
+        self.assertEqual((rows[drifted.mp_id]['installment_total'], rows[drifted.mp_id]['balance']), (60, 40))
+        self.assertEqual(rows[untracked.mp_id]['balance'], 0)
+        [member] = member_ledger(active_payments())
+        self.assertEqual((member['total_paid'], member['balance']), (160, 40))
+        self.assertEqual([row['balance'] for row in members_in_arrears(active_payments())], [40])
+
+
+class FastListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = GymMember.objects.create(
+            is_exist=1, role_name='Member', first_name='Sara', last_name='Malik', membership_status='Continue',
+            image='members/sara.jpg', birth_date=date(1990, 5, 1), membership_valid_to=date(2025, 1, 31),
+            alert_sent=0, fingerprint='AAAA',
+        )
+        GymMember.objects.create(is_exist=1, role_name='member', first_name='Omar')
+        MembershipPayment.objects.create(
+            member_id=cls.member.id, membership_amount=50.5, paid_amount=50, start_date=date(2024, 3, 1),
+            payment_status='Fully Paid', is_active=1,
+        )
+        MembershipPayment.objects.create(member_id=cls.member.id)
+        GymIncomeExpense.objects.create(
+            invoice_type='income', invoice_label='Membership fee', entry='[{"amount": 50}]', total_amount=50.25,
+            receiver_id=cls.member.id, invoice_date=date(2024, 3, 1), is_active=1, mp_id='1',
+        )
+        GymIncomeExpense.objects.create(invoice_type='expense')
+
+    def assertFastListMatches(self, path, params=None):
+        regular = self.client.get(path, params or {})
+        fast = self.client.get(path, {**(params or {}), 'fast': 'true'})
+        self.assertEqual((regular.status_code, fast.status_code), (200, 200))
+        # The fast path answers with a plain orjson HttpResponse, not a DRF Response
+        self.assertFalse(hasattr(fast, 'data'))
+        regular_rows, fast_rows = regular.json()['results'], fast.json()['results']
+        self.assertEqual(len(fast_rows), len(regular_rows))
+        self.assertTrue(regular_rows)
+        for regular_row, fast_row in zip(regular_rows, fast_rows):
+            self.assertEqual(list(fast_row), list(regular_row))
+            for name, value in regular_row.items():
+                self.assertEqual(fast_row[name], value, name)
+
+    def test_members(self):
+        self.assertFastListMatches('/api/members/')
+        self.assertFastListMatches('/api/members/', {'view': 'summary'})
+
+    def test_member_fields_without_image_dont_load_it(self):
+        for i in range(10):
+            GymMember.objects.create(is_exist=1, role_name='member', first_name=f'M{i}', image=f'members/{i}.jpg')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/members/', {'fields': 'first_name'})
+        self.assertLessEqual(len(queries), 4)
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'first_name'})
+        self.assertFastListMatches('/api/members/', {'fields': 'first_name'})
+        self.assertFastListMatches('/api/members/', {'fields': 'first_name,image'})
+
+    def test_membership_payments(self):
+        self.assertFastListMatches('/api/membership-payment/')
+
+    def test_income_expense(self):
+        self.assertFastListMatches('/api/income-expense/')
+
+    def test_serializers_with_their_own_representation_are_not_supported(self):
+        class Extra(MembershipPaymentSerializer):
+            def to_representation(self, instance):
+                return {**super().to_representation(instance), 'extra': 1}
+
+        class Computed(MembershipPaymentSerializer):
+            balance = serializers.SerializerMethodField()
+
+            def get_balance(self, obj):
+                return 0
+
+        class ExtendedMember(GymMemberSerializer):
+            def to_representation(self, instance):
+                return {**super().to_representation(instance), 'extra': 1}
+
+        self.assertTrue(ValuesRowBuilder(MembershipPaymentSerializer()).supported)
+        self.assertTrue(ValuesRowBuilder(GymMemberSerializer()).supported)
+        for serializer in (Extra(), Computed(), ExtendedMember()):
+            self.assertFalse(ValuesRowBuilder(serializer).supported, type(serializer).__name__)
+
+
+class IndexAdvisorTests(TestCase):
+    role_status = IndexSpec('gym_member', ('role_name', 'membership_status'), 'gym_member_role_status_idx', '')
+    checkin = IndexSpec('gym_inout', ('member_reg_code', 'in_time'), 'gym_inout_reg_code_in_time_uniq', '', unique=True)
+
+    def test_mysql_ddl_is_online_and_prefixes_text_columns(self):
+        self.assertEqual(
+            create_index_sql(self.role_status, 'mysql'),
+            'ALTER TABLE `gym_member` ADD INDEX `gym_member_role_status_idx` '
+            '(`role_name`(191), `membership_status`(191)), ALGORITHM=INPLACE, LOCK=NONE',
+        )
+        self.assertEqual(
+            create_index_sql(self.checkin, 'mysql'),
+            'ALTER TABLE `gym_inout` ADD UNIQUE INDEX `gym_inout_reg_code_in_time_uniq` '
+            '(`member_reg_code`, `in_time`), ALGORITHM=INPLACE, LOCK=NONE',
+        )
+        self.assertEqual(
+            drop_index_sql(self.checkin, 'mysql'),
+            'ALTER TABLE `gym_inout` DROP INDEX `gym_inout_reg_code_in_time_uniq`, ALGORITHM=INPLACE, LOCK=NONE',
+        )
+
+    def test_sqlite_ddl(self):
+        self.assertEqual(
+            create_index_sql(self.role_status, 'sqlite'),
+            'CREATE INDEX IF NOT EXISTS "gym_member_role_status_idx" ON "gym_member" ("role_name", "membership_status")',
+        )
+        self.assertEqual(
+            create_index_sql(self.checkin, 'sqlite'),
+            'CREATE UNIQUE INDEX IF NOT EXISTS "gym_inout_reg_code_in_time_uniq" ON "gym_inout" ("member_reg_code", "in_time")',
+        )
+        self.assertEqual(drop_index_sql(self.checkin, 'sqlite'), 'DROP INDEX IF EXISTS "gym_inout_reg_code_in_time_uniq"')
+
+    def test_missing_indexes(self):
+        # The test runner creates the legacy tables without their indexes
+        no_table = IndexSpec('no_such_table', ('id',), 'no_such_table_idx', '')
+        specs = [self.role_status, self.checkin, no_table]
+        self.assertEqual(missing_indexes(connection, specs), [self.role_status, self.checkin])
+        with connection.cursor() as cursor:
+            cursor.execute(create_index_sql(self.checkin, connection.vendor))
+            # An index with the same leading columns covers a plain spec
+            cursor.execute('CREATE INDEX "gym_member_role_idx" ON "gym_member" ("role_name", "membership_status", "id")')
+        self.assertEqual(missing_indexes(connection, specs), [])
+        # but a unique spec needs a unique index on exactly its columns
+        wider = IndexSpec('gym_member', ('role_name', 'membership_status'), 'other', '', unique=True)
+        self.assertEqual(missing_indexes(connection, [wider]), [wider])
+
+    def test_hot_indexes_migration(self):
+        migration = import_module('membership.migrations.0012_hot_indexes')
+
+        def index_names():
+            names = set()
+            with connection.cursor() as cursor:
+                for table in ('gym_member', 'gym_inout', 'gym_income_expense'):
+                    names |= set(connection.introspection.get_constraints(cursor, table))
+            return names
+
+        expected = {name for _, _, name in migration.INDEXES}
+        schema_editor = connection.SchemaEditorClass(connection)
+        migration.add_indexes(None, schema_editor)
+        self.assertLessEqual(expected, index_names())
+        # Already covered columns aren't indexed twice
+        migration.add_indexes(None, schema_editor)
+        migration.remove_indexes(None, schema_editor)
+        self.assertFalse(expected & index_names())
+
+
+class NormalizedRoleStatusTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        GymMember.objects.create(is_exist=1, role_name='Member', membership_status='Continue')
+        GymMember.objects.create(is_exist=1, role_name='member', membership_status='expired')
+        GymMember.objects.create(is_exist=1, role_name='staff_member', membership_status='Continue')
+
+    def test_role_and_status_filters_compare_the_normalized_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/members/', {'query': 'active-members'})
+        self.assertEqual(response.json(), {'active_members': 1})
+        [query] = queries.captured_queries
+        self.assertIn('"gym_member"."role_name_norm" = ', query['sql'])
+        self.assertIn('"gym_member"."membership_status_norm" = ', query['sql'])
+        self.assertNotRegex(query['sql'].upper(), r'\bLIKE\b|\bUPPER\(|\bLOWER\(')
+
+    def test_normalized_index_serves_the_filters(self):
+        migration = import_module('membership.migrations.0013_gym_member_normalized_role_status')
+        schema_editor = connection.SchemaEditorClass(connection)
+        migration.add_normalized_columns(None, schema_editor)
+        queryset = GymMember.objects.filter(role_name_norm='member', membership_status_norm='continue').values('id')
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            self.assertIn('gym_member_role_status_norm_idx', ' '.join(str(row) for row in cursor.fetchall()))
+        migration._drop_index(schema_editor, migration.NORMALIZED_INDEX)
+
+
+class TokenRefreshTests(TestCase):
+    def test_refresh_needs_the_caller_s_access_token(self):
+        refresh = RefreshToken.for_user(User.objects.create_user('desk', password='x'))
+        body = {'refresh': str(refresh)}
+        self.assertEqual(self.client.post('/api/token/refresh/', body).status_code, 401)
+        response = self.client.post(
+            '/api/token/refresh/', body, headers={'Authorization': f'Bearer {refresh.access_token}'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.json())
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = GymMember.objects.create(
+            is_exist=1, role_name='member', member_id='M-300', members_reg_number='R300', membership_status='Continue',
+        )
+        cls.plan = Membership.objects.create(
+            membership_label='Monthly', membership_class='monthly', membership_length=30, membership_amount=50,
+        )
+        cls.payment = MembershipPayment.objects.create(member_id=cls.member.id, membership_amount=50, is_active=1)
+        MembershipPaymentHistory.objects.create(mp_id=cls.payment.mp_id, amount=20)
+        GymIncomeExpense.objects.create(invoice_type='income', total_amount=20, invoice_date=date(2024, 3, 1))
+        GymInout.objects.create(member_reg_code='R300', in_time=timezone.now())
+
+    def setUp(self):
+        cache.clear()
+        invalidate_plans()
+
+    def test_reads_stay_within_their_budget(self):
+        for path, params in [
+            ('/api/members/', {}),
+            ('/api/members/', {'view': 'summary'}),
+            ('/api/members/', {'fast': 'true'}),
+            ('/api/members/', {'query': 'active-members'}),
+            ('/api/membership/', {}),
+            ('/api/membership-payment/', {}),
+            ('/api/membership-payment/', {'query': 'ledger'}),
+            ('/api/membership-payment/', {'query': 'arrears'}),
+            ('/api/membership-payment-history/', {'mp_id': self.payment.mp_id}),
+            ('/api/income-expense/', {}),
+            ('/api/income-expense/', {'query': 'invoice-type-income'}),
+            ('/api/inout/', {}),
+            ('/api/dashboard/summary/', {}),
+        ]:
+            with self.subTest(path=path, params=params):
+                self.assertEqual(self.client.get(path, params).status_code, 200)
+
+    def test_writes_stay_within_their_budget(self):
+        today = str(timezone.localdate())
+        for path, body, headers in [
+            ('/api/accept-payment/', {'member_id': 'M-300', 'membership_class': 'monthly'}, {'Idempotency-Key': 'b-0'}),
+            ('/api/accept-payment/', {'member_id': 'M-300', 'membership_class': 'monthly'}, {'Idempotency-Key': 'b-1'}),
+            ('/api/membership-payment/', {
+                'member_id': self.member.id, 'membership_id': self.plan.id, 'membership_amount': 50,
+                'paid_amount': 0, 'created_date': today, 'is_active': 1,
+            }, {'Idempotency-Key': 'b-2'}),
+            ('/api/membership-payment-history/', {
+                'mp_id': self.payment.mp_id, 'amount': 10, 'payment_method': 'Cash', 'paid_by_date': today,
+            }, {'Idempotency-Key': 'b-3'}),
+            ('/api/income-expense/', {
+                'invoice_type': 'expense', 'total_amount': 5, 'invoice_date': today, 'is_active': 1,
+            }, {'Idempotency-Key': 'b-4'}),
+        ]:
+            with self.subTest(path=path, headers=headers):
+                response = self.client.post(path, body, content_type='application/json', headers=headers)
+                self.assertIn(response.status_code, (200, 201))
+
+        installment = MembershipPaymentHistory.objects.latest('payment_history_id')
+        path = f'/api/membership-payment-history/{installment.payment_history_id}/'
+        self.assertEqual(self.client.patch(path, {'amount': 15}, content_type='application/json').status_code, 200)
+        self.assertEqual(self.client.delete(path).status_code, 204)
+
+    def test_going_over_budget_raises(self):
+        with mock.patch.object(DashboardSummaryView, 'query_budget', 0):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get('/api/dashboard/summary/')
+            with override_settings(QUERY_BUDGET_STRICT=False), self.assertLogs('membership.queries', 'WARNING'):
+                cache.clear()
+                self.assertEqual(self.client.get('/api/dashboard/summary/').status_code, 200)
+
+    async def test_requests_through_the_async_handler_are_profiled(self):
+        response = await self.async_client.get('/api/dashboard/summary/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+        await sync_to_async(cache.clear)()
+        with mock.patch.object(DashboardSummaryView, 'query_budget', 0):
+            with self.assertRaises(QueryBudgetExceeded):
+                await self.async_client.get('/api/dashboard/summary/')
+
+
+class MonthlyRollupTests(TestCase):
+    def month(self, year, month):
+        return GymIncomeExpenseMonthly.objects.filter(year=year, month=month).values_list(
+            'total_revenue', 'total_expenses', 'profit', 'entry_count',
+        ).first()
+
+    def test_writes_move_the_month_totals(self):
+        income = GymIncomeExpense.objects.create(invoice_type='income', total_amount=100, invoice_date=date(2024, 3, 5))
+        GymIncomeExpense.objects.create(invoice_type='expense', total_amount=30, invoice_date=date(2024, 3, 9))
+        self.assertEqual(self.month(2024, 3), (100, 30, 70, 2))
+
+        income.total_amount = 120
+        income.save()
+        self.assertEqual(self.month(2024, 3), (120, 30, 90, 2))
+        income.invoice_date = date(2024, 4, 1)
+        income.save()
+        self.assertEqual((self.month(2024, 3), self.month(2024, 4)), ((0, 30, -30, 1), (120, 0, 120, 1)))
+        income.is_active = 0
+        income.save()
+        self.assertIsNone(self.month(2024, 4))
+
+        GymIncomeExpense.objects.get(invoice_type='expense').delete()
+        self.assertFalse(GymIncomeExpenseMonthly.objects.exists())
+
+    def test_changes_add_to_totals_written_in_the_meantime(self):
+        GymIncomeExpense.objects.create(invoice_type='income', total_amount=100, invoice_date=date(2024, 3, 5))
+        # Another transaction's row, counted in the rollup after this one read the month
+        GymIncomeExpenseMonthly.objects.filter(year=2024, month=3).update(
+            total_revenue=150, profit=150, entry_count=2,
+        )
+        GymIncomeExpense.objects.create(invoice_type='income', total_amount=10, invoice_date=date(2024, 3, 6))
+        self.assertEqual(self.month(2024, 3), (160, 0, 160, 3))
+
+    def test_backfill_counts_entries(self):
+        GymIncomeExpense.objects.bulk_create([
+            GymIncomeExpense(invoice_type='income', total_amount=10, invoice_date=date(2024, 3, day))
+            for day in (1, 2, 3)
+        ])
+        self.assertEqual(backfill(), 1)
+        self.assertEqual(self.month(2024, 3), (30, 0, 30, 3))
@@ -5,13 +5,18 @@ from .views import (
     MemberShipViewSet,
     GymIncomeExpenseViewSet,
     GymInoutViewSet,
+    BulkInoutView,
     # GymAttendanceViewSet,
     MemberShipPaymentViewSet,
+    MembershipPaymentHistoryViewSet,
     FingerModeView,
+    FingerprintIdentifyView,
     CustomLogin,
     TokenRefreshViewWithAdminPermission,
     AuthenticationCheckAPIView,
     AcceptPaymentView,
+    DashboardSummaryView,
+    checkin_stream,
 )
 # from .views import CustomLogin, TokenRefreshViewWithAdminPermission
 # from .views import (
@@ -31,6 +36,7 @@ router = DefaultRouter()
 router.register(r'members', MemberDataViewSet)
 router.register(r'membership', MemberShipViewSet)
 router.register(r'membership-payment', MemberShipPaymentViewSet)
+router.register(r'membership-payment-history', MembershipPaymentHistoryViewSet)
 router.register(r'income-expense', GymIncomeExpenseViewSet)
 # router.register(r'inout', GymInoutViewSet)
 
@@ -46,8 +52,12 @@ urlpatterns = [
     # Include the default router URLs
     path('api/', include(router.urls)),
     path('api/finger-mode/', FingerModeView.as_view(), name='finger-mode'),
+    path('api/fingerprint/identify/', FingerprintIdentifyView.as_view(), name='fingerprint-identify'),
     path('api/accept-payment/', AcceptPaymentView.as_view(), name='accept-payment'),
     path('api/inout/', GymInoutViewSet.as_view({'get': 'list'}), name='inout'),
+    path('api/inout/bulk/', BulkInoutView.as_view(), name='inout-bulk'),
+    path('api/inout/stream/', checkin_stream, name='inout-stream'),
+    path('api/dashboard/summary/', DashboardSummaryView.as_view(), name='dashboard-summary'),
 
 #     # Register APIViews
 #     path('api/total-members/', TotalMembersAPIView.as_view(), name='total-members'),
@@ -1,122 +1,204 @@
+from reportlab import rl_config
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Flowable
 from reportlab.lib.styles import getSampleStyleSheet
 from .models import GymMember
 from io import BytesIO
 from django.http import HttpResponse
+import contextlib
 import datetime
+import functools
+import threading
 from django.shortcuts import get_object_or_404
 from django.contrib.staticfiles import finders
 
+# Held while a receipt is built: it scopes the rl_config.useA85 switch below to one
+# render at a time and serialises use of the shared logo reader
+_render_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _plain_image_streams():
+    """
+    Embed images as plain DCT data instead of ASCII85-encoding them, which took
+    most of each render. ReportLab only reads the flag as a global, so it is
+    switched back as soon as the document is built.
+    """
+    previous = rl_config.useA85
+    rl_config.useA85 = 0
+    try:
+        yield
+    finally:
+        rl_config.useA85 = previous
+
+
+class LogoImage(Flowable):
+    """Draws an already decoded ImageReader, centred like a platypus Image."""
+
+    def __init__(self, image, width, height):
+        super().__init__()
+        self.image = image
+        self.width = width
+        self.height = height
+        self.hAlign = 'CENTER'
+
+    def wrap(self, available_width, available_height):
+        return self.width, self.height
+
+    def draw(self):
+        self.canv.drawImage(self.image, 0, 0, self.width, self.height, mask='auto')
+
+
+class ReceiptTemplate:
+    """
+    The parts of a receipt that are the same for every payment: the parsed
+    stylesheet, both table styles and the decoded logo. Images are embedded
+    without ASCII85 encoding unless `ascii85` is set.
+    Use get_receipt_template() to share one instance per process.
+    """
+
+    def __init__(self, logo_path=None, ascii85=False):
+        self.styles = getSampleStyleSheet()
+        self.from_bill_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 10),
+            ('ALIGN', (0, 1), (-1, -1), 'LEFT'),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ])
+        self.details_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 11),
+            ('ALIGN', (0, 1), (-1, -1), 'LEFT'),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ])
+        self.ascii85 = ascii85
+        self.logo = None
+        if logo_path:
+            try:
+                self.logo = ImageReader(logo_path)
+            except OSError:
+                pass
+
+    def render(self, income, member_info):
+        """
+        Render the receipt PDF for a payment and its member.
+        :param income: MembershipPayment instance.
+        :param member_info: GymMember the payment belongs to.
+        :return: the PDF document as bytes.
+        """
+        styles = self.styles
+        # Dated by the payment so a stored receipt stays valid on later downloads
+        invoice_date = getattr(income, 'created_date', None) or datetime.date.today()
+
+        buffer = BytesIO()
+        margin = 30  # 30 points padding on each side
+        doc = SimpleDocTemplate(
+            buffer,
+            pagesize=letter,
+            leftMargin=margin,
+            rightMargin=margin,
+            topMargin=margin,
+            bottomMargin=margin
+        )
+
+        elements = []
+
+        if self.logo is not None:
+            elements.append(LogoImage(self.logo, width=100, height=120))
+        else:
+            elements.append(Paragraph("<b><font size=12 color='red'>Logo not found</font></b>", styles['Normal']))
+
+        elements.append(Spacer(1, 20))
+
+        # Header with invoice title
+        elements.append(Paragraph("<b><font size=24 color='navy'>INVOICE</font></b>", styles['Title']))
+        elements.append(Spacer(1, 12))
+
+        # "From" and "Bill To" section
+        from_bill_data = [
+            ["From", "Bill To", "Invoice Details"],
+            [
+                "Fitness First Gym",
+                f"{member_info.first_name} {member_info.last_name}\nMember ID: {income.mp_id}",
+                f"Invoice #: {income.mp_id}\nInvoice Date: {invoice_date.strftime('%Y-%m-%d')}\nPayment Status: Paid",
+            ],
+        ]
+        from_bill_table = Table(from_bill_data, colWidths=[200, 200, 200])
+        from_bill_table.setStyle(self.from_bill_style)
+        elements.append(from_bill_table)
+        elements.append(Spacer(1, 20))
+
+        # Details Table
+        details_data = [
+            ["Field", "Details"],
+            ["ID", str(income.mp_id)],
+            ["Invoice Label", "Membership Fee"],
+            ["Membership Valid From", str(member_info.membership_valid_from)],
+            ["Membership Valid To", str(member_info.membership_valid_to)],
+            ["Membership Status", str(member_info.membership_status)],
+            ["Payment Status", "Paid"],
+            ["Date", str(invoice_date)],
+            ["Amount", f"{income.paid_amount:.2f}"],
+        ]
+        details_table = Table(details_data, colWidths=[150, 350])
+        details_table.setStyle(self.details_style)
+        elements.append(details_table)
+        elements.append(Spacer(1, 20))
+
+        # Footer with terms
+        footer = [
+            Paragraph("<font size=10 color='grey'>This is a computer-generated receipt and does not require physical signature.</font>", styles['Normal']),
+            Spacer(1, 6),
+        ]
+        elements.extend(footer)
+
+        # Build the PDF
+        with _render_lock, (contextlib.nullcontext() if self.ascii85 else _plain_image_streams()):
+            doc.build(elements)
+        return buffer.getvalue()
+
+
+@functools.lru_cache(maxsize=None)
+def get_receipt_template():
+    """The process-wide ReceiptTemplate, built on first use."""
+    return ReceiptTemplate(finders.find('logo.jpg'))
+
+
 def generate_pdf_receipt(income, member):
     """
     Generate a premium-styled PDF receipt inspired by the uploaded invoice design.
     :param income: GymIncomeExpense instance (income type).
     :return: HttpResponse containing the PDF file.
     """
-    print(member)
     member_info = get_object_or_404(GymMember, id=member)
-    firstname = member_info.first_name
-    lastname = member_info.last_name
-    membership_valid_from = member_info.membership_valid_from
-    membership_valid_to = member_info.membership_valid_to
-    membership_status = member_info.membership_status
-
-    buffer = BytesIO()
-    margin = 30  # 30 points padding on each side
-    doc = SimpleDocTemplate(
-        buffer, 
-        pagesize=letter, 
-        leftMargin=margin, 
-        rightMargin=margin, 
-        topMargin=margin, 
-        bottomMargin=margin
-    )
-    styles = getSampleStyleSheet()
-
-    elements = []
-    
-    logo_path = finders.find('logo.jpg')
-    try:
-        logo = Image(logo_path, width=100, height=120)
-        elements.append(logo)
-    except FileNotFoundError:
-        elements.append(Paragraph("<b><font size=12 color='red'>Logo not found</font></b>", styles['Normal']))
-
-    elements.append(Spacer(1, 20))
-
-    # Header with invoice title
-    elements.append(Paragraph("<b><font size=24 color='navy'>INVOICE</font></b>", styles['Title']))
-    elements.append(Spacer(1, 12))
-    
-    # "From" and "Bill To" section
-    from_bill_data = [
-        ["From", "Bill To", "Invoice Details"],
-        [
-            "Fitness First Gym",
-            f"{firstname} {lastname}\n{"Member ID: " + str(income.mp_id)}",
-            f"Invoice #: {income.mp_id}\nInvoice Date: {datetime.datetime.now().strftime('%Y-%m-%d')}\nPayment Status: {"Paid"}",
-        ],
-    ]
-    from_bill_table = Table(from_bill_data, colWidths=[200, 200, 200])
-    from_bill_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-        ('ALIGN', (0, 1), (-1, -1), 'LEFT'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-    ]))
-    elements.append(from_bill_table)
-    elements.append(Spacer(1, 20))
-
-    # Details Table
-    details_data = [
-        ["Field", "Details"],
-        ["ID", str(income.mp_id)],
-        ["Invoice Label", "Membership Fee"],
-        ["Membership Valid From", str(membership_valid_from)],
-        ["Membership Valid To", str(membership_valid_to)],
-        ["Membership Status", str(membership_status)],
-        ["Payment Status", "Paid"],
-        ["Date", str(datetime.date.today())],
-        ["Amount", f"{income.paid_amount:.2f}"],
-    ]
-
-    details_table = Table(details_data, colWidths=[150, 350])
-    details_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 11),
-        ('ALIGN', (0, 1), (-1, -1), 'LEFT'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-    ]))
-    elements.append(details_table)
-    elements.append(Spacer(1, 20))
-
-    # Footer with terms
-    footer = [
-        Paragraph("<font size=10 color='grey'>This is a computer-generated receipt and does not require physical signature.</font>", styles['Normal']),
-        Spacer(1, 6),
-    ]
-    elements.extend(footer)
-
-    # Build the PDF
-    doc.build(elements)
-    buffer.seek(0)
+    pdf = render_pdf_receipt(income, member_info)
 
     # Return as an HTTP response
-    response = HttpResponse(buffer, content_type='application/pdf')
+    response = HttpResponse(pdf, content_type='application/pdf')
     response['Content-Disposition'] = f'attachment; filename="receipt_{income.mp_id}.pdf"'
     return response
+
+
+def render_pdf_receipt(income, member_info):
+    """
+    Render the receipt PDF for a payment and its member.
+    :param income: MembershipPayment instance.
+    :param member_info: GymMember the payment belongs to.
+    :return: the PDF document as bytes.
+    """
+    return get_receipt_template().render(income, member_info)
@@ -1,31 +1,56 @@
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
 from .CustomPagination import CustomPageNumberPagination
 from .utils import generate_pdf_receipt
+from .receipts import get_receipt, queue_receipt, export_receipts
+from .dashboard import get_dashboard_summary
+from .stream import checkin_events
+from .finger_state import DEVICE_MAX_LENGTH, get_finger_mode_store
+from .fingerprints import decode_template, get_fingerprint_index
+from .attendance import ingest_events
+from .expiry import membership_status_for
+from .plans import get_plan, plan_names
+from .idempotency import idempotent
+from .fast_json import FastListMixin
+from .ledger import active_payments, payment_ledger, member_ledger, members_in_arrears, with_member_info
 from datetime import timedelta
+import math
 from .models import (
                      GymMember,
                      Membership,
                      GymIncomeExpense,
+                     GymIncomeExpenseMonthly,
                      GymInout,
                      MembershipPayment,
+                     MembershipPaymentHistory,
                      )
 from .serializers import (
                           GymMemberSerializer,
+                          GymMemberListSerializer,
                           MembershipSerializer,
                           GymIncomeExpenseSerializer,
                           GymInoutSerializer,
                           MembershipPaymentSerializer,
+                          MembershipPaymentHistorySerializer,
+                          GymMemberSimpleSerializer,
+                          get_members_by_reg_code,
                           )
+from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.views import TokenRefreshView
 from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from django.contrib.auth.models import User
 from rest_framework import status
+from django.db import transaction
 from django.db.models import Sum
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django_filters.rest_framework import DjangoFilterBackend
 from .filters import (
                       GymMemberFilter,
@@ -33,44 +58,77 @@ from .filters import (
                       GymInoutFilter,
                       GymIncomeExpenseFilter,
                       MembershipPaymentFilter,
+                      MembershipPaymentHistoryFilter,
                       )
-from django.db.models import FloatField, F, Q, Value
-from django.db.models.functions import ExtractMonth, ExtractYear, Coalesce
+from django.db.models import FloatField
 
 
-class MemberDataViewSet(viewsets.ModelViewSet):
-    queryset = GymMember.objects.filter(role_name__iexact='member')
+class MemberDataViewSet(FastListMixin, viewsets.ModelViewSet):
+    queryset = GymMember.objects.filter(role_name_norm='member')
     serializer_class = GymMemberSerializer
     permission_classes = [AllowAny]
     pagination_class = CustomPageNumberPagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = GymMemberFilter
+    # Indexed column used by ?cursor= pagination
+    cursor_ordering = '-id'
+    query_budget = {'list': 4, 'retrieve': 2, 'create': 14, 'update': 14, 'partial_update': 14, 'destroy': 10}
+
+    def get_list_fields(self):
+        """
+        Columns a list request asked for: ?fields=a,b,c or ?view=summary. None
+        means the full GymMemberSerializer.
+        """
+        if self.action != 'list':
+            return None
+        params = self.request.query_params
+        if params.get('fields'):
+            fields = [name.strip() for name in params['fields'].split(',') if name.strip()]
+            unknown = set(fields) - set(GymMemberListSerializer.listable_fields())
+            if unknown:
+                raise ValidationError({'fields': f"Unknown or hidden fields: {', '.join(sorted(unknown))}"})
+            return ['id', *[name for name in fields if name != 'id']]
+        if params.get('view') == 'summary':
+            return GymMemberListSerializer.SUMMARY_FIELDS
+        return None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_list_fields()
+        if fields is not None:
+            # Unused columns, including the FingerPrint blob, are never read
+            queryset = queryset.only(*fields)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_list_fields()
+        if fields is not None:
+            kwargs.setdefault('context', self.get_serializer_context())
+            return GymMemberListSerializer(*args, fields=fields, **kwargs)
+        return super().get_serializer(*args, **kwargs)
 
     def perform_update(self, serializer):
-        super().perform_update(serializer)
-        
-        # Get the member object after saving
-        member = serializer.instance
-
-        if member.membership_valid_to and member.membership_valid_to < timezone.now().date():
-            member.membership_status = 'expired'
-        else:
-            member.membership_status = 'continue'
-
-        # Save the updated membership status
-        member.save()
+        # Work out the membership status from the incoming valid_to date so the
+        # member is written once; members nobody edits are expired by the
+        # expire_memberships command
+        valid_to = serializer.validated_data.get('membership_valid_to', serializer.instance.membership_valid_to)
+        serializer.save(membership_status=membership_status_for(valid_to))
     
     def list(self, request, *args, **kwargs):
         query_type = self.request.query_params.get('query', None)
 
         if query_type == 'total-members':
-            total_members = GymMember.objects.filter(role_name__iexact='member').count()
+            total_members = GymMember.objects.filter(role_name_norm='member').count()
             return Response({'total_members': total_members}, status=200)
         
         elif query_type == 'active-members':
-            active_members = GymMember.objects.filter(role_name__iexact='member', membership_status__iexact='continue').count()
+            active_members = GymMember.objects.filter(role_name_norm='member', membership_status_norm='continue').count()
             return Response({'active_members': active_members}, status=200)
 
+        if self.wants_fast_list():
+            response = self.fast_list(request)
+            if response is not None:
+                return response
         return super().list(request, *args, **kwargs)
 
 
@@ -81,15 +139,25 @@ class MemberShipViewSet(viewsets.ModelViewSet):
     pagination_class = CustomPageNumberPagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = MembershipFilter
+    # Indexed column used by ?cursor= pagination
+    cursor_ordering = '-id'
+    query_budget = {'list': 3, 'retrieve': 2}
 
 
-class MemberShipPaymentViewSet(viewsets.ModelViewSet):
+class MemberShipPaymentViewSet(FastListMixin, viewsets.ModelViewSet):
     queryset = MembershipPayment.objects.all()
     serializer_class = MembershipPaymentSerializer
     permission_classes = [AllowAny]
     pagination_class = CustomPageNumberPagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = MembershipPaymentFilter
+    # Indexed column used by ?cursor= pagination
+    cursor_ordering = '-mp_id'
+    query_budget = {'list': 6, 'retrieve': 2, 'create': 11}
+
+    @idempotent('membership-payment')
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
     
     def list(self, request, *args, **kwargs):
         query_type = self.request.query_params.get('query', None)
@@ -100,15 +168,104 @@ class MemberShipPaymentViewSet(viewsets.ModelViewSet):
                 return Response({"error": "mp_id is required"}, status=400)
 
             mp = get_object_or_404(MembershipPayment, mp_id=mp_id)
-            member_id = mp.member_id
-            return generate_pdf_receipt(mp, member_id)
-        
+            member = get_object_or_404(GymMember, id=mp.member_id)
+            response = HttpResponse(get_receipt(mp, member), content_type='application/pdf')
+            response['Content-Disposition'] = f'attachment; filename="receipt_{mp.mp_id}.pdf"'
+            return response
+
+        if query_type == 'export-receipts':
+            # Takes the regular filters plus an optional created_date range
+            export_format = self.request.query_params.get('export_format', 'zip')
+            if export_format not in ['zip', 'pdf']:
+                return Response({"error": "Invalid export_format! Choices are 'zip' and 'pdf'"}, status=400)
+
+            payments = self.filter_queryset(self.get_queryset())
+            for param, lookup in [('start_date', 'created_date__gte'), ('end_date', 'created_date__lte')]:
+                value = self.request.query_params.get(param)
+                if value:
+                    try:
+                        parsed = parse_date(value)
+                    except ValueError:
+                        parsed = None
+                    if parsed is None:
+                        return Response({"error": f"{param} must be a date in YYYY-MM-DD format"}, status=400)
+                    payments = payments.filter(**{lookup: parsed})
+
+            payments = payments.order_by('mp_id')
+            if payments.count() > settings.RECEIPT_EXPORT_MAX:
+                return Response({"error": f"Too many receipts, narrow the export to at most {settings.RECEIPT_EXPORT_MAX}"}, status=400)
+
+            export, skipped = export_receipts(payments, export_format)
+            response = FileResponse(export, as_attachment=True, filename=f"receipts.{export_format}")
+            # Payments whose member no longer exists have no receipt
+            response['Skipped-Receipts'] = ','.join(str(mp_id) for mp_id in skipped)
+            return response
+
+        if query_type in ['ledger', 'arrears']:
+            # Balances per payment, or per member with ?group=member; arrears lists members owing money
+            payments = self.filter_queryset(active_payments())
+            member_id = self.request.query_params.get('member_id')
+            if member_id:
+                payments = payments.filter(member_id=member_id)
+
+            if query_type == 'arrears':
+                rows = members_in_arrears(payments)
+            elif self.request.query_params.get('group') == 'member':
+                rows = member_ledger(payments)
+            else:
+                rows = payment_ledger(payments)
+
+            page = self.paginate_queryset(rows)
+            if page is not None:
+                return self.get_paginated_response(with_member_info(list(page)))
+            return Response(with_member_info(list(rows)), status=200)
+
+        if self.wants_fast_list():
+            response = self.fast_list(request)
+            if response is not None:
+                return response
         return super().list(request, *args, **kwargs)
 
 
+class MembershipPaymentHistoryViewSet(viewsets.ModelViewSet):
+    """
+    Installments paid towards a membership payment. Creating, editing or deleting
+    one keeps the payment's paid_amount in step.
+    """
+    queryset = MembershipPaymentHistory.objects.all().order_by('-payment_history_id')
+    serializer_class = MembershipPaymentHistorySerializer
+    permission_classes = [AllowAny]
+    pagination_class = CustomPageNumberPagination
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = MembershipPaymentHistoryFilter
+    # Indexed column used by ?cursor= pagination
+    cursor_ordering = '-payment_history_id'
+    query_budget = {'list': 3, 'retrieve': 2, 'create': 11, 'update': 8, 'partial_update': 8, 'destroy': 6}
+
+    @idempotent('membership-payment-history')
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    # The installment and its paid_amount adjustment are written together
+    @transaction.atomic
+    def perform_create(self, serializer):
+        serializer.save()
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        serializer.save()
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
+
+
 class AcceptPaymentView(APIView):
     permission_classes = [AllowAny]
+    query_budget = 15
     
+    # Without a key two taps of the same payment can't be told from two payments, so one is required
+    @idempotent('accept-payment', required=True)
     def post(self, request, *args, **kwargs):
         # amount = request.data.get('amount')
         member_id = request.data.get('member_id')
@@ -116,59 +273,66 @@ class AcceptPaymentView(APIView):
 
         if not all([member_id, membership_class]):
             return Response({"error": "Missing required fields member_id and membership_class"}, status=status.HTTP_400_BAD_REQUEST)
-        
-        member = get_object_or_404(GymMember, member_id=member_id)
-        
-        valid_membership_classes = ['Regular Monthly', '3 month Cardio', 'Cardio Monthly', '3 Month Gym']
-        if membership_class not in valid_membership_classes:
-            return Response({"error": f"Invalid membership class. Choices are {', '.join(valid_membership_classes)}"}, status=status.HTTP_400_BAD_REQUEST)
-        
-        if membership_class == "Regular Monthly":
-            updated_date_to_expire = timezone.now() + timedelta(days=30)
-            amount = Membership.objects.get(membership_class='Regular Monthly').membership_amount
-        elif membership_class == "3 month Cardio":
-            updated_date_to_expire = timezone.now() + timedelta(days=90)
-            amount = Membership.objects.get(membership_class='3 month Cardio').membership_amount
-        elif membership_class == "Cardio Monthly":
-            updated_date_to_expire = timezone.now() + timedelta(days=30)
-            amount = Membership.objects.get(membership_class='Cardio Monthly').membership_amount
-        elif membership_class == "3 Month Gym":
-            updated_date_to_expire = timezone.now() + timedelta(days=90)
-            amount = Membership.objects.get(membership_class='3 Month Gym').membership_amount
-        
-        member.membership_valid_from = timezone.now()
-        member.membership_valid_to = updated_date_to_expire
-        member.selected_membership = membership_class
-        member.membership_status = 'continue'
-        member.save()
-
-        payment_data = {
-            'member_id': member.member_id,
-            'membership_id': Membership.objects.get(membership_label=membership_class).id,
-            'membership_amount': amount,
-            'paid_amount': amount,
-            'start_date': timezone.now(),
-            'end_date': updated_date_to_expire,
-            'membership_status': 'Continue',
-            'created_date': timezone.now(),
-            'is_active': True,
-        }
-        payment_serializer = MembershipPaymentSerializer(data=payment_data)
-        if payment_serializer.is_valid():
-            payment_serializer.save()
-        else:
-            return Response(payment_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        plan = get_plan(membership_class)
+        if plan is None:
+            return Response({"error": f"Invalid membership class. Choices are {', '.join(plan_names())}"}, status=status.HTTP_400_BAD_REQUEST)
+        if not plan.membership_length:
+            return Response({"error": f"Membership {membership_class} has no membership length"}, status=status.HTTP_400_BAD_REQUEST)
+
+        today = timezone.localdate()
+        updated_date_to_expire = today + timedelta(days=plan.membership_length)
+        amount = plan.membership_amount
+
+        with transaction.atomic():
+            # Lock the member so concurrent payments for them update the membership one after the other;
+            # a repeat of the same payment carries the same Idempotency-Key and gets the first response
+            member = get_object_or_404(GymMember.objects.select_for_update(), member_id=member_id)
+
+            payment_data = {
+                # membership_payment.member_id refers to gym_member.id, as receipts expect
+                'member_id': member.id,
+                'membership_id': plan.id,
+                'membership_amount': amount,
+                'paid_amount': amount,
+                'start_date': today,
+                'end_date': updated_date_to_expire,
+                'membership_status': 'Continue',
+                'created_date': today,
+                'is_active': 1,
+            }
+            payment_serializer = MembershipPaymentSerializer(data=payment_data)
+            if not payment_serializer.is_valid():
+                return Response(payment_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+            member.membership_valid_from = today
+            member.membership_valid_to = updated_date_to_expire
+            member.selected_membership = membership_class
+            member.membership_status = 'continue'
+            # The renewed membership gets its own expiry reminders
+            member.alert_sent = 0
+            member.save()
+
+            payment = payment_serializer.save()
+            queue_receipt(payment.mp_id)
 
         return Response({"message": "Payment accepted and member record updated."}, status=status.HTTP_200_OK)
     
 
-class GymIncomeExpenseViewSet(viewsets.ModelViewSet):
+class GymIncomeExpenseViewSet(FastListMixin, viewsets.ModelViewSet):
     queryset = GymIncomeExpense.objects.all()
     serializer_class = GymIncomeExpenseSerializer
     permission_classes = [AllowAny]
     pagination_class = CustomPageNumberPagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = GymIncomeExpenseFilter
+    # Indexed column used by ?cursor= pagination
+    cursor_ordering = '-id'
+    query_budget = {'list': 5, 'retrieve': 2, 'create': 15}
+
+    @idempotent('income-expense')
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
 
     def list(self, request, *args, **kwargs):
         query_type = self.request.query_params.get('query', None)
@@ -220,95 +384,213 @@ class GymIncomeExpenseViewSet(viewsets.ModelViewSet):
             }, status=200)
 
         elif query_type == 'monthly-income-expense-profit':
-            # Query with separate year and month annotations
-            monthly_data = (
-                self.queryset.annotate(
-                    year=ExtractYear('invoice_date'),  # Extract year
-                    month=ExtractMonth('invoice_date')  # Extract month
-                )
-                .values('year', 'month')
-                .annotate(
-                    total_revenue=Coalesce(
-                        Sum(
-                            'total_amount',
-                            filter=Q(invoice_type='income'),
-                            output_field=FloatField()
-                        ),
-                        Value(0),
-                        output_field=FloatField()
-                    ),
-                    total_expenses=Coalesce(
-                        Sum(
-                            'total_amount',
-                            filter=Q(invoice_type='expense'),
-                            output_field=FloatField()
-                        ),
-                        Value(0),
-                        output_field=FloatField()
-                    ),
-                )
-                .annotate(
-                    profit=F('total_revenue') - F('total_expenses')
-                )
-                .order_by('-year', '-month')  # Order by most recent year and month
+            # Served from the maintained monthly rollup, most recent month first
+            monthly_data = GymIncomeExpenseMonthly.objects.order_by('-year', '-month').values(
+                'year', 'month', 'total_revenue', 'total_expenses', 'profit'
             )
             paginator = self.pagination_class()
-            paginated_data = paginator.paginate_queryset(list(monthly_data), request, view=self)
+            paginated_data = paginator.paginate_queryset(monthly_data, request, view=self)
 
             return paginator.get_paginated_response({'monthly_data': paginated_data})
         # Default behavior
+        if self.wants_fast_list():
+            response = self.fast_list(request)
+            if response is not None:
+                return response
         return super().list(request, *args, **kwargs)
 
 
 class GymInoutViewSet(viewsets.ModelViewSet):
-    queryset = GymInout.objects.all().order_by('-in_time')[:1000]
+    queryset = GymInout.objects.all().order_by('-in_time')
     serializer_class = GymInoutSerializer
     permission_classes = [AllowAny]
     pagination_class = CustomPageNumberPagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = GymInoutFilter
+    # Indexed column used by ?cursor= pagination
+    cursor_ordering = '-in_time'
+    query_budget = {'list': 4}
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # With INOUT_DEFAULT_WINDOW_DAYS set, requests without since/until only list recent check-ins
+        params = self.request.query_params
+        if settings.INOUT_DEFAULT_WINDOW_DAYS and 'since' not in params and 'until' not in params:
+            window = timedelta(days=settings.INOUT_DEFAULT_WINDOW_DAYS)
+            queryset = queryset.filter(in_time__gte=timezone.now() - window)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        page = self.paginate_queryset(queryset)
+        rows = page if page is not None else list(queryset)
 
+        # Resolve all members on the page with a single query instead of one per row
+        context = self.get_serializer_context()
+        context['members_by_reg_code'] = get_members_by_reg_code(row.member_reg_code for row in rows)
+        serializer = self.get_serializer_class()(rows, many=True, context=context)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
 
-# Global in-memory store to hold the current finger mode and member ID
-current_finger_mode = None
-current_member_id = None
+
+class BulkInoutView(APIView):
+    """
+    Ingest a backlog of in/out events queued by an offline scanner in one request.
+    Body: {"events": [{"member_reg_code", "type": "in"|"out", "time"}, ...], "attendance": false}
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        events = request.data.get('events')
+        if not isinstance(events, list):
+            return Response({"error": "events must be a list"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(events) > settings.INOUT_BULK_MAX_EVENTS:
+            return Response(
+                {"error": f"At most {settings.INOUT_BULK_MAX_EVENTS} events can be sent in one request"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        record_attendance = str(request.data.get('attendance', '')).lower() in ('1', 'true')
+        return Response(ingest_events(events, record_attendance), status=status.HTTP_200_OK)
+
+
+async def checkin_stream(request):
+    """
+    Server-sent events stream of new check-ins for the front desk, one `checkin`
+    event per GymInout row in the GymInoutSerializer shape. Reconnecting clients
+    resume from the Last-Event-ID header (or ?last_id=). Needs the ASGI server:
+    under WSGI Django would buffer the endless response in memory.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"error": "The check-in stream is only served by the ASGI application (membership_system.asgi)"},
+            status=501,
+        )
+    resume_from = request.headers.get('Last-Event-ID') or request.GET.get('last_id')
+    try:
+        resume_from = int(resume_from) if resume_from else None
+    except ValueError:
+        return JsonResponse({"error": "last_id must be an integer"}, status=400)
+
+    response = StreamingHttpResponse(checkin_events(resume_from), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 class FingerModeView(APIView):
     """
     A class to handle getting and setting finger mode for fingerprint operations.
-    This stores the mode temporarily without using session IDs.
+    The mode is kept per scanner device (?device=, default "default") in the
+    store configured by FINGER_MODE_STORE, so every worker process sees it.
     """
     permission_classes = [AllowAny]
 
     def get(self, request):
-        """Endpoint to get the current finger mode."""
-        if current_finger_mode is not None:
-            return Response({"mode": current_finger_mode, "member_id": current_member_id}, status=status.HTTP_200_OK)
+        """
+        Endpoint to get the current finger mode.
+        With ?wait=<seconds>&version=<n> the request is held until the mode
+        changes from version n, so scanners don't need to poll.
+        """
+        store = get_finger_mode_store()
+        device = request.query_params.get('device', 'default')
+        wait = request.query_params.get('wait')
+
+        if len(device) > DEVICE_MAX_LENGTH:
+            return Response({"error": f"device must be at most {DEVICE_MAX_LENGTH} characters"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if wait is not None:
+            try:
+                wait = float(wait)
+                version = request.query_params.get('version')
+                version = int(version) if version else None
+            except ValueError:
+                return Response({"error": "wait and version must be numbers"}, status=status.HTTP_400_BAD_REQUEST)
+            # nan would never reach the deadline and keep the request open forever
+            if not (math.isfinite(wait) and 0 <= wait <= settings.FINGER_MODE_MAX_WAIT):
+                return Response(
+                    {"error": f"wait must be between 0 and {settings.FINGER_MODE_MAX_WAIT} seconds"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            state = store.wait_for_change(device, version, wait)
+        else:
+            state = store.get(device)
+
+        if state is not None:
+            return Response(state, status=status.HTTP_200_OK)
         else:
             return Response({"error": "No finger mode set"}, status=status.HTTP_404_NOT_FOUND)
 
     def post(self, request):
         """Endpoint to set the current finger mode."""
-        global current_finger_mode, current_member_id
-        
         finger_mode = request.data.get('mode')
         member_id = request.data.get('member_id')
-        
+        device = request.data.get('device', 'default')
+        ttl = request.data.get('ttl', settings.FINGER_MODE_TTL)
+
         if finger_mode is None:
             return Response({"error": "Mode is required"}, status=status.HTTP_400_BAD_REQUEST)
-        
+
+        if not isinstance(device, str) or len(device) > DEVICE_MAX_LENGTH:
+            return Response({"error": f"device must be at most {DEVICE_MAX_LENGTH} characters"}, status=status.HTTP_400_BAD_REQUEST)
+
         if finger_mode not in ['register', 'attendance']:
             return Response({"error": "Invalid mode! Choices are 'register' and 'attendance'"}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Store the data temporarily in global variables (overwritten with each request)
-        current_finger_mode = finger_mode
-        current_member_id = member_id
-        
-        return Response({"message": "Mode has been updated."}, status=status.HTTP_200_OK)
+
+        try:
+            ttl = int(ttl) if ttl else None
+        except (TypeError, ValueError, OverflowError):
+            return Response({"error": "ttl must be a number of seconds"}, status=status.HTTP_400_BAD_REQUEST)
+        if ttl is not None and ttl < 0:
+            return Response({"error": "ttl must be a number of seconds"}, status=status.HTTP_400_BAD_REQUEST)
+
+        state = get_finger_mode_store().set(device, finger_mode, member_id, ttl)
+
+        return Response({"message": "Mode has been updated.", "version": state['version']}, status=status.HTTP_200_OK)
+
+
+class FingerprintIdentifyView(APIView):
+    """Identify a scanned fingerprint template against every enrolled member."""
+    permission_classes = [AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        probe = decode_template(request.data.get('template'))
+        if probe is None:
+            return Response(
+                {"error": f"template must be a base64 encoded {settings.FINGERPRINT_TEMPLATE_BYTES} byte fingerprint template"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        match = get_fingerprint_index().identify(probe, settings.FINGERPRINT_MATCH_MAX_DISTANCE)
+        if match is None:
+            return Response({"error": "No matching member"}, status=status.HTTP_404_NOT_FOUND)
+
+        member_id, distance = match
+        member = get_object_or_404(GymMember, id=member_id)
+        return Response({
+            "member_id": member_id,
+            "distance": distance,
+            "member_info": GymMemberSimpleSerializer(member).data,
+        }, status=status.HTTP_200_OK)
+
+
+class DashboardSummaryView(APIView):
+    """
+    Member counts and revenue/expense totals for the dashboard in a single response.
+    Served from the cache until a member, payment or income/expense row changes.
+    """
+    permission_classes = [AllowAny]
+    query_budget = 1
+
+    def get(self, request, *args, **kwargs):
+        return Response(get_dashboard_summary(), status=status.HTTP_200_OK)
 
 
 class TokenRefreshViewWithAdminPermission(TokenRefreshView):
+    # TokenRefreshView authenticates nobody, which would make IsAuthenticated refuse every request
+    authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
 
 
@@ -2,6 +2,8 @@
 ASGI config for membership_system project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve the project through it (e.g. ``uvicorn membership_system.asgi:application``)
+for the /api/inout/stream/ server-sent events endpoint.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 from pathlib import Path
 from datetime import timedelta
 from decouple import config
+from corsheaders.defaults import default_headers
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -58,9 +59,107 @@ INSTALLED_APPS = [
     "corsheaders",
 ]
 CORS_ALLOW_ALL_ORIGINS = True
+# Let browser clients send Idempotency-Key to the payment endpoints
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+# Response headers browser clients may read
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed', 'Skipped-Receipts']
 
 BASE_URL = 'https://0nn4jvzhwj.execute-api.ap-south-1.amazonaws.com'
 
+# Serve the members global_search from the gym_member_search_* index tables. Off by default:
+# the tables start empty, so run `manage.py rebuild_member_search_index` before enabling it.
+MEMBER_SEARCH_INDEX_ENABLED = config('MEMBER_SEARCH_INDEX_ENABLED', default=False, cast=bool)
+
+# Seconds the /api/dashboard/summary/ counters stay cached. Writes to members, payments and
+# income/expense clear them in the CACHE_BACKEND below; with the default per-process memory
+# cache that only reaches the writing process and the timeout bounds staleness in the others.
+DASHBOARD_CACHE_TIMEOUT = config('DASHBOARD_CACHE_TIMEOUT', default=300, cast=int)
+
+# Rendered payment receipts are stored under this prefix of the default storage
+RECEIPT_STORAGE_PREFIX = 'receipts'
+# Worker threads rendering receipts queued by AcceptPaymentView
+RECEIPT_RENDER_WORKERS = config('RECEIPT_RENDER_WORKERS', default=2, cast=int)
+# Bulk receipt export (?query=export-receipts): worker processes, row limit and in-memory spool size
+RECEIPT_EXPORT_PROCESSES = config('RECEIPT_EXPORT_PROCESSES', default=os.cpu_count(), cast=int)
+RECEIPT_EXPORT_MAX = config('RECEIPT_EXPORT_MAX', default=5000, cast=int)
+RECEIPT_EXPORT_SPOOL_SIZE = 16 * 1024 * 1024
+
+# Days of check-ins listed by /api/inout/ when no since/until window is given; 0 lists them all
+INOUT_DEFAULT_WINDOW_DAYS = config('INOUT_DEFAULT_WINDOW_DAYS', default=0, cast=int)
+
+# Most in/out events accepted by one /api/inout/bulk/ request
+INOUT_BULK_MAX_EVENTS = config('INOUT_BULK_MAX_EVENTS', default=10000, cast=int)
+
+# Longest visit, in hours: older open check-ins aren't paired with a bulk-ingested out event
+INOUT_MAX_VISIT_HOURS = config('INOUT_MAX_VISIT_HOURS', default=24, cast=int)
+
+# Seconds a stored Idempotency-Key response is replayed for
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=24 * 60 * 60, cast=int)
+# Seconds after which a key still marked as being processed is taken over by a new request
+IDEMPOTENCY_PENDING_TIMEOUT = config('IDEMPOTENCY_PENDING_TIMEOUT', default=60, cast=int)
+
+# Seconds a worker keeps its cached copy of the membership plan table
+MEMBERSHIP_PLAN_CACHE_TIMEOUT = config('MEMBERSHIP_PLAN_CACHE_TIMEOUT', default=300, cast=int)
+
+# send_expiry_reminders: gym_member id used as the sender of reminder messages,
+# and members reminded per transaction
+REMINDER_SENDER_ID = config('REMINDER_SENDER_ID', default=1, cast=int)
+REMINDER_BATCH_SIZE = config('REMINDER_BATCH_SIZE', default=1000, cast=int)
+
+# /api/inout/stream/ check-in events: seconds between gym_inout polls, rows per poll, ids each
+# poll looks back for rows committed out of id order, rows replayed per resume, buffered events
+# per client and seconds between keepalives
+CHECKIN_STREAM_POLL_INTERVAL = config('CHECKIN_STREAM_POLL_INTERVAL', default=1.0, cast=float)
+CHECKIN_STREAM_BATCH_SIZE = 200
+CHECKIN_STREAM_OVERLAP = 100
+CHECKIN_STREAM_BACKFILL = 500
+CHECKIN_STREAM_QUEUE_SIZE = 1000
+CHECKIN_STREAM_KEEPALIVE = 15
+
+# Fingerprint scanner mode store. DatabaseFingerModeStore is shared by all workers;
+# membership.finger_state.InMemoryFingerModeStore only suits a single process.
+FINGER_MODE_STORE = config('FINGER_MODE_STORE', default='membership.finger_state.DatabaseFingerModeStore')
+# Seconds a mode stays set unless the request gives its own ttl; 0 keeps it until changed
+FINGER_MODE_TTL = config('FINGER_MODE_TTL', default=0, cast=int)
+# Longest long-poll GET /api/finger-mode/?wait= in seconds, and how often the database store re-checks
+FINGER_MODE_MAX_WAIT = 30
+FINGER_MODE_POLL_INTERVAL = 0.5
+
+# Server-side fingerprint matching: FingerPrint values are base64 encoded binary templates
+# of FINGERPRINT_TEMPLATE_BYTES bytes, matched by Hamming distance (in bits)
+FINGERPRINT_TEMPLATE_BYTES = config('FINGERPRINT_TEMPLATE_BYTES', default=512, cast=int)
+FINGERPRINT_MATCH_MAX_DISTANCE = config('FINGERPRINT_MATCH_MAX_DISTANCE', default=1200, cast=int)
+# Seconds before a worker reloads its template index to see enrollments made by other workers
+FINGERPRINT_INDEX_MAX_AGE = config('FINGERPRINT_INDEX_MAX_AGE', default=300, cast=int)
+
+# Per-request SQL profiling (membership.middleware.QueryProfilerMiddleware): a Server-Timing
+# header and one JSON log line per request on the membership.queries logger, logged at WARNING
+# when a statement takes QUERY_PROFILER_SLOW_SQL_MS or more or a view goes over its query_budget
+QUERY_PROFILER_ENABLED = config('QUERY_PROFILER_ENABLED', default=True, cast=bool)
+QUERY_PROFILER_SLOW_SQL_MS = config('QUERY_PROFILER_SLOW_SQL_MS', default=100, cast=int)
+QUERY_PROFILER_TOP_STATEMENTS = 3
+QUERY_PROFILER_LOG_LEVEL = config('QUERY_PROFILER_LOG_LEVEL', default='WARNING')
+# Raise instead of logging when a view runs more queries than its query_budget; turn on for tests and CI
+QUERY_BUDGET_STRICT = config('QUERY_BUDGET_STRICT', default=False, cast=bool)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'plain'},
+    },
+    'loggers': {
+        'membership.queries': {
+            'handlers': ['console'],
+            'level': QUERY_PROFILER_LOG_LEVEL,
+            'propagate': False,
+        },
+    },
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAdminUser',
@@ -75,6 +174,9 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 12,
 }
 
+# Largest ?page_size= a list request can ask for
+MAX_PAGE_SIZE = config('MAX_PAGE_SIZE', default=1000, cast=int)
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=24),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
@@ -89,6 +191,7 @@ CSRF_TRUSTED_ORIGINS = [
 
 MIDDLEWARE = [
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    "membership.middleware.QueryProfilerMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -118,6 +221,8 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "membership_system.wsgi.application"
+# Serves everything WSGI does plus the /api/inout/stream/ check-in stream
+ASGI_APPLICATION = "membership_system.asgi.application"
 
 
 # Database
@@ -141,6 +246,16 @@ DATABASES = {
     }
 }
 
+# Shared by all processes when pointed at e.g. django.core.cache.backends.db.DatabaseCache
+# (LOCATION is the table; run `manage.py createcachetable`) or a redis/memcached backend.
+# The default memory cache is private to each process.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
 STORAGES = {
     "default": {
         "BACKEND": "storages.backends.s3boto3.S3Boto3Storage",  # For media files
@@ -202,3 +317,6 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Creates the unmanaged legacy tables in the test database
+TEST_RUNNER = "membership.test_runner.LegacyTablesTestRunner"